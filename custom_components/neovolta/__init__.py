@@ -1,47 +1,227 @@
 """Custom integration to integrate NeoVolta with Home Assistant."""
 from __future__ import annotations
 
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_PORT, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SLAVE, Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
 
-from .api import NeovoltaApiClient
-from .const import DOMAIN
+from .api import NeovoltaApiClient, NeovoltaApiClientError
+from .capture import RegisterCapture
+from .const import (
+    CONF_CAPTURE,
+    CONF_LOGGER_SERIAL,
+    CONF_MAX_IN_FLIGHT,
+    CONF_SERIAL_NUMBER,
+    CONF_TRANSPORT,
+    DATA_SCHEDULER,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_SLAVE,
+    DOMAIN,
+    LOGGER,
+    SERVICE_PROBE,
+    SERVICE_SWEEP,
+    SERVICE_WRITE_SETTINGS,
+    TRANSPORT_TCP,
+)
 from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .probe import async_apply_capabilities
+from .scheduler import PollScheduler
+from .settings import SETTINGS_BY_KEY
 
 PLATFORMS: list[Platform] = [
+    Platform.BINARY_SENSOR,
+    Platform.NUMBER,
+    Platform.SELECT,
     Platform.SENSOR,
+    Platform.TIME,
 ]
 
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_SETTINGS = "settings"
+ATTR_START = "start"
+ATTR_END = "end"
+
+WRITE_SETTINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_SETTINGS): vol.Schema({cv.string: object}),
+    }
+)
+
+
+def _address_range(data: dict) -> dict:
+    """Check that the sweep range is not empty."""
+    if data[ATTR_START] >= data[ATTR_END]:
+        raise vol.Invalid("start must be below end")
+    return data
+
+
+SWEEP_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+            vol.Optional(ATTR_START, default=0): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=0xFFFF)
+            ),
+            vol.Optional(ATTR_END, default=400): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=0x10000)
+            ),
+        }
+    ),
+    _address_range,
+)
+
 
 # https://developers.home-assistant.io/docs/config_entries_index/#setting-up-an-entry
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up this integration using UI."""
     hass.data.setdefault(DOMAIN, {})
+    scheduler = hass.data.setdefault(DATA_SCHEDULER, PollScheduler())
+    capture = None
+    if entry.options.get(CONF_CAPTURE):
+        capture = await hass.async_add_executor_job(
+            RegisterCapture,
+            hass.config.path(f"{DOMAIN}_{entry.entry_id}.capture"),
+        )
     hass.data[DOMAIN][entry.entry_id] = coordinator = NeovoltaDataUpdateCoordinatoror(
         hass=hass,
         client=NeovoltaApiClient(
             host=entry.data[CONF_HOST],
             port=entry.data[CONF_PORT],
+            unit=int(entry.data.get(CONF_SLAVE, DEFAULT_SLAVE)),
+            capture=capture,
+            transport=entry.data.get(CONF_TRANSPORT, TRANSPORT_TCP),
+            logger_serial=(
+                int(entry.data[CONF_LOGGER_SERIAL])
+                if entry.data.get(CONF_LOGGER_SERIAL)
+                else None
+            ),
+            serial_number=entry.data.get(CONF_SERIAL_NUMBER),
+            max_in_flight=int(
+                entry.options.get(CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT)
+            ),
         ),
+        scheduler=scheduler,
     )
-    # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
-    await coordinator.async_config_entry_first_refresh()
+    if CONF_SERIAL_NUMBER in entry.data:
+        # start from the last known values, the first poll must not hold up setup
+        await coordinator.async_restore()
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+        )
+    else:
+        # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            # setup is retried from scratch, release what this attempt holds
+            hass.data[DOMAIN].pop(entry.entry_id)
+            scheduler.unregister(entry.entry_id)
+            await coordinator.client.async_close()
+            raise
+        # entries from before the serial number was stored: keep it from now on
+        hass.config_entries.async_update_entry(
+            entry,
+            data={
+                **entry.data,
+                CONF_SERIAL_NUMBER: coordinator.client.serial_number,
+            },
+        )
 
+    await coordinator.async_load_capabilities()
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(coordinator.async_start_heartbeat())
+
+    if coordinator.capabilities is None:
+        entry.async_create_background_task(
+            hass, _async_probe(hass, entry), f"{DOMAIN} probe"
+        )
+    if not hass.services.has_service(DOMAIN, SERVICE_PROBE):
+
+        async def async_handle_probe(call: ServiceCall) -> None:
+            """Probe the registers of every NeoVolta again."""
+            for entry_id in list(hass.data[DOMAIN]):
+                if probed := hass.config_entries.async_get_entry(entry_id):
+                    await _async_probe(hass, probed)
+
+        hass.services.async_register(DOMAIN, SERVICE_PROBE, async_handle_probe)
+
+        async def async_handle_write_settings(call: ServiceCall) -> None:
+            """Write several settings of one NeoVolta in as few requests as possible."""
+            entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+            if (coordinator := hass.data[DOMAIN].get(entry_id)) is None:
+                raise ServiceValidationError(f"No loaded NeoVolta entry {entry_id}")
+            values = {}
+            for key, value in call.data[ATTR_SETTINGS].items():
+                if (setting := SETTINGS_BY_KEY.get(key)) is None:
+                    raise ServiceValidationError(f"Unknown NeoVolta setting {key}")
+                try:
+                    values[key] = setting.encode(value)
+                except ValueError as exception:
+                    raise ServiceValidationError(str(exception)) from exception
+            await coordinator.async_write(values)
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_WRITE_SETTINGS,
+            async_handle_write_settings,
+            schema=WRITE_SETTINGS_SCHEMA,
+        )
+
+        async def async_handle_sweep(call: ServiceCall) -> ServiceResponse:
+            """Map which registers of one NeoVolta can be read."""
+            entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+            if (coordinator := hass.data[DOMAIN].get(entry_id)) is None:
+                raise ServiceValidationError(f"No loaded NeoVolta entry {entry_id}")
+            return await coordinator.async_sweep(
+                call.data[ATTR_START], call.data[ATTR_END]
+            )
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_SWEEP,
+            async_handle_sweep,
+            schema=SWEEP_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
 
     return True
 
 
+async def _async_probe(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Probe which registers the device populates and update the entities."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    try:
+        capabilities = await coordinator.async_probe()
+    except NeovoltaApiClientError as exception:
+        LOGGER.warning("Probing NeoVolta %s failed: %s", entry.title, exception)
+        return
+    await async_apply_capabilities(hass, entry, capabilities)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
     if unloaded := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_save()
+        await coordinator.client.async_close()
+        hass.data[DATA_SCHEDULER].unregister(entry.entry_id)
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, SERVICE_PROBE)
+            hass.services.async_remove(DOMAIN, SERVICE_WRITE_SETTINGS)
+            hass.services.async_remove(DOMAIN, SERVICE_SWEEP)
     return unloaded
 
 
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -2,19 +2,47 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
 import logging
+import time
+from types import MappingProxyType
 
 import async_timeout
-from pymodbus.client import AsyncModbusTcpClient
-from pymodbus.exceptions import ConnectionException, ModbusIOException
-from pymodbus.pdu import ExceptionResponse
-from pymodbus import pymodbus_apply_logging_config
 
-# logging.getLogger("pymodbus.logging").setLevel(logging.DEBUG)
-pymodbus_apply_logging_config()
+from .capture import RegisterCapture
+from .connection import (
+    ModbusConnectionError,
+    ModbusDeviceError,
+    acquire_connection,
+    release_connection,
+)
+from .const import TRANSPORT_TCP
+from .derived import DERIVED, DerivedValues, input_keys
+from .metrics import ClientMetrics
+from .registers import (
+    ALL_GROUPS,
+    KIND_SETTING,
+    REGISTERS_BY_KEY,
+    DecodePlan,
+    plan_reads,
+)
+from .retry import RETRYABLE_EXCEPTION_CODES, CircuitBreaker, RetryPolicy
+from .values import RegisterValues
 
 _LOGGER = logging.getLogger(__name__)
 
+# first word of the serial number, read to probe a device that was down
+PROBE_ADDRESS = 3
+# most registers a write-multiple-registers request can carry
+MAX_WRITE_COUNT = 123
+
+# retries of the poll running in this task, so that heartbeats, streams and
+# sweeps sharing the connection do not count towards it
+_poll_retries: ContextVar[list[int] | None] = ContextVar("poll_retries", default=None)
+
 
 class NeovoltaApiClientError(Exception):
     """Exception to indicate a general API error."""
@@ -28,6 +56,70 @@ class NeovoltaApiClientAuthenticationError(NeovoltaApiClientError):
     """Exception to indicate an authentication error."""
 
 
+class NeovoltaApiClientDeviceError(NeovoltaApiClientError):
+    """Exception to indicate the device rejected a request."""
+
+    def __init__(self, message: str, exception_code: int) -> None:
+        """Initialize."""
+        super().__init__(message)
+        self.exception_code = exception_code
+
+
+def _consecutive_runs(
+    words: Mapping[int, int], max_count: int
+) -> list[tuple[int, list[int]]]:
+    """Return (start, values) of the runs of consecutive addresses in words."""
+    runs: list[tuple[int, list[int]]] = []
+    for address in sorted(words):
+        if runs and runs[-1][0] + len(runs[-1][1]) == address:
+            if len(runs[-1][1]) < max_count:
+                runs[-1][1].append(words[address])
+                continue
+        runs.append((address, [words[address]]))
+    return runs
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Values of some registers, read together at one point in time."""
+
+    timestamp: datetime
+    values: Mapping[str, float]
+
+    def __getitem__(self, key: str) -> float:
+        """Return the value of key."""
+        return self.values[key]
+
+
+@dataclass
+class BlockStatus:
+    """Outcome of the reads of one block of registers."""
+
+    start: int
+    count: int
+    last_success: datetime | None = None
+    last_failure: datetime | None = None
+    # whether the last read of the block failed
+    failed: bool = False
+
+    def as_dict(self) -> dict:
+        """Return the status with the times as ISO strings."""
+        return {
+            "start": self.start,
+            "count": self.count,
+            "last_success": self.last_success and self.last_success.isoformat(),
+            "last_failure": self.last_failure and self.last_failure.isoformat(),
+            "failed": self.failed,
+        }
+
+
+def _dependents(keys: frozenset[str]) -> frozenset[str]:
+    """Return keys and the derived keys computed from any of them."""
+    return keys | frozenset(
+        derived.key for derived in DERIVED if not keys.isdisjoint(derived.inputs)
+    )
+
+
 class NeovoltaApiClient:
     """Neovolta API Client."""
 
@@ -35,211 +127,463 @@ class NeovoltaApiClient:
         self,
         host: str = "0.0.0.0",
         port: str = "8899",
+        unit: int = 1,
+        retry_policy: RetryPolicy | None = None,
+        capture: RegisterCapture | None = None,
+        transport: str = TRANSPORT_TCP,
+        logger_serial: int | None = None,
+        serial_number: str | None = None,
+        max_in_flight: int = 1,
     ) -> None:
         """Initialize."""
         self._host = host
         self._port = port
+        self._unit = unit
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._breaker = CircuitBreaker()
+        self._capture = capture
         self._static_data_loaded = False
-        self.data = {}
-        self._stats = {
-            "async_get_data": 0,
-            "get_value": 0,
-            "TimeoutError": 0,
-            "ConnectionException": 0,
-            "ModbusIOException": 0,
-            "Exception": 0,
-            "isError": 0,
-            "ExceptionResponse": 0,
-            "tries": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0, 9: 0, 10: 0},
-        }
-
-        self._client = AsyncModbusTcpClient(
-            host=self._host,
-            port=self._port,
-            close_comm_on_error=True,
-            reconnect_delay=1000,
-            retry_on_empty=True,
+        self._enabled_keys: set[str] | None = None
+        # settings a probe or sweep found on the device, the others are not read
+        self._readable_settings: frozenset[str] = frozenset()
+        # read plans and the keys they decode, keyed by register groups
+        self._read_plans: dict[
+            frozenset[str], tuple[tuple[DecodePlan, ...], frozenset[str]]
+        ] = {}
+        self._derived = DerivedValues()
+        # readers only ever see complete polls: each poll fills the back
+        # buffer, which is swapped with data once every block is decoded
+        self.data = RegisterValues()
+        self._back = RegisterValues()
+        self._update_lock = asyncio.Lock()
+        # outcome of the last reads of each block, keyed by (start, count)
+        self.blocks: dict[tuple[int, int], BlockStatus] = {}
+        # keys whose block failed since they were last read, and those read
+        # by the last poll; both include the derived keys depending on them
+        self.stale_keys: frozenset[str] = frozenset()
+        self.updated_keys: frozenset[str] = frozenset()
+        self._stale_registers: frozenset[str] = frozenset()
+        # blocks whose last read failed, read again on the next poll
+        self._retry_plans: dict[tuple[int, int], DecodePlan] = {}
+        self.serial_number = serial_number
+        self.metrics = ClientMetrics()
+        if serial_number is not None:
+            # static data already known, from the config entry
+            self._static_data_loaded = True
+
+        self._max_in_flight = max_in_flight
+        self._connection = acquire_connection(
+            host, port, transport, logger_serial, max_in_flight
         )
 
-    async def async_get_static_data(self) -> any:
+    async def async_get_static_data(self, deadline: float | None = None) -> any:
         """Get static data only once."""
         # serial number
         serial_number = ""
-        response = await self._get_value(3, 5)
+        response = await self._get_value(3, 5, deadline=deadline)
         for bits in response:
             serial_number += chr(bits >> 8) + chr(bits & 0xFF)
-        self.data["serial_number"] = serial_number
+        self.serial_number = serial_number
 
         self._static_data_loaded = True
 
-    def _scaled_value(self, value, scale=1) -> any:
-        """Return a scaled value."""
-        return float(value) * scale
-
-    async def async_get_data(self) -> any:
-        """Get data from the API."""
-        self._stats["async_get_data"] += 1
-
-        if not self._static_data_loaded:
-            await self.async_get_static_data()
-
-        # grab register 0 to 99
-        response = await self._get_value(0, 100)
-        self.data["energy24"] = self._scaled_value(response[24], 0.1)
-        self.data["energy65"] = self._scaled_value(response[65], 0.1)
-        self.data["energy66"] = self._scaled_value(response[66], 0.1)
-        self.data["energy68"] = self._scaled_value(response[68], 0.1)
-        self.data["battery_charged_today"] = self._scaled_value(response[70], 0.1)
-        self.data["battery_discharged_today"] = self._scaled_value(response[71], 0.1)
-        self.data["battery_charged_cumulative"] = self._scaled_value(response[72], 0.1)
-        self.data["battery_discharged_cumulative"] = self._scaled_value(
-            response[74], 0.1
+    async def async_close(self) -> None:
+        """Release the connection to the device."""
+        release_connection(self._connection, self._max_in_flight)
+        if (capture := self._capture) is not None:
+            self._capture = None
+            # flushing the capture file to disk may block
+            await asyncio.get_running_loop().run_in_executor(None, capture.close)
+
+    def enable_key(self, key: str) -> None:
+        """Read the registers behind key on future polls."""
+        if self._enabled_keys is None:
+            self._enabled_keys = set()
+        self._enabled_keys.add(key)
+        self._read_plans.clear()
+
+    def disable_key(self, key: str) -> None:
+        """Stop reading the registers behind key."""
+        if self._enabled_keys is not None:
+            self._enabled_keys.discard(key)
+            self._read_plans.clear()
+
+    @property
+    def readable_settings(self) -> frozenset[str]:
+        """Return the settings found on the device, the only ones polled."""
+        return self._readable_settings
+
+    def set_readable_settings(self, keys: Iterable[str]) -> None:
+        """Poll the settings in keys, the device was found to have them."""
+        if (keys := frozenset(keys)) != self._readable_settings:
+            self._readable_settings = keys
+            self._read_plans.clear()
+
+    def _polled_keys(self) -> set[str]:
+        """Return the register keys to poll, without unconfirmed settings."""
+        keys = (
+            REGISTERS_BY_KEY.keys()
+            if self._enabled_keys is None
+            else input_keys(self._enabled_keys)
         )
-        self.data["energy_from_grid_today"] = self._scaled_value(response[76], 0.1)
-        self.data["energy_to_grid_today"] = self._scaled_value(response[77], 0.1)
-        self.data["energy_from_grid_cumulative"] = self._scaled_value(response[78], 0.1)
-        self.data["grid_frequency"] = self._scaled_value(response[79], 0.01)
-        self.data["energy_to_grid_cumulative"] = self._scaled_value(response[81], 0.1)
-        self.data["energy_consumed_today"] = self._scaled_value(response[84], 0.1)
-        self.data["energy_consumed_cumulative"] = self._scaled_value(response[85], 0.1)
-        self.data["energy87"] = self._scaled_value(response[87], 0.1)
-        self.data["energy96"] = self._scaled_value(response[96], 0.1)
-
-        # grab register 100 to 199
-        response = await self._get_value(100, 100)
-        self.data["daily_generation"] = self._scaled_value(response[8], 0.1)
-        self.data["pv_voltage1"] = self._scaled_value(response[9], 0.1)
-        self.data["pv_voltage2"] = self._scaled_value(response[11], 0.1)
-        self.data["battery_voltage1"] = self._scaled_value(response[26], 0.01)
-        self.data["energy131"] = self._scaled_value(response[31], 0.1)
-        self.data["current132"] = self._scaled_value(response[32], 0.01)
-        self.data["current133"] = self._scaled_value(response[33], 0.01)
-        self.data["grid_voltage_rua"] = self._scaled_value(response[38], 0.1)
-        self.data["grid_voltage_svb"] = self._scaled_value(response[39], 0.1)
-        self.data["grid_voltage_rsuvab"] = self._scaled_value(response[40], 0.1)
-        self.data["battery_voltage2"] = self._scaled_value(response[43], 0.01)
-        self.data["voltage148"] = self._scaled_value(response[48], 0.1)
-        self.data["voltage149"] = self._scaled_value(response[49], 0.1)
-        self.data["voltage150"] = self._scaled_value(response[50], 0.1)
-        self.data["voltage151"] = self._scaled_value(response[51], 0.1)
-        self.data["voltage152"] = self._scaled_value(response[52], 0.1)
-        self.data["voltage153"] = self._scaled_value(response[53], 0.1)
-        self.data["voltage154"] = self._scaled_value(response[54], 0.1)
-        self.data["voltage155"] = self._scaled_value(response[55], 0.1)
-        self.data["voltage156"] = self._scaled_value(response[56], 0.1)
-        self.data["voltage157"] = self._scaled_value(response[57], 0.1)
-        self.data["voltage158"] = self._scaled_value(response[58], 0.1)
-        self.data["grid_current_rua"] = self._scaled_value(response[60], 0.01)
-        self.data["grid_current_svb"] = self._scaled_value(response[61], 0.01)
-        self.data["meter_ac_current_a"] = self._scaled_value(response[62], 0.01)
-        self.data["meter_ac_current_b"] = self._scaled_value(response[63], 0.01)
-        self.data["current164"] = self._scaled_value(response[64], 0.01)
-        self.data["current165"] = self._scaled_value(response[65], 0.01)
-        self.data["current166"] = self._scaled_value(response[66], 0.01)
-        self.data["current176"] = self._scaled_value(response[76], 0.01)
-        self.data["current177"] = self._scaled_value(response[77], 0.01)
-        self.data["current178"] = self._scaled_value(response[78], 0.01)
-        self.data["current179"] = self._scaled_value(response[79], 0.01)
-        self.data["current180"] = self._scaled_value(response[80], 0.01)
-        self.data["voltage181"] = self._scaled_value(response[81], 0.1)
-        self.data["voltage182"] = self._scaled_value(response[82], 0.1)
-
-        self.data["battery_voltage3"] = self._scaled_value(response[83], 0.01)
-        self.data["battery_total"] = self._scaled_value(response[84], 1)
-        self.data["current185"] = self._scaled_value(response[85], 0.01)
-        self.data["frequency2"] = self._scaled_value(response[92], 0.01)
-        self.data["frequency3"] = self._scaled_value(response[93], 0.01)
-
-        # grab register 300 to 399
-        response = await self._get_value(300, 100)
-        self.data["current314"] = self._scaled_value(response[14], 0.1)
-        self.data["current315"] = self._scaled_value(response[15], 0.1)
-        self.data["battery_tbd"] = self._scaled_value(response[16], 1)
-        self.data["bms_voltage"] = self._scaled_value(response[17], 0.01)
-        self.data["voltage319"] = self._scaled_value(response[19], 0.1)
-        self.data["frequency4"] = self._scaled_value(response[44], 0.01)
-
-        await self._calculate_stats()
+        return {
+            key
+            for key in keys
+            if REGISTERS_BY_KEY[key].kind != KIND_SETTING
+            or key in self._readable_settings
+        }
 
-    async def _get_value(
-        self,
-        address: int,
-        size: int,
-        unit: int = 1,
-        tries=1,
-    ) -> any:
-        """Get information from the API."""
-        self._stats["get_value"] += 1
-        self._stats["tries"][tries] += 1
-        if tries >= 10:
-            await self._calculate_stats()
+    async def async_get_data(self, groups: frozenset[str] = ALL_GROUPS) -> any:
+        """Get data for the given register groups from the API.
+
+        A block that runs out of retries does not fail the poll while
+        others were read: its keys land in stale_keys until a later read of
+        them succeeds, and the block is read again on the next poll whatever
+        the groups. The poll only fails when no block could be read.
+        """
+        state = self._breaker.state
+        if state == CircuitBreaker.OPEN:
+            self.metrics.record_error("CircuitOpen")
+            self.metrics.record_poll(0, success=False, retries=0)
             raise NeovoltaApiClientCommunicationError(
-                f"Timeout fetching NeoVolta information",
+                "NeoVolta device is not responding, waiting before trying again"
             )
 
-        if tries > 1:
-            _LOGGER.debug(f"Neovolta re-try # {tries} for register {address}")
-            # await asyncio.sleep(tries)
-            await asyncio.sleep(5)
-
+        start = time.monotonic()
+        deadline = start + self._retry_policy.deadline
+        success = False
+        retries = [0]
+        token = _poll_retries.set(retries)
         try:
-            async with async_timeout.timeout(30):
-                response = await self._client.read_holding_registers(
-                    address=address, count=size, slave=unit
+            if state == CircuitBreaker.HALF_OPEN:
+                await self._get_value(PROBE_ADDRESS, 1, deadline=deadline, attempts=1)
+
+            if not self._static_data_loaded:
+                await self.async_get_static_data(deadline)
+
+            if (cached := self._read_plans.get(groups)) is None:
+                plans = plan_reads(self._polled_keys(), groups)
+                cached = self._read_plans[groups] = (
+                    plans,
+                    frozenset(key for plan in plans for key in plan.keys),
+                )
+                _LOGGER.debug(
+                    "NeoVolta read plan for %s: %s",
+                    sorted(groups),
+                    [(plan.start, plan.count) for plan in plans],
                 )
+            plans, decoded = cached
+            plans = (
+                *plans,
+                *(
+                    plan
+                    for plan in self._retry_plans.values()
+                    if not decoded.issuperset(plan.keys)
+                ),
+            )
 
-        except asyncio.TimeoutError as exception:
-            _LOGGER.debug(f"Neovolta timeout: {exception}")
-            self._stats["TimeoutError"] += 1
-            return await self._get_value(address, size, unit, tries + 1)
-        except ConnectionException as exception:
-            _LOGGER.debug(f"Neovolta connection problem: {exception}")
-            self._stats["ConnectionException"] += 1
-            return await self._get_value(address, size, unit, tries + 1)
-        except ModbusIOException as exception:
-            _LOGGER.debug(f"Neovolta ModbusIOException: {exception.message}")
-            self._stats["ModbusIOException"] += 1
-            self._client.close()
-            return await self._get_value(address, size, unit, tries + 1)
-        except Exception as exception:  # pylint: disable=broad-except
-            self._stats["Exception"] += 1
-            await self._calculate_stats()
-            raise NeovoltaApiClientError(
-                "Something really wrong happened!"
-            ) from exception
-
-        if response.isError():
-            self._stats["isError"] += 1
-            _LOGGER.debug(f"NeoVolta MODBUS response error: {response}")
-            return await self._get_value(address, size, unit, tries + 1)
-
-        if isinstance(response, ExceptionResponse):
-            self._stats["ExceptionResponse"] += 1
-            _LOGGER.debug(f"NeoVolta device rejected MODBUS request: {response}")
-            return await self._get_value(address, size, unit, tries + 1)
-
-        return response.registers
-
-    async def _calculate_stats(self):
-        """Calculate stats."""
-
-        stats = (
-            f"\nNeoVolta Integration Debug STATS:\n"
-            f"async_get_data {self._stats['async_get_data']}\t"
-            f"get_value {self._stats['get_value']}\n"
-            f"TimeoutError {self._stats['TimeoutError']}\t"
-            f"ConnectionException {self._stats['ConnectionException']}\t"
-            f"ModbusIOException {self._stats['ModbusIOException']}\n"
-            f"Exception {self._stats['Exception']}\t"
-            f"isError {self._stats['isError']}\t"
-            f"ExceptionResponse {self._stats['ExceptionResponse']}\n"
+            async with self._update_lock:
+                back = self._back
+                back.copy_from(self.data)
+                now = datetime.now(timezone.utc)
+                read: set[str] = set()
+                failed: dict[tuple[int, int], DecodePlan] = {}
+                errors: list[NeovoltaApiClientError] = []
+                for plan, response in zip(
+                    plans, await self._read_blocks(plans, deadline)
+                ):
+                    block = (plan.start, plan.count)
+                    if (status := self.blocks.get(block)) is None:
+                        status = self.blocks[block] = BlockStatus(*block)
+                    status.failed = isinstance(response, NeovoltaApiClientError)
+                    if status.failed:
+                        status.last_failure = now
+                        failed[block] = plan
+                        errors.append(response)
+                        continue
+                    status.last_success = now
+                    if self._capture is not None:
+                        self._capture.append(time.time(), plan.start, response)
+                    plan.decode_into(response, back.array)
+                    read.update(plan.keys)
+                if not read and errors:
+                    raise errors[0]
+                updated = frozenset(read)
+                self._derived.update(back, updated, time.monotonic())
+                self.data, self._back = back, self.data
+
+            self._retry_plans = failed
+            self._stale_registers = (self._stale_registers - updated).union(
+                *(plan.keys for plan in failed.values())
+            )
+            self.stale_keys = _dependents(self._stale_registers)
+            self.updated_keys = _dependents(updated)
+            if failed:
+                _LOGGER.debug(
+                    "NeoVolta blocks %s failed, reading them again next poll: %s",
+                    list(failed),
+                    errors[0],
+                )
+            success = not failed
+        except NeovoltaApiClientCommunicationError:
+            self._breaker.record_failure()
+            raise
+        finally:
+            _poll_retries.reset(token)
+            self.metrics.record_poll(time.monotonic() - start, success, retries[0])
+            _LOGGER.debug("NeoVolta metrics: %s", self.metrics)
+
+        self._breaker.record_success()
+
+    async def _read_blocks(
+        self, plans: tuple[DecodePlan, ...], deadline: float
+    ) -> list[list[int] | NeovoltaApiClientError]:
+        """Read the blocks of plans, pipelined when the connection allows it.
+
+        All blocks are requested at once and the connection bounds how many
+        are on the wire, so a poll takes about one round trip instead of one
+        per block. A block that cannot be read gets its error in place of its
+        registers, the others are read all the same.
+        """
+        if self._connection.max_in_flight == 1 or len(plans) == 1:
+            results = []
+            for plan in plans:
+                try:
+                    results.append(
+                        await self._get_value(plan.start, plan.count, deadline=deadline)
+                    )
+                except NeovoltaApiClientError as exception:
+                    results.append(exception)
+            return results
+        results = await asyncio.gather(
+            *(
+                self._get_value(plan.start, plan.count, deadline=deadline)
+                for plan in plans
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(
+                result, NeovoltaApiClientError
+            ):
+                raise result
+        return results
+
+    async def async_write(self, values: Mapping[str, int]) -> None:
+        """Write raw register values by key, then read them back to verify.
+
+        Every transaction over a data logger is slow and may fail, so changes
+        to adjacent registers are packed into one write-multiple-registers
+        transaction and all of them are read back together afterwards. Only
+        the written keys change in self.data, no full poll is needed. Keys
+        outside readable_settings are refused, they may not exist.
+        """
+        if unknown := [
+            key
+            for key in values
+            if key not in REGISTERS_BY_KEY or REGISTERS_BY_KEY[key].kind != KIND_SETTING
+        ]:
+            raise ValueError(f"Not writable NeoVolta keys: {sorted(unknown)}")
+        if unconfirmed := values.keys() - self._readable_settings:
+            raise ValueError(f"NeoVolta settings not found: {sorted(unconfirmed)}")
+        addresses = {key: REGISTERS_BY_KEY[key].address for key in values}
+        words = {addresses[key]: value & 0xFFFF for key, value in values.items()}
+        deadline = time.monotonic() + self._retry_policy.deadline
+        for start, run in _consecutive_runs(words, MAX_WRITE_COUNT):
+            await self._set_values(start, run, deadline)
+
+        read_back: dict[int, int] = {}
+        async with self._update_lock:
+            back = self._back
+            back.copy_from(self.data)
+            for plan in plan_reads(set(values)):
+                response = await self._get_value(
+                    plan.start, plan.count, deadline=deadline
+                )
+                read_back.update(
+                    zip(range(plan.start, plan.start + plan.count), response)
+                )
+                plan.decode_into(response, back.array)
+            self.data, self._back = back, self.data
+        if mismatched := sorted(
+            key
+            for key, address in addresses.items()
+            if read_back[address] != words[address]
+        ):
+            raise NeovoltaApiClientError(f"NeoVolta did not keep {mismatched}")
+
+    async def async_read_block(
+        self,
+        plan: DecodePlan,
+        deadline: float | None = None,
+        attempts: int | None = None,
+    ) -> dict[str, float]:
+        """Read and decode one block of registers, leaving self.data alone."""
+        values: dict[str, float] = {}
+        response = await self._get_value(
+            plan.start, plan.count, deadline=deadline, attempts=attempts
         )
+        plan.decode(response, values)
+        return values
 
-        tries = "tries - "
-        i = 1
-        for i in range(1, 11):
-            tries = tries + f"{i}: {self._stats['tries'][i]}\t"
+    async def async_heartbeat(self, timeout: float) -> None:
+        """Read a single register, once, to check the device still answers.
 
-        stats = stats + tries
+        An answer closes the circuit breaker, so the next poll goes through
+        right away instead of waiting for the breaker to go half open.
+        """
+        await self._get_value(
+            PROBE_ADDRESS, 1, deadline=time.monotonic() + timeout, attempts=1
+        )
+        self._breaker.record_success()
+
+    async def async_read_registers(
+        self, address: int, count: int, attempts: int | None = None
+    ) -> list[int]:
+        """Read raw registers, leaving self.data alone."""
+        return await self._get_value(address, count, attempts=attempts)
+
+    async def stream(
+        self, interval: float, keys: Iterable[str]
+    ) -> AsyncIterator[Snapshot]:
+        """Yield a snapshot of keys every interval seconds.
+
+        Reads share the connection with async_get_data, so a stream can run
+        next to the coordinator, but they leave self.data alone. Registers
+        are only read once the consumer asks for the next snapshot: when it
+        falls behind, the ticks it missed are dropped instead of queued, so
+        every snapshot is fresh. A sample that cannot be read, whether the link
+        or the device failed, is skipped and the next tick serves as its
+        retry: only cancelling the consumer ends the stream.
+        """
+        keys = frozenset(keys)
+        if unknown := keys - REGISTERS_BY_KEY.keys():
+            raise ValueError(f"Unknown NeoVolta keys: {sorted(unknown)}")
+        plans = plan_reads(keys)
+        # a breaker of its own, so skipped samples do not hold polls back
+        breaker = CircuitBreaker()
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if (delay := next_tick - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            else:
+                missed = int(-delay // interval)
+                self.metrics.record_dropped(missed)
+                next_tick += missed * interval
+            next_tick += interval
+
+            if breaker.state == CircuitBreaker.OPEN:
+                continue
+            values: dict[str, float] = {}
+            deadline = time.monotonic() + self._retry_policy.attempt_timeout
+            try:
+                for plan in plans:
+                    values.update(
+                        await self.async_read_block(plan, deadline=deadline, attempts=1)
+                    )
+            except NeovoltaApiClientError as exception:
+                _LOGGER.debug(f"NeoVolta stream skipped a sample: {exception}")
+                breaker.record_failure()
+                continue
+            breaker.record_success()
+            yield Snapshot(datetime.now(timezone.utc), MappingProxyType(values))
 
-        _LOGGER.debug(stats)
+    async def _get_value(
+        self,
+        address: int,
+        size: int,
+        deadline: float | None = None,
+        attempts: int | None = None,
+    ) -> any:
+        """Get information from the API."""
+        return await self._transact(address, size, deadline, attempts)
+
+    async def _set_values(
+        self, address: int, values: list[int], deadline: float | None = None
+    ) -> None:
+        """Write consecutive registers in one transaction."""
+        await self._transact(address, len(values), deadline, values=values)
+
+    async def _transact(
+        self,
+        address: int,
+        size: int,
+        deadline: float | None = None,
+        attempts: int | None = None,
+        values: list[int] | None = None,
+    ) -> any:
+        """Read size registers at address, or write values there, with retries."""
+        policy = self._retry_policy
+        if deadline is None:
+            deadline = time.monotonic() + policy.deadline
+
+        tries = 0
+        for attempt in range(1, (attempts or policy.attempts) + 1):
+            if attempt > 1:
+                delay = policy.backoff(attempt - 1)
+                if time.monotonic() + delay >= deadline:
+                    break
+                _LOGGER.debug(
+                    "Neovolta re-try # %s for register %s in %.1fs",
+                    attempt,
+                    address,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                if (retries := _poll_retries.get()) is not None:
+                    retries[0] += 1
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            start = time.monotonic()
+            tries += 1
+            try:
+                async with async_timeout.timeout(
+                    min(policy.attempt_timeout, remaining)
+                ):
+                    if values is None:
+                        registers = await self._connection.read_holding_registers(
+                            address, size, self._unit, self.metrics
+                        )
+                    else:
+                        registers = await self._connection.write_registers(
+                            address, values, self._unit, self.metrics
+                        )
+
+            except asyncio.TimeoutError as exception:
+                _LOGGER.debug(f"Neovolta timeout: {exception}")
+                self.metrics.record_error("TimeoutError")
+                continue
+            except ModbusConnectionError as exception:
+                _LOGGER.debug(f"Neovolta connection problem: {exception}")
+                self.metrics.record_error("ModbusConnectionError")
+                continue
+            except ModbusDeviceError as exception:
+                self.metrics.record_error("ModbusDeviceError")
+                _LOGGER.debug(f"NeoVolta device rejected MODBUS request: {exception}")
+                if exception.exception_code in RETRYABLE_EXCEPTION_CODES:
+                    continue
+                # the device answered, so retrying or tripping the breaker won't help
+                self.metrics.record_request_failed(tries)
+                action = "reading" if values is None else "writing"
+                raise NeovoltaApiClientDeviceError(
+                    f"NeoVolta device rejected {action} {size} registers at {address}",
+                    exception.exception_code,
+                ) from exception
+            except Exception as exception:  # pylint: disable=broad-except
+                self.metrics.record_error("Exception")
+                self.metrics.record_request_failed(tries)
+                raise NeovoltaApiClientError(
+                    "Something really wrong happened!"
+                ) from exception
+
+            self.metrics.record_request(size, tries, time.monotonic() - start)
+            return registers
+
+        self.metrics.record_request_failed(tries)
+        raise NeovoltaApiClientCommunicationError(
+            "Timeout fetching NeoVolta information",
+        )
@@ -0,0 +1,158 @@
+"""Backfill of the long-term energy statistics across polling outages."""
+from __future__ import annotations
+
+from array import array
+import asyncio
+from datetime import datetime, timedelta
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .api import NeovoltaApiClient
+from .const import CONF_SERIAL_NUMBER, DOMAIN, LOGGER
+from .registers import GROUP_SLOW, KIND_ENERGY, REGISTERS
+
+# the energy counters, in the order of the buffered values
+ENERGY_KEYS = tuple(
+    register.key
+    for register in REGISTERS
+    if register.kind == KIND_ENERGY and register.group == GROUP_SLOW
+)
+
+# seconds between readings of the sampler while polling fails
+SAMPLE_INTERVAL = 60.0
+# hours of readings kept, and how far back the last statistics are looked up
+MAX_BACKFILL_HOURS = 48
+
+HOUR = timedelta(hours=1)
+
+
+class StatisticsBackfill:
+    """Keep the hourly energy statistics complete while polling fails.
+
+    While the coordinator fails, its sensors are unavailable and the
+    recorder compiles no statistics; the hour polling recovers then shows the
+    energy of the whole outage. Meanwhile a lightweight sampler keeps
+    reading only the energy counters, one attempt per reading, and keeps the
+    last reading of each hour. Once polling recovers, the hours the sensors
+    missed are imported as hourly statistics in one batch per sensor.
+
+    Nothing can be read while Home Assistant itself is down, so the hours of
+    a restart are not filled.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, client: NeovoltaApiClient
+    ) -> None:
+        """Initialize."""
+        self._hass = hass
+        self._entry = entry
+        self._client = client
+        # last reading of each hour no poll succeeded in, keyed by hour start
+        self._readings: dict[datetime, array] = {}
+        self._sampler: asyncio.Task | None = None
+        # the recorder compiles this hour and those before from sensor states
+        self._polled_hour: datetime | None = None
+
+    def poll_failed(self) -> None:
+        """Start sampling the energy counters, unless already sampling."""
+        if self._sampler is None or self._sampler.done():
+            self._sampler = self._entry.async_create_background_task(
+                self._hass, self._async_sample(), f"{DOMAIN} energy sampler"
+            )
+
+    def poll_succeeded(self) -> None:
+        """Stop sampling and import the hours the sensors missed."""
+        if self._sampler is not None:
+            self._sampler.cancel()
+            self._sampler = None
+        # the recorder has states for this hour again
+        self._polled_hour = _hour(dt_util.utcnow())
+        self._readings.pop(self._polled_hour, None)
+        if self._readings:
+            readings, self._readings = self._readings, {}
+            self._entry.async_create_background_task(
+                self._hass,
+                self.async_import(readings),
+                f"{DOMAIN} statistics backfill",
+            )
+
+    async def _async_sample(self) -> None:
+        """Keep the last reading of the energy counters in every hour.
+
+        Readings that fail are skipped, the sampler runs until cancelled.
+        """
+        async for snapshot in self._client.stream(SAMPLE_INTERVAL, ENERGY_KEYS):
+            if (hour := _hour(snapshot.timestamp)) == self._polled_hour:
+                continue
+            self._readings[hour] = array("d", (snapshot[key] for key in ENERGY_KEYS))
+            oldest = hour - MAX_BACKFILL_HOURS * HOUR
+            for stale in [stale for stale in self._readings if stale < oldest]:
+                del self._readings[stale]
+
+    async def async_import(self, readings: dict[datetime, array]) -> None:
+        """Import the readings as hourly statistics of the energy sensors."""
+        if "recorder" not in self._hass.config.components:
+            return
+        registry = er.async_get(self._hass)
+        serial_number = self._entry.data[CONF_SERIAL_NUMBER]
+        hours = sorted(readings)
+        for index, key in enumerate(ENERGY_KEYS):
+            entity_id = registry.async_get_entity_id(
+                "sensor", DOMAIN, f"{serial_number}_{key}"
+            )
+            if entity_id is None:
+                continue
+            rows = (
+                await get_instance(self._hass).async_add_executor_job(
+                    statistics_during_period,
+                    self._hass,
+                    hours[0] - MAX_BACKFILL_HOURS * HOUR,
+                    hours[0],
+                    {entity_id},
+                    "hour",
+                    None,
+                    {"state", "sum"},
+                )
+            ).get(entity_id)
+            if not rows or rows[-1]["state"] is None or rows[-1]["sum"] is None:
+                # nothing to continue from
+                continue
+            state, total = rows[-1]["state"], rows[-1]["sum"]
+            statistics = []
+            for hour in hours:
+                value = readings[hour][index]
+                # daily counters start again from zero at midnight
+                total += value - state if value >= state else value
+                state = value
+                statistics.append(StatisticData(start=hour, state=state, sum=total))
+            async_import_statistics(
+                self._hass,
+                StatisticMetaData(
+                    has_mean=False,
+                    has_sum=True,
+                    name=None,
+                    source="recorder",
+                    statistic_id=entity_id,
+                    unit_of_measurement="kWh",
+                ),
+                statistics,
+            )
+        LOGGER.info(
+            "Backfilled %s hours of NeoVolta %s energy statistics",
+            len(hours),
+            self._entry.title,
+        )
+
+
+def _hour(moment: datetime) -> datetime:
+    """Return the start of the hour of moment."""
+    return moment.replace(minute=0, second=0, microsecond=0)
@@ -6,16 +6,20 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
 )
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_CONNECTIVITY
 from .coordinator import NeovoltaDataUpdateCoordinatoror
 from .entity import NeovoltaEntity
 
 ENTITY_DESCRIPTIONS = (
     BinarySensorEntityDescription(
-        key="neovolta",
-        name="NeoVolta Binary Sensor",
+        key="connectivity",
+        name="Connectivity",
         device_class=BinarySensorDeviceClass.CONNECTIVITY,
+        entity_category=EntityCategory.DIAGNOSTIC,
     ),
 )
 
@@ -42,8 +46,32 @@ class NeovoltaBinarySensor(NeovoltaEntity, BinarySensorEntity):
     ) -> None:
         super().__init__(coordinator)
         self.entity_description = entity_description
+        self._attr_unique_id = (
+            f"{self.coordinator.client.serial_number}_{entity_description.key}"
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the heartbeat as well as the polls."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_CONNECTIVITY.format(self.coordinator.config_entry.entry_id),
+                self._handle_connectivity,
+            )
+        )
+
+    @callback
+    def _handle_connectivity(self) -> None:
+        """Write the new connectivity state."""
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Stay available, a lost link is what this sensor reports."""
+        return True
 
     @property
-    def is_on(self) -> bool:
-        """Return true if the binary_sensor is on."""
-        return self.coordinator.data.get("title", "") == "foo"
+    def is_on(self) -> bool | None:
+        """Return true if the device answered the last poll or heartbeat."""
+        return self.coordinator.connected
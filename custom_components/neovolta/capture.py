@@ -0,0 +1,103 @@
+"""Raw register capture to a memory-mapped ring buffer, and its replay."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+import mmap
+import os
+import struct
+
+from .registers import MAX_READ_COUNT, REGISTERS, DecodePlan
+
+MAGIC = b"NVCAP1\x00\x00"
+# magic, record capacity, next slot to write, records written in total
+HEADER = struct.Struct("<8sIIQ")
+# timestamp, start address, register count, then MAX_READ_COUNT registers
+RECORD = struct.Struct(f"<dHH{MAX_READ_COUNT}H")
+
+# about five days of 10 second polls, 28 MB on disk
+DEFAULT_CAPACITY = 131072
+
+
+class RegisterCapture:
+    """Fixed-size ring buffer of raw register blocks backed by a file.
+
+    Every block read from the device is stored with its timestamp and start
+    address. The file is memory-mapped and overwritten in place once full,
+    so capturing costs a memory copy per block and the file never grows.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Open or create the capture file."""
+        size = HEADER.size + capacity * RECORD.size
+        self._file = open(path, "a+b")  # pylint: disable=consider-using-with
+        existing = os.fstat(self._file.fileno()).st_size
+        if existing != size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        magic, stored_capacity, self._next, self._written = HEADER.unpack_from(
+            self._map
+        )
+        if magic != MAGIC or stored_capacity != capacity:
+            self._next = self._written = 0
+        self.capacity = capacity
+        self._padding = (0,) * MAX_READ_COUNT
+        self._write_header()
+
+    def _write_header(self) -> None:
+        """Store the ring position in the header."""
+        HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self._next, self._written)
+
+    def append(self, timestamp: float, start: int, registers: list[int]) -> None:
+        """Store one block of registers."""
+        count = len(registers)
+        RECORD.pack_into(
+            self._map,
+            HEADER.size + self._next * RECORD.size,
+            timestamp,
+            start,
+            count,
+            *registers,
+            *self._padding[count:],
+        )
+        self._next = (self._next + 1) % self.capacity
+        self._written += 1
+        self._write_header()
+
+    def close(self) -> None:
+        """Flush and close the capture file."""
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def read_capture(path: str) -> Iterator[tuple[float, int, tuple[int, ...]]]:
+    """Yield (timestamp, start, registers) from a capture file, oldest first."""
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        magic, capacity, next_slot, written = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a NeoVolta capture file")
+        first = next_slot if written > capacity else 0
+        for i in range(min(written, capacity)):
+            offset = HEADER.size + ((first + i) % capacity) * RECORD.size
+            timestamp, start, count, *registers = RECORD.unpack_from(buffer, offset)
+            yield timestamp, start, tuple(registers[:count])
+
+
+def replay_capture(path: str) -> Iterator[tuple[float, dict]]:
+    """Decode every captured block, yielding (timestamp, values by key)."""
+    plans: dict[tuple[int, int], DecodePlan | None] = {}
+    for timestamp, start, registers in read_capture(path):
+        key = (start, len(registers))
+        if key not in plans:
+            inside = [
+                register
+                for register in REGISTERS
+                if start <= register.address and register.end <= start + len(registers)
+            ]
+            plans[key] = DecodePlan(start, len(registers), inside) if inside else None
+        if (plan := plans[key]) is not None:
+            values: dict = {}
+            plan.decode(list(registers), values)
+            yield timestamp, values
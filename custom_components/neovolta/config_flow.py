@@ -6,7 +6,8 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SLAVE
+from homeassistant.core import callback
 from homeassistant.helpers import selector
 
 from .api import (
@@ -15,7 +16,40 @@ from .api import (
     NeovoltaApiClientCommunicationError,
     NeovoltaApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_CAPTURE,
+    CONF_DEADBAND_CURRENT,
+    CONF_DEADBAND_FREQUENCY,
+    CONF_DEADBAND_POWER,
+    CONF_DEADBAND_VOLTAGE,
+    CONF_LOGGER_SERIAL,
+    CONF_MAX_IN_FLIGHT,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_SERIAL_NUMBER,
+    CONF_TRANSPORT,
+    DEFAULT_DEADBAND_CURRENT,
+    DEFAULT_DEADBAND_FREQUENCY,
+    DEFAULT_DEADBAND_POWER,
+    DEFAULT_DEADBAND_VOLTAGE,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_SLAVE,
+    DOMAIN,
+    LOGGER,
+    TRANSPORT_SOLARMAN_V5,
+    TRANSPORT_TCP,
+    TRANSPORTS,
+)
+
+# (option, default, unit, step, maximum) of the sensor deadbands
+DEADBANDS = (
+    (CONF_DEADBAND_VOLTAGE, DEFAULT_DEADBAND_VOLTAGE, "V", 0.1, 10),
+    (CONF_DEADBAND_CURRENT, DEFAULT_DEADBAND_CURRENT, "A", 0.01, 10),
+    (CONF_DEADBAND_FREQUENCY, DEFAULT_DEADBAND_FREQUENCY, "Hz", 0.01, 1),
+    (CONF_DEADBAND_POWER, DEFAULT_DEADBAND_POWER, "W", 1, 1000),
+)
 
 
 class NeovoltaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -27,6 +61,14 @@ class NeovoltaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Initialize."""
         self._client = None
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return NeovoltaOptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self,
         user_input: dict | None = None,
@@ -34,28 +76,38 @@ class NeovoltaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle a flow initialized by the user."""
         _errors = {}
         if user_input is not None:
-            try:
-                await self._test_credentials(
-                    host=user_input[CONF_HOST],
-                    port=user_input[CONF_PORT],
-                )
-            except NeovoltaApiClientAuthenticationError as exception:
-                LOGGER.warning(exception)
-                _errors["base"] = "auth"
-            except NeovoltaApiClientCommunicationError as exception:
-                LOGGER.error(exception)
-                _errors["base"] = "connection"
-            except NeovoltaApiClientError as exception:
-                LOGGER.exception(exception)
-                _errors["base"] = "unknown"
-            except vol.Invalid as exception:
-                LOGGER.exception(exception)
-                _errors["base"] = "address"
+            if (unit := _unit_id(user_input[CONF_SLAVE])) is None:
+                _errors["base"] = "slave"
             else:
-                return self.async_create_entry(
-                    title=self._client.data["serial_number"],
-                    data=user_input,
-                )
+                try:
+                    await self._test_credentials(
+                        host=user_input[CONF_HOST],
+                        port=user_input[CONF_PORT],
+                        unit=unit,
+                        transport=user_input[CONF_TRANSPORT],
+                        logger_serial=user_input.get(CONF_LOGGER_SERIAL),
+                    )
+                except NeovoltaApiClientAuthenticationError as exception:
+                    LOGGER.warning(exception)
+                    _errors["base"] = "auth"
+                except NeovoltaApiClientCommunicationError as exception:
+                    LOGGER.error(exception)
+                    _errors["base"] = "connection"
+                except NeovoltaApiClientError as exception:
+                    LOGGER.exception(exception)
+                    _errors["base"] = "unknown"
+                except vol.Invalid as exception:
+                    LOGGER.exception(exception)
+                    _errors["base"] = "address"
+                except ValueError as exception:
+                    LOGGER.warning(exception)
+                    _errors["base"] = "logger_serial"
+                else:
+                    serial_number = self._client.serial_number
+                    return self.async_create_entry(
+                        title=serial_number,
+                        data={**user_input, CONF_SERIAL_NUMBER: serial_number},
+                    )
 
         return self.async_show_form(
             step_id="user",
@@ -79,20 +131,62 @@ class NeovoltaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                             type=selector.TextSelectorType.NUMBER
                         ),
                     ),
+                    vol.Required(
+                        CONF_SLAVE,
+                        default=(user_input or {}).get(CONF_SLAVE, str(DEFAULT_SLAVE)),
+                        description="Modbus Unit ID",
+                    ): selector.TextSelector(
+                        selector.TextSelectorConfig(
+                            type=selector.TextSelectorType.NUMBER
+                        ),
+                    ),
+                    vol.Required(
+                        CONF_TRANSPORT,
+                        default=(user_input or {}).get(CONF_TRANSPORT, TRANSPORT_TCP),
+                        description="Protocol spoken by the data logger",
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=TRANSPORTS,
+                            translation_key=CONF_TRANSPORT,
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_LOGGER_SERIAL,
+                        description="Data logger serial number",
+                    ): selector.TextSelector(
+                        selector.TextSelectorConfig(
+                            type=selector.TextSelectorType.NUMBER
+                        ),
+                    ),
                 }
             ),
             errors=_errors,
         )
 
-    async def _test_credentials(self, host: str, port: str) -> None:
+    async def _test_credentials(
+        self,
+        host: str,
+        port: str,
+        unit: int,
+        transport: str,
+        logger_serial: str | None,
+    ) -> None:
         """Validate credentials."""
         self._ip_v4_validator(host)
+        if transport == TRANSPORT_SOLARMAN_V5 and not logger_serial:
+            raise ValueError("Solarman V5 needs the serial number of the logger")
 
         self._client = NeovoltaApiClient(
             host=host,
             port=port,
+            unit=unit,
+            transport=transport,
+            logger_serial=int(logger_serial) if logger_serial else None,
         )
-        await self._client.async_get_static_data()
+        try:
+            await self._client.async_get_static_data()
+        finally:
+            await self._client.async_close()
 
     def _ip_v4_validator(self, value: Any) -> str:
         """Validate that value is parsable as IPv4 address."""
@@ -103,3 +197,93 @@ class NeovoltaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 f"value '{value}' is not a valid IPv4 address: {ex}"
             ) from ex
         return str(address)
+
+
+class NeovoltaOptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for Neovolta."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self,
+        user_input: dict | None = None,
+    ) -> config_entries.FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_CAPTURE,
+                        default=self.config_entry.options.get(CONF_CAPTURE, False),
+                    ): selector.BooleanSelector(),
+                    vol.Required(
+                        CONF_MIN_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=600,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_MAX_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=600,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_MAX_IN_FLIGHT,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_IN_FLIGHT, DEFAULT_MAX_IN_FLIGHT
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=8,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    **{
+                        vol.Required(
+                            option,
+                            default=self.config_entry.options.get(option, default),
+                        ): selector.NumberSelector(
+                            selector.NumberSelectorConfig(
+                                min=0,
+                                max=maximum,
+                                step=step,
+                                unit_of_measurement=unit,
+                                mode=selector.NumberSelectorMode.BOX,
+                            )
+                        )
+                        for option, default, unit, step, maximum in DEADBANDS
+                    },
+                }
+            ),
+        )
+
+
+def _unit_id(value: Any) -> int | None:
+    """Return value as a Modbus unit id, or None when it is not one."""
+    try:
+        unit = int(value)
+    except (TypeError, ValueError):
+        return None
+    return unit if 0 <= unit <= 247 else None
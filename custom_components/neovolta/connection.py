@@ -0,0 +1,419 @@
+"""Modbus TCP connections shared by every NeoVolta client on a gateway."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from dataclasses import dataclass
+import logging
+import struct
+import time
+
+from .metrics import ClientMetrics
+from .transport import (
+    EXCEPTION_FLAG,
+    MAX_RESPONSE_DATA,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_REGISTERS,
+    create_framer,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+READ_REQUEST = struct.Struct(">BHH")
+# function code, start address, register count, byte count, then the values
+WRITE_REQUEST = struct.Struct(">BHHB")
+WRITE_RESPONSE = struct.Struct(">BHH")
+
+# requests in a row that time out or get a garbled answer before reconnecting
+MAX_FRAMING_FAILURES = 3
+# requests in a row failing while others are in flight before going back to
+# one at a time, and seconds before trying concurrent requests again
+MAX_CONCURRENCY_FAILURES = 2
+CONCURRENCY_RETRY_DELAY = 600.0
+
+
+class ModbusConnectionError(Exception):
+    """The device could not be reached or its answer made no sense."""
+
+
+class ModbusDeviceError(Exception):
+    """The device answered with a Modbus exception response."""
+
+    def __init__(self, function_code: int, exception_code: int) -> None:
+        """Initialize."""
+        super().__init__(
+            f"Function {function_code} rejected with exception code {exception_code}"
+        )
+        self.exception_code = exception_code
+
+
+@dataclass
+class _Pending:
+    """A request waiting for its response."""
+
+    future: asyncio.Future
+    function_code: int
+    count: int
+    metrics: ClientMetrics | None
+
+
+class ModbusConnection:
+    """One socket to a data logger or gateway, shared by all its inverters.
+
+    Requests from every client take turns through a FIFO gate that lets up
+    to max_in_flight of them onto the wire at once. With the default of one
+    the gateway only ever sees one transaction at a time; a higher limit
+    pipelines reads over transports with transaction ids, so a poll takes
+    about one round trip instead of one per block. Gateways that mishandle
+    concurrent requests are detected by requests failing in a row while
+    others are in flight, and the connection goes back to one at a time for
+    a while before trying again. The connection is (re)opened lazily by
+    whichever request needs it first, once for everyone.
+
+    A reader task hands each response to the request with its transaction
+    id, so a late answer to a request that timed out is skipped instead of
+    being taken for the next one. Together with the framer skipping junk
+    this keeps the stream usable; the socket is only reopened when that keeps
+    failing.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: str,
+        transport: str,
+        logger_serial: int | None = None,
+    ) -> None:
+        """Initialize."""
+        self.host = host
+        self.port = port
+        self.transport = transport
+        # requests in flight asked for by each client using the connection
+        self._limits: Counter[int] = Counter()
+        # monotonic time until which requests go one at a time
+        self._serial_until = 0.0
+        self._framer = create_framer(transport, logger_serial)
+        self._in_flight = 0
+        self._slot_waiters: deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._pending: dict[int | None, _Pending] = {}
+        self._transaction = 0
+        self._failures = 0
+        self._concurrency_failures = 0
+
+    @property
+    def users(self) -> int:
+        """Return how many clients use the connection."""
+        return self._limits.total()
+
+    @property
+    def max_in_flight(self) -> int:
+        """Return how many requests may be on the wire at once.
+
+        That is the lowest limit any client asked for, or one when the
+        responses have no transaction ids to tell them apart.
+        """
+        if (
+            self._framer.transactions == 1
+            or not self._limits
+            or time.monotonic() < self._serial_until
+        ):
+            return 1
+        return min(self._limits)
+
+    def add_user(self, max_in_flight: int) -> None:
+        """Count a client, which allows max_in_flight requests at once."""
+        self._limits[max_in_flight] += 1
+
+    def remove_user(self, max_in_flight: int) -> None:
+        """Stop counting a client added with max_in_flight."""
+        self._limits[max_in_flight] -= 1
+        if self._limits[max_in_flight] <= 0:
+            del self._limits[max_in_flight]
+        # a higher limit lets waiting requests through right away
+        self._hand_over_slots()
+
+    async def read_holding_registers(
+        self,
+        address: int,
+        count: int,
+        unit: int,
+        metrics: ClientMetrics | None = None,
+    ) -> list[int]:
+        """Read holding registers once it is this request's turn."""
+        pdu = await self._execute(
+            READ_REQUEST.pack(READ_HOLDING_REGISTERS, address, count),
+            unit,
+            count,
+            metrics,
+        )
+        if pdu[1] != 2 * count:
+            self._failed()
+            raise ModbusConnectionError(
+                f"Expected {count} registers at {address}, got {pdu[1] // 2}"
+            )
+        self._failures = 0
+        return list(struct.unpack_from(f">{count}H", pdu, 2))
+
+    async def write_registers(
+        self,
+        address: int,
+        values: list[int],
+        unit: int,
+        metrics: ClientMetrics | None = None,
+    ) -> None:
+        """Write consecutive holding registers in one transaction."""
+        count = len(values)
+        pdu = await self._execute(
+            WRITE_REQUEST.pack(WRITE_MULTIPLE_REGISTERS, address, count, 2 * count)
+            + struct.pack(f">{count}H", *values),
+            unit,
+            count,
+            metrics,
+        )
+        if WRITE_RESPONSE.unpack(pdu) != (WRITE_MULTIPLE_REGISTERS, address, count):
+            self._failed()
+            raise ModbusConnectionError(
+                f"Unexpected answer to writing {count} registers at {address}"
+            )
+        self._failures = 0
+
+    async def _execute(
+        self,
+        request: bytes,
+        unit: int,
+        count: int,
+        metrics: ClientMetrics | None = None,
+    ) -> bytes:
+        """Send a request PDU and return the PDU answering it."""
+        await self._acquire_slot()
+        # sent while others are in flight, so its outcome tells whether the
+        # gateway copes with concurrent requests
+        concurrent = self._in_flight > 1
+        transaction = pending = writer = None
+        try:
+            if self._writer is None:
+                async with self._connect_lock:
+                    if self._writer is None:
+                        if metrics:
+                            metrics.record_connect()
+                        await self._connect()
+            framer, writer = self._framer, self._writer
+            if framer.transactions > 1:
+                transaction = self._next_transaction()
+            pending = self._pending[transaction] = _Pending(
+                asyncio.get_running_loop().create_future(), request[0], count, metrics
+            )
+            frame = framer.request(transaction or 0, unit, request)
+            writer.write(frame)
+            if metrics:
+                metrics.record_sent(len(frame))
+            await writer.drain()
+            pdu = await pending.future
+        except asyncio.CancelledError:
+            # timed out, a late answer is skipped when it comes in
+            self._failed(concurrent)
+            raise
+        except (OSError, asyncio.IncompleteReadError) as exception:
+            # a lost connection was already dropped by the reader
+            if self._writer is writer:
+                self.reset()
+            raise ModbusConnectionError(exception) from exception
+        finally:
+            if pending is not None and self._pending.get(transaction) is pending:
+                del self._pending[transaction]
+            self._release_slot()
+
+        if not pdu:
+            self._failed(concurrent)
+            raise ModbusConnectionError("The logger got no answer from the device")
+        if concurrent:
+            self._concurrency_failures = 0
+        if pdu[0] & EXCEPTION_FLAG:
+            self._failures = 0
+            raise ModbusDeviceError(pdu[0] & ~EXCEPTION_FLAG, pdu[1])
+        return pdu
+
+    def _next_transaction(self) -> int:
+        """Return a transaction id no request in flight uses."""
+        while True:
+            self._transaction = (self._transaction + 1) % self._framer.transactions
+            if self._transaction not in self._pending:
+                return self._transaction
+
+    async def _acquire_slot(self) -> None:
+        """Wait until another request may go onto the wire."""
+        if self._in_flight < self.max_in_flight and not self._slot_waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._slot_waiters.append(waiter)
+        try:
+            # the slot is counted for us when it is handed over
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            elif waiter in self._slot_waiters:
+                self._slot_waiters.remove(waiter)
+            raise
+
+    def _release_slot(self) -> None:
+        """Hand the slot of a finished request to the next one waiting."""
+        self._in_flight -= 1
+        self._hand_over_slots()
+
+    def _hand_over_slots(self) -> None:
+        """Let waiting requests onto the wire while the limit allows."""
+        while self._slot_waiters and self._in_flight < self.max_in_flight:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    async def _connect(self) -> None:
+        """Open the socket and start reading responses."""
+        self._framer.reset()
+        try:
+            reader, self._writer = await asyncio.open_connection(
+                self.host, int(self.port)
+            )
+        except OSError as exception:
+            raise ModbusConnectionError(exception) from exception
+        self._read_task = asyncio.get_running_loop().create_task(
+            self._read_responses(reader, self._writer)
+        )
+
+    async def _read_responses(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Hand every response that comes in to the request it answers."""
+        framer = self._framer
+        try:
+            while True:
+                data = await reader.read(2 * MAX_RESPONSE_DATA)
+                if not data:
+                    raise ConnectionResetError("Connection closed by the device")
+                # bytes are counted for whoever has been waiting longest
+                oldest = next(iter(self._pending.values()), None)
+                metrics = oldest.metrics if oldest else None
+                if metrics:
+                    metrics.record_received(len(data))
+                discarded = framer.discarded
+                framer.feed(data)
+                while (frame := framer.next_frame()) is not None:
+                    self._dispatch(*frame)
+                if metrics and framer.discarded > discarded:
+                    metrics.record_discarded(framer.discarded - discarded)
+        except OSError as exception:
+            if writer is self._writer:
+                _LOGGER.debug(
+                    "Connection to %s:%s lost: %s", self.host, self.port, exception
+                )
+                self._drop(exception)
+
+    def _dispatch(self, answer: int | None, pdu: bytes) -> None:
+        """Complete the request a response answers, skipping stale ones.
+
+        Without transaction ids, a response to another function, or a read
+        response of the wrong size, is taken for a late answer to an earlier
+        request.
+        """
+        pending = self._pending.get(answer)
+        if (
+            pending is None
+            or pending.future.done()
+            or answer is None
+            and pdu
+            and (
+                pdu[0] & ~EXCEPTION_FLAG != pending.function_code
+                or pdu[0] == READ_HOLDING_REGISTERS
+                and pdu[1] != 2 * pending.count
+            )
+        ):
+            _LOGGER.debug("Skipping stale response to transaction %s", answer)
+            return
+        del self._pending[answer]
+        pending.future.set_result(pdu)
+
+    def _failed(self, concurrent: bool = False) -> None:
+        """Count a failed request, reconnecting when they keep failing."""
+        self._failures += 1
+        if concurrent and self.max_in_flight > 1:
+            self._concurrency_failures += 1
+            if self._concurrency_failures >= MAX_CONCURRENCY_FAILURES:
+                _LOGGER.warning(
+                    "%s:%s mishandles concurrent requests, sending one at a time"
+                    " for %.0fs",
+                    self.host,
+                    self.port,
+                    CONCURRENCY_RETRY_DELAY,
+                )
+                self._concurrency_failures = 0
+                self._serial_until = time.monotonic() + CONCURRENCY_RETRY_DELAY
+        if self._failures >= MAX_FRAMING_FAILURES:
+            _LOGGER.debug(
+                "%s requests in a row failed on %s:%s, reconnecting",
+                self._failures,
+                self.host,
+                self.port,
+            )
+            self.reset()
+
+    def _drop(self, exception: Exception) -> None:
+        """Forget the socket and fail every request waiting on it."""
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+        self._framer.reset()
+        self._failures = 0
+        pending, self._pending = self._pending, {}
+        for request in pending.values():
+            if not request.future.done():
+                request.future.set_exception(ConnectionResetError(exception))
+
+    def reset(self) -> None:
+        """Drop the socket, the next request opens a fresh one."""
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        self._drop(ConnectionAbortedError("Connection reset"))
+
+
+_CONNECTIONS: dict[tuple[str, str, str], ModbusConnection] = {}
+
+
+def acquire_connection(
+    host: str,
+    port: str,
+    transport: str,
+    logger_serial: int | None = None,
+    max_in_flight: int = 1,
+) -> ModbusConnection:
+    """Return the shared connection to host:port, creating it if needed.
+
+    Clients sharing a connection get the lowest limit any of them asked for,
+    until they release it.
+    """
+    key = (host, str(port), transport)
+    if (connection := _CONNECTIONS.get(key)) is None:
+        connection = _CONNECTIONS[key] = ModbusConnection(
+            host, port, transport, logger_serial
+        )
+    connection.add_user(max_in_flight)
+    return connection
+
+
+def release_connection(connection: ModbusConnection, max_in_flight: int = 1) -> None:
+    """Stop using a connection acquired with max_in_flight.
+
+    The connection is closed once nobody else uses it.
+    """
+    connection.remove_user(max_in_flight)
+    if connection.users <= 0:
+        _CONNECTIONS.pop(
+            (connection.host, str(connection.port), connection.transport), None
+        )
+        connection.reset()
@@ -1,9 +1,68 @@
 """Constants for neovolta."""
+from datetime import timedelta
 from logging import Logger, getLogger
 
 LOGGER: Logger = getLogger(__package__)
 
 NAME = "NeoVolta"
 DOMAIN = "neovolta"
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
 VERSION = "0.0.1"
 ATTRIBUTION = "Data provided by http://jsonplaceholder.typicode.com/"
+
+# static data read by the config flow and kept in the config entry
+CONF_SERIAL_NUMBER = "serial_number"
+
+# Modbus unit id of the inverter behind the data logger
+DEFAULT_SLAVE = 1
+
+# how Modbus travels to the data logger, and the serial number V5 needs
+CONF_TRANSPORT = "transport"
+CONF_LOGGER_SERIAL = "logger_serial"
+TRANSPORT_TCP = "tcp"
+TRANSPORT_RTU_OVER_TCP = "rtu_over_tcp"
+TRANSPORT_SOLARMAN_V5 = "solarman_v5"
+TRANSPORTS = [TRANSPORT_TCP, TRANSPORT_RTU_OVER_TCP, TRANSPORT_SOLARMAN_V5]
+
+# power, voltage and current are polled often, energy counters change slowly;
+# the fast interval is where the adaptive interval starts
+FAST_UPDATE_INTERVAL = timedelta(seconds=10)
+SLOW_UPDATE_INTERVAL = timedelta(minutes=5)
+# polls of all config entries together, and when an entry counts as slow
+MAX_CONCURRENT_POLLS = 4
+SLOW_POLL_SECONDS = 5.0
+# a single register is read this often to check the link between polls,
+# unless a poll got an answer within the last half interval
+HEARTBEAT_INTERVAL = timedelta(seconds=10)
+HEARTBEAT_TIMEOUT = 5.0
+# sent with the entry id when the connectivity of a NeoVolta changes
+SIGNAL_CONNECTIVITY = f"{DOMAIN}_connectivity_{{}}"
+# sensors write an unchanged state at least this often for long-term statistics
+SENSOR_HEARTBEAT = timedelta(minutes=10)
+# the last values are restored on startup, saved at most this often and on stop
+SNAPSHOT_SAVE_DELAY = timedelta(minutes=5)
+
+# probe which registers the device populates, again
+SERVICE_PROBE = "probe"
+SERVICE_WRITE_SETTINGS = "write_settings"
+SERVICE_SWEEP = "sweep"
+
+# option to record raw register blocks for offline analysis
+CONF_CAPTURE = "capture"
+# options bounding the adaptive poll interval of the fast registers, in seconds
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 120
+# option for how many block reads may be on the wire at once, per gateway
+CONF_MAX_IN_FLIGHT = "max_in_flight"
+DEFAULT_MAX_IN_FLIGHT = 1
+# options for the smallest change of a measurement its sensor writes a state for
+CONF_DEADBAND_VOLTAGE = "deadband_voltage"
+CONF_DEADBAND_CURRENT = "deadband_current"
+CONF_DEADBAND_FREQUENCY = "deadband_frequency"
+CONF_DEADBAND_POWER = "deadband_power"
+DEFAULT_DEADBAND_VOLTAGE = 0.2
+DEFAULT_DEADBAND_CURRENT = 0.1
+DEFAULT_DEADBAND_FREQUENCY = 0.05
+DEFAULT_DEADBAND_POWER = 10
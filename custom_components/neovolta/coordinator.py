@@ -1,22 +1,70 @@
 """DataUpdateCoordinator for neovolta."""
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
+import json
+import time
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    HomeAssistantError,
+    ServiceValidationError,
+)
+from homeassistant.util import dt as dt_util
 
 from .api import (
     NeovoltaApiClient,
     NeovoltaApiClientAuthenticationError,
+    NeovoltaApiClientCommunicationError,
+    NeovoltaApiClientDeviceError,
     NeovoltaApiClientError,
 )
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DOMAIN,
+    FAST_UPDATE_INTERVAL,
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_TIMEOUT,
+    LOGGER,
+    SIGNAL_CONNECTIVITY,
+    SLOW_UPDATE_INTERVAL,
+    SNAPSHOT_SAVE_DELAY,
+)
+from .backfill import StatisticsBackfill
+from .probe import UNSUPPORTED, async_probe
+from .registers import (
+    ALL_GROUPS,
+    GROUP_SETTINGS,
+    GROUP_SLOW,
+    KIND_SETTING,
+    REGISTERS,
+)
+from .retry import AdaptiveInterval
+from .scheduler import PollScheduler
+from .sweep import async_sweep
+
+# the fast group is polled on every tick, at the adaptive interval
+UPDATE_INTERVALS = {
+    GROUP_SLOW: SLOW_UPDATE_INTERVAL,
+    GROUP_SETTINGS: SLOW_UPDATE_INTERVAL,
+}
+
+SNAPSHOT_VERSION = 1
+CAPABILITIES_VERSION = 1
+SWEEP_VERSION = 1
 
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
@@ -29,21 +77,287 @@ class NeovoltaDataUpdateCoordinatoror(DataUpdateCoordinator):
         self,
         hass: HomeAssistant,
         client: NeovoltaApiClient,
+        scheduler: PollScheduler | None = None,
     ) -> None:
         """Initialize."""
         self.client = client
+        self._last_polled: dict[str, float] = {}
+        self._scheduler = scheduler
+        self._stagger = 0.0
+        # values restored from the last run until the first poll succeeds
+        self.stale = False
+        self.snapshot_time: datetime | None = None
+        # monotonic time the pending snapshot save is due, None when none is
+        self._save_due: float | None = None
+        # whether the device answered the last poll or heartbeat, None until then
+        self.connected: bool | None = None
+        # monotonic times of the last poll the device answered and of the next
+        # poll, heartbeats only fill the gaps between polls
+        self._last_contact = 0.0
+        self._next_poll: float | None = None
         super().__init__(
             hass=hass,
             logger=LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(minutes=2),
+            update_interval=FAST_UPDATE_INTERVAL,
+        )
+        options = self.config_entry.options
+        self._interval = AdaptiveInterval(
+            minimum=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+            maximum=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+            initial=FAST_UPDATE_INTERVAL.total_seconds(),
+        )
+        self.update_interval = timedelta(seconds=self._interval.interval)
+        if scheduler is not None:
+            self._stagger = (
+                scheduler.register(self.config_entry.entry_id)
+                * self.update_interval.total_seconds()
+            )
+        self._store = Store(
+            hass, SNAPSHOT_VERSION, f"{DOMAIN}.{self.config_entry.entry_id}"
+        )
+        self._backfill = StatisticsBackfill(hass, self.config_entry, client)
+        # register classification from the last probe, None until probed
+        self.capabilities: dict[str, str] | None = None
+        self._capability_store = Store(
+            hass,
+            CAPABILITIES_VERSION,
+            f"{DOMAIN}.{self.config_entry.entry_id}.capabilities",
+        )
+        # readable ranges and holes found by the last register sweep
+        self.sweep: dict | None = None
+        self._sweep_store = Store(
+            hass, SWEEP_VERSION, f"{DOMAIN}.{self.config_entry.entry_id}.sweep"
+        )
+
+    @callback
+    def async_start_heartbeat(self) -> CALLBACK_TYPE:
+        """Check the link between polls, return the callback stopping it."""
+        return async_track_time_interval(
+            self.hass,
+            self._async_heartbeat,
+            HEARTBEAT_INTERVAL,
+            name=f"{DOMAIN} heartbeat",
+        )
+
+    async def _async_heartbeat(self, _now: datetime | None = None) -> None:
+        """Read one register unless a poll answered or is due within an interval.
+
+        A lost link shows within seconds instead of after a poll ran out of
+        retries, and when the link comes back the coordinator polls right
+        away instead of waiting for the next, backed off, poll.
+        """
+        now = time.monotonic()
+        interval = HEARTBEAT_INTERVAL.total_seconds()
+        if now - self._last_contact < interval or (
+            self._next_poll is not None and self._next_poll - now < interval
+        ):
+            return
+        try:
+            await self.client.async_heartbeat(HEARTBEAT_TIMEOUT)
+        except NeovoltaApiClientCommunicationError as exception:
+            LOGGER.debug("%s heartbeat failed: %s", DOMAIN, exception)
+            self._set_connected(False)
+            return
+        except NeovoltaApiClientDeviceError:
+            # the device answered, if only to reject the read
+            pass
+        except NeovoltaApiClientError as exception:
+            LOGGER.debug("%s heartbeat failed: %s", DOMAIN, exception)
+            return
+        recovered = self.connected is False
+        self._set_connected(True)
+        if recovered:
+            LOGGER.debug("%s answers again, polling now", DOMAIN)
+            self.config_entry.async_create_background_task(
+                self.hass, self.async_request_refresh(), f"{DOMAIN} recovery refresh"
+            )
+
+    @callback
+    def _set_connected(self, connected: bool) -> None:
+        """Record whether the device answers and tell the connectivity sensor."""
+        if connected is not self.connected:
+            self.connected = connected
+            async_dispatcher_send(
+                self.hass, SIGNAL_CONNECTIVITY.format(self.config_entry.entry_id)
+            )
+
+    async def async_restore(self) -> bool:
+        """Load the values saved by the last run, marking them stale."""
+        if not (snapshot := await self._store.async_load()):
+            return False
+        self.client.data.update(snapshot["data"])
+        self.snapshot_time = dt_util.parse_datetime(snapshot["time"])
+        self.stale = True
+        return True
+
+    async def async_load_capabilities(self) -> None:
+        """Load the register classification of the last probe and sweep."""
+        self.capabilities = await self._capability_store.async_load()
+        self.sweep = await self._sweep_store.async_load()
+        self._confirm_settings()
+
+    def _confirm_settings(self) -> None:
+        """Poll the settings the last probe or sweep found on the device."""
+        confirmed = set()
+        for register in REGISTERS:
+            if register.kind != KIND_SETTING:
+                continue
+            if self.capabilities and self.capabilities.get(register.key) not in (
+                None,
+                UNSUPPORTED,
+            ):
+                confirmed.add(register.key)
+            elif self.sweep and any(
+                start <= register.address and register.end <= end
+                for start, end in self.sweep["readable"]
+            ):
+                confirmed.add(register.key)
+        self.client.set_readable_settings(confirmed)
+
+    async def async_probe(self) -> dict[str, str]:
+        """Probe which registers the device populates and keep the result."""
+        self.capabilities = await async_probe(self.client)
+        await self._capability_store.async_save(self.capabilities)
+        self._confirm_settings()
+        return self.capabilities
+
+    async def async_sweep(self, start: int, end: int) -> dict:
+        """Sweep the register space and dump the raw values to a file.
+
+        The readable ranges and holes are kept, so the next sweep skips the
+        holes without probing them again.
+        """
+        try:
+            result = await async_sweep(self.client, start, end, self.sweep)
+        except NeovoltaApiClientError as exception:
+            raise HomeAssistantError(
+                f"Sweeping NeoVolta registers failed: {exception}"
+            ) from exception
+        self.sweep = result.summary()
+        await self._sweep_store.async_save(self.sweep)
+        self._confirm_settings()
+        path = self.hass.config.path(
+            f"{DOMAIN}_{self.config_entry.entry_id}.sweep.json"
+        )
+        dump = {"time": dt_util.utcnow().isoformat(), **result.as_dict()}
+        await self.hass.async_add_executor_job(_write_json, path, dump)
+        LOGGER.info(
+            "Swept NeoVolta %s registers %s to %s in %s reads, wrote %s",
+            self.config_entry.title,
+            start,
+            result.end,
+            result.reads,
+            path,
+        )
+        return {**self.sweep, "path": path}
+
+    async def async_write(self, values: dict[str, int]) -> None:
+        """Write raw setting values and show what the device kept.
+
+        Only settings a probe or sweep found on the device are written: their
+        addresses come from related inverters.
+        """
+        if unconfirmed := sorted(values.keys() - self.client.readable_settings):
+            raise ServiceValidationError(
+                f"NeoVolta settings {unconfirmed} were not found on"
+                f" {self.config_entry.title}, probe or sweep its registers first"
+            )
+        try:
+            await self.client.async_write(values)
+        except NeovoltaApiClientError as exception:
+            raise HomeAssistantError(
+                f"Writing NeoVolta settings failed: {exception}"
+            ) from exception
+        finally:
+            # the values read back are in client.data, even when some differ
+            self.async_update_listeners()
+
+    async def async_save(self) -> None:
+        """Save the last values now, for the next setup to restore."""
+        if self.snapshot_time is not None:
+            self._save_due = None
+            await self._store.async_save(self._snapshot())
+
+    @callback
+    def _snapshot(self) -> dict:
+        """Return the values to save."""
+        return {
+            "time": self.snapshot_time.isoformat(),
+            "data": self.client.data.as_dict(),
+        }
+
+    def _due_groups(self) -> frozenset[str]:
+        """Return the register groups whose update interval has elapsed."""
+        now = time.monotonic()
+        # allow half a tick of slack so timer jitter does not skip a poll
+        slack = self.update_interval.total_seconds() / 2
+        return frozenset(
+            group
+            for group in ALL_GROUPS
+            if group not in UPDATE_INTERVALS
+            or group not in self._last_polled
+            or now - self._last_polled[group]
+            >= UPDATE_INTERVALS[group].total_seconds() - slack
         )
 
     async def _async_update_data(self):
         """Update data via library."""
+        if self._scheduler is None:
+            return await self._async_poll()
+
+        if self._stagger and self._last_polled:
+            # shift the first scheduled poll, later ones keep the phase
+            await asyncio.sleep(self._stagger)
+            self._stagger = 0.0
+        async with self._scheduler.poll(self.config_entry.entry_id):
+            return await self._async_poll()
+
+    def _adapt_interval(self, failed: bool) -> None:
+        """Poll faster while the link keeps up, back off when it struggles."""
+        metrics = self.client.metrics
+        interval = self._interval.update(
+            metrics.last_poll_latency, metrics.last_poll_retries, failed
+        )
+        if interval != self.update_interval.total_seconds():
+            LOGGER.debug("%s poll interval now %.1fs", DOMAIN, interval)
+            self.update_interval = timedelta(seconds=interval)
+        self._next_poll = time.monotonic() + interval
+
+    async def _async_poll(self):
+        """Poll the register groups that are due."""
+        groups = self._due_groups()
         try:
-            return await self.client.async_get_data()
+            data = await self.client.async_get_data(groups)
         except NeovoltaApiClientAuthenticationError as exception:
             raise ConfigEntryAuthFailed(exception) from exception
         except NeovoltaApiClientError as exception:
+            # poll every group once the device is back
+            self._last_polled.clear()
+            self._backfill.poll_failed()
+            self._adapt_interval(failed=True)
+            if isinstance(exception, NeovoltaApiClientCommunicationError):
+                self._set_connected(False)
             raise UpdateFailed(exception) from exception
+        self._adapt_interval(failed=False)
+        self._set_connected(True)
+
+        now = self._last_contact = time.monotonic()
+        self._last_polled.update(dict.fromkeys(groups, now))
+        self.stale = False
+        self.snapshot_time = dt_util.utcnow()
+        self._backfill.poll_succeeded()
+        # one delayed save per window, async_delay_save debounces and polls
+        # would keep pushing it back; the values are taken when it is written,
+        # also when Home Assistant stops first
+        if self._save_due is None or now >= self._save_due:
+            delay = SNAPSHOT_SAVE_DELAY.total_seconds()
+            self._save_due = now + delay
+            self._store.async_delay_save(self._snapshot, delay)
+        return data
+
+
+def _write_json(path: str, data: dict) -> None:
+    """Write data to path as JSON."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=1)
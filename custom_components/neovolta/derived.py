@@ -0,0 +1,134 @@
+"""Values derived from the decoded registers."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .values import RegisterValues
+
+KIND_POWER = "power"
+KIND_NET_ENERGY = "net_energy"
+KIND_EFFICIENCY = "efficiency"
+KIND_CHARGE_RATE = "charge_rate"
+
+# rates are taken over at least this many seconds, the registers are coarse
+RATE_WINDOW = 300.0
+
+
+@dataclass(frozen=True)
+class Derived:
+    """A value computed from registers read in the same poll."""
+
+    key: str
+    name: str
+    kind: str
+    inputs: tuple[str, ...]
+    formula: Callable[..., float | None]
+    # report the change of the formula per hour instead of its value
+    rate: bool = False
+
+
+def _ratio_percent(part: float, whole: float) -> float | None:
+    """Return part as a percentage of whole."""
+    return round(100 * part / whole, 1) if whole else None
+
+
+DERIVED: tuple[Derived, ...] = (
+    Derived(
+        "pv_power",
+        "PV Power",
+        KIND_POWER,
+        ("pv_voltage1", "pv_current1", "pv_voltage2", "pv_current2"),
+        lambda v1, i1, v2, i2: round(v1 * i1 + v2 * i2),
+    ),
+    Derived(
+        "battery_power",
+        "Battery Power",
+        KIND_POWER,
+        ("battery_voltage3", "battery_current"),
+        lambda voltage, current: round(voltage * current),
+    ),
+    Derived(
+        "net_grid_energy_today",
+        "Net Grid Energy Today",
+        KIND_NET_ENERGY,
+        ("energy_from_grid_today", "energy_to_grid_today"),
+        lambda imported, exported: round(imported - exported, 1),
+    ),
+    Derived(
+        "battery_round_trip_efficiency",
+        "Battery Round Trip Efficiency",
+        KIND_EFFICIENCY,
+        ("battery_discharged_cumulative", "battery_charged_cumulative"),
+        _ratio_percent,
+    ),
+    Derived(
+        "battery_charge_rate",
+        "Battery Charge Rate",
+        KIND_CHARGE_RATE,
+        ("battery_total",),
+        lambda soc: soc,
+        rate=True,
+    ),
+)
+
+DERIVED_BY_KEY: dict[str, Derived] = {derived.key: derived for derived in DERIVED}
+
+
+def input_keys(keys: Iterable[str]) -> set[str]:
+    """Return the register keys needed for keys, derived ones replaced by inputs."""
+    wanted = set()
+    for key in keys:
+        if (derived := DERIVED_BY_KEY.get(key)) is not None:
+            wanted.update(derived.inputs)
+        else:
+            wanted.add(key)
+    return wanted
+
+
+class DerivedValues:
+    """Evaluate derived values right after the registers are decoded.
+
+    Only the values with an input decoded in this poll are computed, from
+    the same snapshot, so they always agree with the registers they come
+    from.
+    """
+
+    def __init__(self, derived: tuple[Derived, ...] = DERIVED) -> None:
+        """Initialize."""
+        self._derived = derived
+        self._affected: dict[frozenset[str], tuple[Derived, ...]] = {}
+        # (value, time) at the start of the current window of each rate
+        self._windows: dict[str, tuple[float, float]] = {}
+
+    def update(self, data: RegisterValues, decoded: frozenset[str], now: float) -> None:
+        """Store the derived values depending on the decoded keys in data."""
+        if (affected := self._affected.get(decoded)) is None:
+            affected = self._affected[decoded] = tuple(
+                derived
+                for derived in self._derived
+                if not decoded.isdisjoint(derived.inputs)
+            )
+        for derived in affected:
+            inputs = [data.get(key) for key in derived.inputs]
+            value = None if None in inputs else derived.formula(*inputs)
+            if derived.rate:
+                value = self._rate(derived.key, value, now, data.get(derived.key))
+            data[derived.key] = value
+
+    def _rate(
+        self, key: str, value: float | None, now: float, last: float | None
+    ) -> float | None:
+        """Return the change of value per hour over the last full window."""
+        if value is None:
+            self._windows.pop(key, None)
+            return None
+        if (window := self._windows.get(key)) is None:
+            self._windows[key] = (value, now)
+            return None
+        if now - window[1] < RATE_WINDOW:
+            return last
+        self._windows[key] = (value, now)
+        return round((value - window[0]) * 3600 / (now - window[1]), 1)
@@ -0,0 +1,32 @@
+"""Diagnostics support for neovolta."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_LOGGER_SERIAL, CONF_SERIAL_NUMBER, DOMAIN
+from .coordinator import NeovoltaDataUpdateCoordinatoror
+
+# the title is the serial number of the inverter
+TO_REDACT = {CONF_HOST, CONF_LOGGER_SERIAL, CONF_SERIAL_NUMBER, "title"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: NeovoltaDataUpdateCoordinatoror = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "metrics": coordinator.client.metrics.as_dict(),
+        "poll_interval": coordinator.update_interval.total_seconds(),
+        "data": coordinator.client.data.as_dict(),
+        "blocks": [status.as_dict() for status in coordinator.client.blocks.values()],
+        "stale_keys": sorted(coordinator.client.stale_keys),
+        "capabilities": coordinator.capabilities,
+        "sweep": coordinator.sweep,
+    }
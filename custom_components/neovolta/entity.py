@@ -1,11 +1,14 @@
 """NeovoltaEntity class"""
 from __future__ import annotations
 
+from homeassistant.const import EntityCategory
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import ATTRIBUTION, DOMAIN, NAME, VERSION
 from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .settings import Setting
+from .values import INDEX
 
 
 class NeovoltaEntity(CoordinatorEntity):
@@ -23,3 +26,51 @@ class NeovoltaEntity(CoordinatorEntity):
             model=VERSION,
             manufacturer=NAME,
         )
+
+
+class NeovoltaSettingEntity(NeovoltaEntity):
+    """Base class of the entities for a writable setting."""
+
+    _attr_entity_category = EntityCategory.CONFIG
+    # the setting registers are guessed from related inverters, opt in to them
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self, coordinator: NeovoltaDataUpdateCoordinatoror, setting: Setting
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator)
+        self.setting = setting
+        self._index = INDEX[setting.key]
+        self._attr_unique_id = f"{self.coordinator.client.serial_number}_{setting.key}"
+
+    async def async_added_to_hass(self) -> None:
+        """Poll the register behind this setting while it is enabled."""
+        await super().async_added_to_hass()
+        self.coordinator.client.enable_key(self.setting.key)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop polling the register behind this setting."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.client.disable_key(self.setting.key)
+
+    @property
+    def available(self) -> bool:
+        """Return False until the setting is confirmed, or while its block fails."""
+        client = self.coordinator.client
+        return (
+            super().available
+            and self.setting.key in client.readable_settings
+            and self.setting.key not in client.stale_keys
+        )
+
+    @property
+    def value(self):
+        """Return the current value of the setting."""
+        return self.setting.decode(self.coordinator.client.data.at(self._index))
+
+    async def async_write(self, value) -> None:
+        """Write a new value of the setting."""
+        await self.coordinator.async_write(
+            {self.setting.key: self.setting.encode(value)}
+        )
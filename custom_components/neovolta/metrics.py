@@ -0,0 +1,167 @@
+"""Metrics kept by the NeoVolta API client."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed bucket histogram, cheap enough to update on every request."""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize."""
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a sample."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def as_dict(self) -> dict:
+        """Return the histogram as plain data."""
+        buckets = {
+            f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)
+        }
+        buckets["inf"] = self.counts[-1]
+        return {"count": self.count, "sum": round(self.total, 3), "buckets": buckets}
+
+
+class ClientMetrics:
+    """Counters and histograms describing how polling a device goes."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.polls = 0
+        self.polls_failed = 0
+        self.requests = 0
+        self.requests_failed = 0
+        self.registers_read = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connects = 0
+        self.reconnects = 0
+        # junk bytes skipped to find the next response frame
+        self.bytes_discarded = 0
+        # stream samples skipped because the consumer was busy
+        self.samples_dropped = 0
+        # attempts needed per request, keyed by attempt count
+        self.attempts: Counter[int] = Counter()
+        # errors keyed by exception or response type
+        self.errors: Counter[str] = Counter()
+        self.request_latency = Histogram()
+        self.poll_latency = Histogram()
+        self.last_poll_latency: float | None = None
+        # attempts beyond the first made by the last poll alone
+        self.last_poll_retries = 0
+        self.last_successful_poll: datetime | None = None
+
+    def record_request(self, registers: int, attempts: int, latency: float) -> None:
+        """Record a successful read of registers."""
+        self.requests += 1
+        self.attempts[attempts] += 1
+        self.registers_read += registers
+        self.request_latency.observe(latency)
+
+    def record_request_failed(self, attempts: int) -> None:
+        """Record a read that ran out of attempts."""
+        self.requests += 1
+        self.requests_failed += 1
+        self.attempts[attempts] += 1
+
+    def record_sent(self, count: int) -> None:
+        """Record bytes sent to the device."""
+        self.bytes_sent += count
+
+    def record_received(self, count: int) -> None:
+        """Record bytes received from the device."""
+        self.bytes_received += count
+
+    def record_error(self, error: str) -> None:
+        """Record an error, by name."""
+        self.errors[error] += 1
+
+    def record_discarded(self, count: int) -> None:
+        """Record junk bytes skipped in the response stream."""
+        self.bytes_discarded += count
+
+    def record_connect(self) -> None:
+        """Record opening a connection."""
+        if self.connects:
+            self.reconnects += 1
+        self.connects += 1
+
+    def record_dropped(self, samples: int) -> None:
+        """Record stream samples skipped for a slow consumer."""
+        self.samples_dropped += samples
+
+    def record_poll(self, latency: float, success: bool, retries: int) -> None:
+        """Record the outcome of a poll and the retries it needed."""
+        self.polls += 1
+        self.last_poll_retries = retries
+        if not success:
+            self.polls_failed += 1
+            return
+        self.poll_latency.observe(latency)
+        self.last_poll_latency = latency
+        self.last_successful_poll = datetime.now(timezone.utc)
+
+    @property
+    def retries(self) -> int:
+        """Return the attempts beyond the first, over all requests."""
+        return sum((attempts - 1) * count for attempts, count in self.attempts.items())
+
+    @property
+    def poll_success_rate(self) -> float | None:
+        """Return the percentage of polls that succeeded."""
+        if not self.polls:
+            return None
+        return round(100 * (self.polls - self.polls_failed) / self.polls, 1)
+
+    @property
+    def poll_latency_ms(self) -> float | None:
+        """Return the latency of the last successful poll in milliseconds."""
+        if self.last_poll_latency is None:
+            return None
+        return round(self.last_poll_latency * 1000)
+
+    def as_dict(self) -> dict:
+        """Return every metric as plain data."""
+        return {
+            "polls": self.polls,
+            "polls_failed": self.polls_failed,
+            "poll_success_rate": self.poll_success_rate,
+            "last_successful_poll": self.last_successful_poll,
+            "requests": self.requests,
+            "requests_failed": self.requests_failed,
+            "attempts": dict(sorted(self.attempts.items())),
+            "errors": dict(self.errors),
+            "registers_read": self.registers_read,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "bytes_discarded": self.bytes_discarded,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "samples_dropped": self.samples_dropped,
+            "request_latency": self.request_latency.as_dict(),
+            "poll_latency": self.poll_latency.as_dict(),
+        }
+
+    def __str__(self) -> str:
+        """Return a one line summary for the debug log."""
+        return (
+            f"polls {self.polls} (failed {self.polls_failed}), "
+            f"requests {self.requests} (failed {self.requests_failed}), "
+            f"attempts {dict(sorted(self.attempts.items()))}, "
+            f"errors {dict(self.errors)}, "
+            f"connects {self.connects}"
+        )
@@ -0,0 +1,53 @@
+"""Number platform for neovolta."""
+from __future__ import annotations
+
+from homeassistant.components.number import (
+    NumberEntity,
+    NumberEntityDescription,
+    NumberMode,
+)
+from homeassistant.const import Platform
+
+from .const import DOMAIN
+from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .entity import NeovoltaSettingEntity
+from .registers import REGISTERS_BY_KEY
+from .settings import SETTINGS, Setting
+
+
+async def async_setup_entry(hass, entry, async_add_devices):
+    """Setup number platform."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_devices(
+        NeovoltaNumber(coordinator=coordinator, setting=setting)
+        for setting in SETTINGS
+        if setting.platform == Platform.NUMBER
+    )
+
+
+class NeovoltaNumber(NeovoltaSettingEntity, NumberEntity):
+    """neovolta Number class."""
+
+    def __init__(
+        self, coordinator: NeovoltaDataUpdateCoordinatoror, setting: Setting
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, setting)
+        self.entity_description = NumberEntityDescription(
+            key=setting.key,
+            name=REGISTERS_BY_KEY[setting.key].name,
+            native_min_value=setting.minimum,
+            native_max_value=setting.maximum,
+            native_step=1,
+            native_unit_of_measurement=setting.unit,
+            mode=NumberMode.BOX,
+        )
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the current value."""
+        return self.value
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Write a new value."""
+        await self.async_write(int(value))
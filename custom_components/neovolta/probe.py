@@ -0,0 +1,150 @@
+"""Probe which registers an inverter actually populates."""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .api import (
+    NeovoltaApiClient,
+    NeovoltaApiClientCommunicationError,
+    NeovoltaApiClientError,
+)
+from .const import CONF_SERIAL_NUMBER, DOMAIN, FAST_UPDATE_INTERVAL, LOGGER
+from .derived import DERIVED_BY_KEY
+from .registers import (
+    KIND_CURRENT,
+    KIND_FREQUENCY,
+    KIND_VOLTAGE,
+    REGISTERS,
+    REGISTERS_BY_KEY,
+    DecodePlan,
+    plan_reads,
+)
+
+LIVE = "live"
+CONSTANT = "constant"
+ABSENT = "absent"
+UNSUPPORTED = "unsupported"
+
+# kinds that do not rest at zero on a connected PV string, phase or battery,
+# unlike the state of charge and the energy counters
+ZERO_MEANS_ABSENT = frozenset((KIND_CURRENT, KIND_FREQUENCY, KIND_VOLTAGE))
+
+PROBE_SAMPLES = 3
+
+# platforms of the writable settings, whose entities are opt in
+SETTING_DOMAINS = frozenset(("number", "select", "time"))
+
+
+async def async_probe(
+    client: NeovoltaApiClient,
+    samples: int = PROBE_SAMPLES,
+    interval: float = FAST_UPDATE_INTERVAL.total_seconds(),
+) -> dict[str, str]:
+    """Sample every register a few times and classify it by key.
+
+    Registers whose value changed are live, registers the device rejects
+    are unsupported. A voltage, current or frequency that read zero every
+    time is absent, everything else is constant. A block the device
+    rejects is read again register by register, so one unsupported register
+    does not take its neighbours down with it.
+    """
+    plans: list[DecodePlan] = list(plan_reads())
+    seen: dict[str, set[float]] = {register.key: set() for register in REGISTERS}
+    unsupported: set[str] = set()
+    for sample in range(samples):
+        if sample:
+            await asyncio.sleep(interval)
+        readable = []
+        for plan in plans:
+            try:
+                values = await client.async_read_block(plan)
+            except NeovoltaApiClientCommunicationError:
+                raise
+            except NeovoltaApiClientError:
+                if len(plan.keys) == 1:
+                    unsupported.update(plan.keys)
+                    continue
+                # read the registers of the block one at a time, still this pass
+                plans.extend(
+                    DecodePlan(
+                        REGISTERS_BY_KEY[key].address,
+                        REGISTERS_BY_KEY[key].width,
+                        [REGISTERS_BY_KEY[key]],
+                    )
+                    for key in plan.keys
+                )
+                continue
+            readable.append(plan)
+            for key, value in values.items():
+                seen[key].add(value)
+        plans = readable
+
+    capabilities = {}
+    for key, values in seen.items():
+        if key in unsupported or not values:
+            capabilities[key] = UNSUPPORTED
+        elif values == {0} and REGISTERS_BY_KEY[key].kind in ZERO_MEANS_ABSENT:
+            capabilities[key] = ABSENT
+        else:
+            capabilities[key] = LIVE if len(values) > 1 else CONSTANT
+    return capabilities
+
+
+def is_useful(key: str, capabilities: dict[str, str] | None) -> bool:
+    """Return True when an entity for key is worth enabling.
+
+    A probe lasts seconds, too short to tell a constant register from one
+    that moves slowly, like the state of charge or an energy counter, so
+    constant registers are kept. Registers the device rejects are left out,
+    and so are absent ones: a PV string or phase that is not connected. A
+    derived value is useful unless one of its inputs is unsupported.
+    """
+    if capabilities is None:
+        return True
+    if (derived := DERIVED_BY_KEY.get(key)) is not None:
+        return all(capabilities.get(k) != UNSUPPORTED for k in derived.inputs)
+    return capabilities.get(key) not in (ABSENT, UNSUPPORTED)
+
+
+async def async_apply_capabilities(
+    hass: HomeAssistant, entry: ConfigEntry, capabilities: dict[str, str]
+) -> None:
+    """Enable the useful register and derived sensors and disable the others.
+
+    Only entities the integration disabled are enabled again; a sensor the
+    user disabled stays disabled. Settings the device rejects are disabled
+    too, but the others stay opt in.
+    """
+    registry = er.async_get(hass)
+    prefix = f"{entry.data[CONF_SERIAL_NUMBER]}_"
+    for entity in er.async_entries_for_config_entry(registry, entry.entry_id):
+        key = entity.unique_id.removeprefix(prefix)
+        if key not in REGISTERS_BY_KEY and key not in DERIVED_BY_KEY:
+            continue
+        if entity.domain in SETTING_DOMAINS:
+            if not is_useful(key, capabilities) and entity.disabled_by is None:
+                registry.async_update_entity(
+                    entity.entity_id,
+                    disabled_by=er.RegistryEntryDisabler.INTEGRATION,
+                )
+            continue
+        if is_useful(key, capabilities):
+            if entity.disabled_by is er.RegistryEntryDisabler.INTEGRATION:
+                registry.async_update_entity(entity.entity_id, disabled_by=None)
+        elif entity.disabled_by is None:
+            registry.async_update_entity(
+                entity.entity_id, disabled_by=er.RegistryEntryDisabler.INTEGRATION
+            )
+    LOGGER.info(
+        "%s %s registers: %s",
+        DOMAIN,
+        entry.title,
+        {
+            capability: sum(1 for c in capabilities.values() if c == capability)
+            for capability in (LIVE, CONSTANT, ABSENT, UNSUPPORTED)
+        },
+    )
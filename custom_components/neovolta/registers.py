@@ -0,0 +1,360 @@
+"""NeoVolta register map."""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from operator import mul
+import struct
+
+KIND_BATTERY = "battery"
+KIND_CURRENT = "current"
+KIND_ENERGY = "energy"
+KIND_FREQUENCY = "frequency"
+KIND_VOLTAGE = "voltage"
+# writable settings, see settings.py
+KIND_SETTING = "setting"
+
+# power, voltage, current and frequency registers
+GROUP_FAST = "fast"
+# daily and cumulative energy counters
+GROUP_SLOW = "slow"
+# writable settings, read in blocks of their own since their addresses are
+# guessed from related inverters, and only once the device is known to have them
+GROUP_SETTINGS = "settings"
+ALL_GROUPS = frozenset((GROUP_FAST, GROUP_SLOW, GROUP_SETTINGS))
+
+# struct format characters keyed by (width, signed)
+_FORMATS = {
+    (1, False): "H",
+    (1, True): "h",
+    (2, False): "I",
+    (2, True): "i",
+}
+
+
+@dataclass(frozen=True)
+class Register:
+    """A holding register exposed by the inverter."""
+
+    address: int
+    key: str
+    name: str
+    kind: str
+    scale: float = 1.0
+    width: int = 1
+    signed: bool = False
+    group: str = GROUP_FAST
+
+    @property
+    def end(self) -> int:
+        """Return the address after the last word of the register."""
+        return self.address + self.width
+
+
+REGISTERS: tuple[Register, ...] = (
+    Register(24, "energy24", "Energy 24", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(65, "energy65", "Energy 65", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(66, "energy66", "Energy 66", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(68, "energy68", "Energy 68", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(
+        70,
+        "battery_charged_today",
+        "Battery Charged Today",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        71,
+        "battery_discharged_today",
+        "Battery Discharged Today",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        72,
+        "battery_charged_cumulative",
+        "Battery Charged Cumulative",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        74,
+        "battery_discharged_cumulative",
+        "Battery Discharged Cumulative",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        76,
+        "energy_from_grid_today",
+        "Energy From Grid Today",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        77,
+        "energy_to_grid_today",
+        "Energy To Grid Today",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        78,
+        "energy_from_grid_cumulative",
+        "Energy From Grid Cumulative",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(79, "grid_frequency", "Grid Frequency", KIND_FREQUENCY, 0.01),
+    Register(
+        81,
+        "energy_to_grid_cumulative",
+        "Energy to Grid Cumulative",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        84,
+        "energy_consumed_today",
+        "Energy Consumed Today",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(
+        85,
+        "energy_consumed_cumulative",
+        "Energy Consumed Cumulative",
+        KIND_ENERGY,
+        0.1,
+        group=GROUP_SLOW,
+    ),
+    Register(87, "energy87", "Energy 87", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(96, "energy96", "Energy 96", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(
+        108, "daily_generation", "Daily Generation", KIND_ENERGY, 0.1, group=GROUP_SLOW
+    ),
+    Register(109, "pv_voltage1", "PV Voltage1", KIND_VOLTAGE, 0.1),
+    Register(110, "pv_current1", "PV Current1", KIND_CURRENT, 0.1),
+    Register(111, "pv_voltage2", "PV Voltage2", KIND_VOLTAGE, 0.1),
+    Register(112, "pv_current2", "PV Current2", KIND_CURRENT, 0.1),
+    Register(126, "battery_voltage1", "Battery Voltage TBD1", KIND_VOLTAGE, 0.01),
+    Register(131, "energy131", "Energy 131", KIND_ENERGY, 0.1, group=GROUP_SLOW),
+    Register(132, "current132", "Current 132", KIND_CURRENT, 0.01),
+    Register(133, "current133", "Current 133", KIND_CURRENT, 0.01),
+    Register(138, "grid_voltage_rua", "Grid Voltage R/U/A", KIND_VOLTAGE, 0.1),
+    Register(139, "grid_voltage_svb", "Grid Voltage S/V/B", KIND_VOLTAGE, 0.1),
+    Register(140, "grid_voltage_rsuvab", "Grid Voltage RS/UV/AB", KIND_VOLTAGE, 0.1),
+    Register(142, "work_mode", "Work Mode", KIND_SETTING, group=GROUP_SETTINGS),
+    Register(143, "battery_voltage2", "Battery Voltage TBD2", KIND_VOLTAGE, 0.01),
+    Register(148, "voltage148", "Voltage 148", KIND_VOLTAGE, 0.1),
+    Register(149, "voltage149", "Voltage 149", KIND_VOLTAGE, 0.1),
+    Register(150, "voltage150", "Voltage 150", KIND_VOLTAGE, 0.1),
+    Register(151, "voltage151", "Voltage 151", KIND_VOLTAGE, 0.1),
+    Register(152, "voltage152", "Voltage 152", KIND_VOLTAGE, 0.1),
+    Register(153, "voltage153", "Voltage 153", KIND_VOLTAGE, 0.1),
+    Register(154, "voltage154", "Voltage 154", KIND_VOLTAGE, 0.1),
+    Register(155, "voltage155", "Voltage 155", KIND_VOLTAGE, 0.1),
+    Register(156, "voltage156", "Voltage 156", KIND_VOLTAGE, 0.1),
+    Register(157, "voltage157", "Voltage 157", KIND_VOLTAGE, 0.1),
+    Register(158, "voltage158", "Voltage 158", KIND_VOLTAGE, 0.1),
+    Register(160, "grid_current_rua", "Grid Current R/U/A", KIND_CURRENT, 0.01),
+    Register(161, "grid_current_svb", "Grid Current S/V/B", KIND_CURRENT, 0.01),
+    Register(162, "meter_ac_current_a", "Meter AC Current A", KIND_CURRENT, 0.01),
+    Register(163, "meter_ac_current_b", "Meter AC Current B", KIND_CURRENT, 0.01),
+    Register(164, "current164", "Current 164", KIND_CURRENT, 0.01),
+    Register(165, "current165", "Current 165", KIND_CURRENT, 0.01),
+    Register(166, "current166", "Current 166", KIND_CURRENT, 0.01),
+    Register(176, "current176", "Current 176", KIND_CURRENT, 0.01),
+    Register(177, "current177", "Current 177", KIND_CURRENT, 0.01),
+    Register(178, "current178", "Current 178", KIND_CURRENT, 0.01),
+    Register(179, "current179", "Current 179", KIND_CURRENT, 0.01),
+    Register(180, "current180", "Current 180", KIND_CURRENT, 0.01),
+    Register(181, "voltage181", "Voltage 181", KIND_VOLTAGE, 0.1),
+    Register(182, "voltage182", "Voltage 182", KIND_VOLTAGE, 0.1),
+    Register(183, "battery_voltage3", "Battery Voltage TBD3", KIND_VOLTAGE, 0.01),
+    Register(184, "battery_total", "Battery Total", KIND_BATTERY),
+    Register(185, "current185", "Current 185", KIND_CURRENT, 0.01),
+    Register(
+        191, "battery_current", "Battery Current", KIND_CURRENT, 0.01, signed=True
+    ),
+    Register(
+        210,
+        "battery_max_charge_current",
+        "Battery Max Charge Current",
+        KIND_SETTING,
+        group=GROUP_SETTINGS,
+    ),
+    Register(
+        211,
+        "battery_max_discharge_current",
+        "Battery Max Discharge Current",
+        KIND_SETTING,
+        group=GROUP_SETTINGS,
+    ),
+    *(
+        Register(
+            250 + slot,
+            f"time_of_use_time{slot + 1}",
+            f"Time Of Use Time{slot + 1}",
+            KIND_SETTING,
+            group=GROUP_SETTINGS,
+        )
+        for slot in range(6)
+    ),
+    *(
+        Register(
+            268 + slot,
+            f"time_of_use_soc{slot + 1}",
+            f"Time Of Use SOC{slot + 1}",
+            KIND_SETTING,
+            group=GROUP_SETTINGS,
+        )
+        for slot in range(6)
+    ),
+    Register(192, "frequency2", "Frequency2", KIND_FREQUENCY, 0.01),
+    Register(193, "frequency3", "Frequency3", KIND_FREQUENCY, 0.01),
+    Register(314, "current314", "Current 314", KIND_CURRENT, 0.1),
+    Register(315, "current315", "Current 315", KIND_CURRENT, 0.1),
+    Register(316, "battery_tbd", "Battery TBD", KIND_BATTERY),
+    Register(317, "bms_voltage", "BMS Voltage", KIND_VOLTAGE, 0.01),
+    Register(319, "voltage319", "Voltage 319", KIND_VOLTAGE, 0.1),
+    Register(344, "frequency4", "Frequency4", KIND_FREQUENCY, 0.01),
+)
+
+REGISTERS_BY_KEY: dict[str, Register] = {
+    register.key: register for register in REGISTERS
+}
+# position of each register in the arrays of values.RegisterValues
+REGISTER_INDEX: dict[str, int] = {
+    register.key: index for index, register in enumerate(REGISTERS)
+}
+
+# most data loggers reject reads longer than this, below the Modbus limit of 125
+MAX_READ_COUNT = 100
+# never read across more unused registers than this, they may be unreadable
+MAX_READ_GAP = 64
+# cost of one extra read, in registers, on a slow data logger link
+READ_COST = 50
+
+
+class DecodePlan:
+    """Precompiled decoder for one block of holding registers.
+
+    The layout of the block is turned into a single struct format once, so
+    decoding a response is one pack, one unpack and one scaling pass.
+    """
+
+    __slots__ = ("start", "count", "keys", "_indexes", "_scales", "_pack", "_unpack")
+
+    def __init__(self, start: int, count: int, registers: list[Register]) -> None:
+        """Initialize."""
+        self.start = start
+        self.count = count
+        registers = sorted(registers, key=lambda register: register.address)
+        fmt = ">"
+        position = start
+        for register in registers:
+            if register.address < position or register.end > start + count:
+                raise ValueError(
+                    f"Register {register.key} does not fit block {start}+{count}"
+                )
+            fmt += "x" * (2 * (register.address - position))
+            fmt += _FORMATS[(register.width, register.signed)]
+            position = register.end
+        self.keys = tuple(register.key for register in registers)
+        self._indexes = tuple(REGISTER_INDEX[key] for key in self.keys)
+        self._scales = tuple(float(register.scale) for register in registers)
+        self._pack = struct.Struct(f">{count}H").pack
+        self._unpack = struct.Struct(fmt).unpack_from
+
+    def decode(self, registers: list[int], data: dict) -> None:
+        """Decode raw register words into scaled values stored in data."""
+        raw = self._unpack(self._pack(*registers[: self.count]))
+        data.update(zip(self.keys, map(mul, raw, self._scales)))
+
+    def decode_into(self, registers: list[int], values: array) -> None:
+        """Decode raw register words into their slots of a values array."""
+        raw = self._unpack(self._pack(*registers[: self.count]))
+        for index, value in zip(self._indexes, map(mul, raw, self._scales)):
+            values[index] = value
+
+
+def plan_reads(
+    keys: set[str] | None = None,
+    groups: frozenset[str] | None = None,
+    registers: tuple[Register, ...] = REGISTERS,
+    max_gap: int = MAX_READ_GAP,
+    max_count: int = MAX_READ_COUNT,
+) -> tuple[DecodePlan, ...]:
+    """Plan the cheapest set of reads that covers the wanted registers.
+
+    Neighbouring registers are coalesced into one read when the gap between
+    them is at most max_gap and the read stays within max_count registers.
+    Among those, the split with the lowest total cost is chosen, counting
+    READ_COST per read plus one per register transferred. When keys or groups
+    is None, registers are not filtered on it. Settings are never read in the
+    same block as sensor registers, so a device without them only fails
+    their blocks.
+    """
+    wanted = sorted(
+        (
+            register
+            for register in registers
+            if (keys is None or register.key in keys)
+            and (groups is None or register.group in groups)
+        ),
+        key=lambda register: register.address,
+    )
+    return _plan_blocks(
+        [register for register in wanted if register.group != GROUP_SETTINGS],
+        max_gap,
+        max_count,
+    ) + _plan_blocks(
+        [register for register in wanted if register.group == GROUP_SETTINGS],
+        max_gap,
+        max_count,
+    )
+
+
+def _plan_blocks(
+    wanted: list[Register], max_gap: int, max_count: int
+) -> tuple[DecodePlan, ...]:
+    """Return the cheapest blocks covering wanted, sorted by address."""
+    # best[i] is the cheapest (cost, start of last block) covering wanted[:i]
+    best: list[tuple[int, int]] = [(0, 0)]
+    for i in range(1, len(wanted) + 1):
+        end = wanted[i - 1].end
+        candidate = None
+        for j in range(i - 1, -1, -1):
+            if end - wanted[j].address > max_count:
+                break
+            if j < i - 1 and wanted[j + 1].address - wanted[j].end > max_gap:
+                break
+            cost = best[j][0] + READ_COST + end - wanted[j].address
+            if candidate is None or cost < candidate[0]:
+                candidate = (cost, j)
+        best.append(candidate)
+
+    plans = []
+    i = len(wanted)
+    while i:
+        j = best[i][1]
+        plans.append(_block_plan(wanted[j:i]))
+        i = j
+    return tuple(reversed(plans))
+
+
+def _block_plan(block: list[Register]) -> DecodePlan:
+    """Return the decode plan for a contiguous run of registers."""
+    start = block[0].address
+    end = max(register.end for register in block)
+    return DecodePlan(start, end - start, block)
@@ -0,0 +1,115 @@
+"""Retry policy and circuit breaker for the NeoVolta API client."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import random
+import time
+
+from .transport import (
+    ACKNOWLEDGE,
+    DEVICE_BUSY,
+    GATEWAY_NO_RESPONSE,
+    GATEWAY_PATH_UNAVAILABLE,
+)
+
+# device exception codes worth retrying, everything else is a permanent rejection
+RETRYABLE_EXCEPTION_CODES = frozenset(
+    (ACKNOWLEDGE, DEVICE_BUSY, GATEWAY_PATH_UNAVAILABLE, GATEWAY_NO_RESPONSE)
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with jitter, bounded by a deadline per poll."""
+
+    attempts: int = 5
+    attempt_timeout: float = 10.0
+    deadline: float = 45.0
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, retry: int) -> float:
+        """Return the delay before the given retry, starting at 1."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        # "equal jitter" keeps a floor so a struggling logger gets some rest
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class CircuitBreaker:
+    """Stop talking to a device that keeps failing.
+
+    After failure_threshold consecutive failed polls the breaker opens and
+    requests fail fast. Once reset_timeout has passed it goes half open and
+    lets a single cheap probe through; success closes it, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        """Initialize."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+
+    @property
+    def state(self) -> str:
+        """Return the breaker state, moving from open to half open on time."""
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        self.failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        """Count a failed poll, opening the breaker at the threshold."""
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class AdaptiveInterval:
+    """Poll as often as the link sustains, within bounds.
+
+    A poll that is clean and fast shortens the interval by step, one that
+    needed retries or failed multiplies it by backoff. The interval never
+    drops below headroom times the latency of the last poll, so polling
+    leaves the data logger most of its time to itself.
+    """
+
+    def __init__(
+        self,
+        minimum: float,
+        maximum: float,
+        initial: float,
+        step: float = 1.0,
+        backoff: float = 2.0,
+        headroom: float = 4.0,
+    ) -> None:
+        """Initialize."""
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.step = step
+        self.backoff = backoff
+        self.headroom = headroom
+        self.interval = min(self.maximum, max(minimum, initial))
+
+    def update(self, latency: float | None, retries: int, failed: bool) -> float:
+        """Return the next interval, given how the last poll went."""
+        if failed or retries:
+            self.interval = min(self.maximum, self.interval * self.backoff)
+        elif latency is not None:
+            floor = max(self.minimum, latency * self.headroom)
+            if self.interval > floor:
+                self.interval = max(floor, self.interval - self.step)
+        return self.interval
@@ -0,0 +1,109 @@
+"""Poll scheduling shared by every NeoVolta config entry."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import itertools
+import time
+
+from .const import MAX_CONCURRENT_POLLS, SLOW_POLL_SECONDS
+
+# spreads any number of entries evenly over the interval, in join order
+GOLDEN_RATIO = 0.6180339887
+
+# weight of the latest poll in the moving average of poll durations
+DURATION_SMOOTHING = 0.3
+
+
+class PollScheduler:
+    """Stagger and limit polls across config entries.
+
+    Each entry gets a start offset within the update interval so entries do
+    not poll in lockstep. At most max_concurrent polls run at once; healthy
+    entries are let through first, and entries whose polls are slow may only
+    take half the slots so they cannot hold up everyone else.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_POLLS) -> None:
+        """Initialize."""
+        self.max_concurrent = max_concurrent
+        self._running = 0
+        self._running_slow = 0
+        self._durations: dict[str, float] = {}
+        self._joined = itertools.count()
+        self._order = itertools.count()
+        # (slow, order, future) of polls waiting for a slot
+        self._waiters: list[tuple[bool, int, asyncio.Future]] = []
+
+    def register(self, name: str) -> float:
+        """Add an entry and return its start offset as a fraction of the interval."""
+        self._durations.setdefault(name, 0.0)
+        return (next(self._joined) * GOLDEN_RATIO) % 1
+
+    def unregister(self, name: str) -> None:
+        """Forget an entry."""
+        self._durations.pop(name, None)
+
+    def is_slow(self, name: str) -> bool:
+        """Return True when recent polls of the entry were slow."""
+        return self._durations.get(name, 0.0) > SLOW_POLL_SECONDS
+
+    @asynccontextmanager
+    async def poll(self, name: str) -> AsyncIterator[None]:
+        """Hold a poll slot for the duration of the block."""
+        slow = self.is_slow(name)
+        await self._acquire(slow)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start
+            if name in self._durations:
+                self._durations[name] += DURATION_SMOOTHING * (
+                    duration - self._durations[name]
+                )
+            self._release(slow)
+
+    def _can_start(self, slow: bool) -> bool:
+        """Return True when a poll of the given kind may start now."""
+        if self._running >= self.max_concurrent:
+            return False
+        return not slow or self._running_slow < max(1, self.max_concurrent // 2)
+
+    def _start(self, slow: bool) -> None:
+        """Take a slot."""
+        self._running += 1
+        self._running_slow += slow
+
+    async def _acquire(self, slow: bool) -> None:
+        """Wait for a slot."""
+        # anyone still waiting could not start at the last release either
+        if self._can_start(slow):
+            self._start(slow)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((slow, next(self._order), future))
+        self._waiters.sort(key=lambda waiter: waiter[:2])
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just before the cancellation
+                self._release(slow)
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+            raise
+
+    def _release(self, slow: bool) -> None:
+        """Give a slot back and hand free slots to waiting polls."""
+        self._running -= 1
+        self._running_slow -= slow
+        waiting = []
+        for waiter in self._waiters:
+            if not waiter[2].done() and self._can_start(waiter[0]):
+                self._start(waiter[0])
+                waiter[2].set_result(None)
+            elif not waiter[2].done():
+                waiting.append(waiter)
+        self._waiters = waiting
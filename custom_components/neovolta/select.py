@@ -0,0 +1,46 @@
+"""Select platform for neovolta."""
+from __future__ import annotations
+
+from homeassistant.components.select import SelectEntity, SelectEntityDescription
+from homeassistant.const import Platform
+
+from .const import DOMAIN
+from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .entity import NeovoltaSettingEntity
+from .registers import REGISTERS_BY_KEY
+from .settings import SETTINGS, Setting
+
+
+async def async_setup_entry(hass, entry, async_add_devices):
+    """Setup select platform."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_devices(
+        NeovoltaSelect(coordinator=coordinator, setting=setting)
+        for setting in SETTINGS
+        if setting.platform == Platform.SELECT
+    )
+
+
+class NeovoltaSelect(NeovoltaSettingEntity, SelectEntity):
+    """neovolta Select class."""
+
+    def __init__(
+        self, coordinator: NeovoltaDataUpdateCoordinatoror, setting: Setting
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, setting)
+        self.entity_description = SelectEntityDescription(
+            key=setting.key,
+            name=REGISTERS_BY_KEY[setting.key].name,
+            translation_key=setting.key,
+            options=list(setting.options),
+        )
+
+    @property
+    def current_option(self) -> str | None:
+        """Return the selected option."""
+        return self.value
+
+    async def async_select_option(self, option: str) -> None:
+        """Write the selected option."""
+        await self.async_write(option)
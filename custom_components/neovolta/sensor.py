@@ -1,170 +1,208 @@
 """Sensor platform for neovolta."""
 from __future__ import annotations
 from dataclasses import dataclass
+from datetime import datetime
+import time
+
 from homeassistant.components.sensor import (
     SensorEntity,
     SensorEntityDescription,
     SensorDeviceClass,
     SensorStateClass,
 )
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .const import (
+    CONF_DEADBAND_CURRENT,
+    CONF_DEADBAND_FREQUENCY,
+    CONF_DEADBAND_POWER,
+    CONF_DEADBAND_VOLTAGE,
+    DEFAULT_DEADBAND_CURRENT,
+    DEFAULT_DEADBAND_FREQUENCY,
+    DEFAULT_DEADBAND_POWER,
+    DEFAULT_DEADBAND_VOLTAGE,
+    DOMAIN,
+    SENSOR_HEARTBEAT,
+)
 from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .derived import (
+    DERIVED,
+    DERIVED_BY_KEY,
+    KIND_CHARGE_RATE,
+    KIND_EFFICIENCY,
+    KIND_NET_ENERGY,
+    KIND_POWER,
+)
 from .entity import NeovoltaEntity
+from .probe import is_useful
+from .registers import (
+    KIND_BATTERY,
+    KIND_CURRENT,
+    KIND_ENERGY,
+    KIND_FREQUENCY,
+    KIND_SETTING,
+    KIND_VOLTAGE,
+    REGISTERS,
+    REGISTERS_BY_KEY,
+)
+from .values import INDEX
 
 
+@dataclass
 class NeovoltaBatteryDescription(SensorEntityDescription):
     """Battery description."""
 
-    def __init__(self, key, name):
-        """Initialize."""
-        super().__init__(key=key, name=name)
-        self.device_class = SensorDeviceClass.BATTERY
-        self.native_unit_of_measurement = "%"
-        self.state_class = SensorStateClass.MEASUREMENT
+    device_class: SensorDeviceClass | None = SensorDeviceClass.BATTERY
+    native_unit_of_measurement: str | None = "%"
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
 
 
+@dataclass
 class NeovoltaEnergyDescription(SensorEntityDescription):
     """Energy description."""
 
-    def __init__(self, key, name):
-        """Initialize."""
-        super().__init__(key=key, name=name)
-        self.device_class = SensorDeviceClass.ENERGY
-        self.native_unit_of_measurement = "kWh"
-        self.state_class = SensorStateClass.TOTAL_INCREASING
+    device_class: SensorDeviceClass | None = SensorDeviceClass.ENERGY
+    native_unit_of_measurement: str | None = "kWh"
+    state_class: SensorStateClass | None = SensorStateClass.TOTAL_INCREASING
 
 
+@dataclass
 class NeovoltaVoltageDescription(SensorEntityDescription):
     """Voltage description."""
 
-    def __init__(self, key, name):
-        """Initialize."""
-        super().__init__(key=key, name=name)
-        self.device_class = SensorDeviceClass.VOLTAGE
-        self.native_unit_of_measurement = "V"
-        self.suggested_display_precision = 2
-        self.state_class = SensorStateClass.MEASUREMENT
+    device_class: SensorDeviceClass | None = SensorDeviceClass.VOLTAGE
+    native_unit_of_measurement: str | None = "V"
+    suggested_display_precision: int | None = 2
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
 
 
+@dataclass
 class NeovoltaCurrentDescription(SensorEntityDescription):
     """Current description."""
 
-    def __init__(self, key, name):
-        """Initialize."""
-        super().__init__(key=key, name=name)
-        self.device_class = SensorDeviceClass.CURRENT
-        self.native_unit_of_measurement = "A"
-        self.suggested_display_precision = 2
-        self.state_class = SensorStateClass.MEASUREMENT
+    device_class: SensorDeviceClass | None = SensorDeviceClass.CURRENT
+    native_unit_of_measurement: str | None = "A"
+    suggested_display_precision: int | None = 2
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
 
 
+@dataclass
 class NeovoltaFrequencyDescription(SensorEntityDescription):
     """Frequency description."""
 
-    def __init__(self, key, name):
-        """Initialize."""
-        super().__init__(key=key, name=name)
-        self.device_class = SensorDeviceClass.FREQUENCY
-        self.native_unit_of_measurement = "Hz"
-        self.suggested_display_precision = 2
-        self.state_class = SensorStateClass.MEASUREMENT
+    device_class: SensorDeviceClass | None = SensorDeviceClass.FREQUENCY
+    native_unit_of_measurement: str | None = "Hz"
+    suggested_display_precision: int | None = 2
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
 
 
-ENTITY_DESCRIPTIONS = (
-    NeovoltaBatteryDescription(key="battery_total", name="Battery Total"),
-    NeovoltaBatteryDescription(key="battery_tbd", name="Battery TBD"),
-    NeovoltaEnergyDescription(
-        key="energy_from_grid_cumulative", name="Energy From Grid Cumulative"
-    ),
-    NeovoltaEnergyDescription(key="daily_generation", name="Daily Generation"),
-    NeovoltaEnergyDescription(
-        key="battery_charged_today",
-        name="Battery Charged Today",
-    ),
-    NeovoltaEnergyDescription(
-        key="battery_discharged_today",
-        name="Battery Discharged Today",
-    ),
-    NeovoltaEnergyDescription(
-        key="energy_from_grid_today",
-        name="Energy From Grid Today",
-    ),
-    NeovoltaEnergyDescription(
-        key="energy_to_grid_today",
-        name="Energy To Grid Today",
-    ),
-    NeovoltaEnergyDescription(
-        key="battery_charged_cumulative",
-        name="Battery Charged Cumulative",
-    ),
-    NeovoltaEnergyDescription(
-        key="battery_discharged_cumulative",
-        name="Battery Discharged Cumulative",
-    ),
-    NeovoltaVoltageDescription(key="battery_voltage1", name="Battery Voltage TBD1"),
-    NeovoltaVoltageDescription(key="battery_voltage2", name="Battery Voltage TBD2"),
-    NeovoltaVoltageDescription(key="battery_voltage3", name="Battery Voltage TBD3"),
-    NeovoltaVoltageDescription(key="bms_voltage", name="BMS Voltage"),
-    NeovoltaEnergyDescription(
-        key="energy_to_grid_cumulative",
-        name="Energy to Grid Cumulative",
+@dataclass
+class NeovoltaPowerDescription(SensorEntityDescription):
+    """Power description."""
+
+    device_class: SensorDeviceClass | None = SensorDeviceClass.POWER
+    native_unit_of_measurement: str | None = "W"
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+
+
+@dataclass
+class NeovoltaNetEnergyDescription(SensorEntityDescription):
+    """Net energy description, the difference of two daily counters.
+
+    It goes negative when more is exported than imported, so it is a total
+    reset at the start of each day rather than an increasing one.
+    """
+
+    device_class: SensorDeviceClass | None = SensorDeviceClass.ENERGY
+    native_unit_of_measurement: str | None = "kWh"
+    state_class: SensorStateClass | None = SensorStateClass.TOTAL
+
+
+@dataclass
+class NeovoltaEfficiencyDescription(SensorEntityDescription):
+    """Efficiency description."""
+
+    native_unit_of_measurement: str | None = "%"
+    suggested_display_precision: int | None = 1
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+
+
+@dataclass
+class NeovoltaChargeRateDescription(SensorEntityDescription):
+    """Charge rate description, in state of charge per hour."""
+
+    native_unit_of_measurement: str | None = "%/h"
+    suggested_display_precision: int | None = 1
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+
+
+DESCRIPTION_TYPES = {
+    KIND_BATTERY: NeovoltaBatteryDescription,
+    KIND_CURRENT: NeovoltaCurrentDescription,
+    KIND_ENERGY: NeovoltaEnergyDescription,
+    KIND_FREQUENCY: NeovoltaFrequencyDescription,
+    KIND_VOLTAGE: NeovoltaVoltageDescription,
+    KIND_POWER: NeovoltaPowerDescription,
+    KIND_NET_ENERGY: NeovoltaNetEnergyDescription,
+    KIND_EFFICIENCY: NeovoltaEfficiencyDescription,
+    KIND_CHARGE_RATE: NeovoltaChargeRateDescription,
+}
+
+# (absolute, relative) change a value needs before its sensor writes a new state
+DEADBANDS = {
+    KIND_BATTERY: (0, 0),
+    KIND_CURRENT: (DEFAULT_DEADBAND_CURRENT, 0.01),
+    KIND_ENERGY: (0, 0),
+    KIND_FREQUENCY: (DEFAULT_DEADBAND_FREQUENCY, 0),
+    KIND_VOLTAGE: (DEFAULT_DEADBAND_VOLTAGE, 0.002),
+    KIND_POWER: (DEFAULT_DEADBAND_POWER, 0.01),
+    KIND_NET_ENERGY: (0, 0),
+    KIND_EFFICIENCY: (0.1, 0),
+    KIND_CHARGE_RATE: (0.1, 0),
+}
+# options replacing the absolute deadband of a kind
+DEADBAND_OPTIONS = {
+    KIND_CURRENT: CONF_DEADBAND_CURRENT,
+    KIND_FREQUENCY: CONF_DEADBAND_FREQUENCY,
+    KIND_VOLTAGE: CONF_DEADBAND_VOLTAGE,
+    KIND_POWER: CONF_DEADBAND_POWER,
+}
+
+ENTITY_DESCRIPTIONS = tuple(
+    DESCRIPTION_TYPES[register.kind](key=register.key, name=register.name)
+    for register in REGISTERS + DERIVED
+    # settings get number, select and time entities instead
+    if register.kind != KIND_SETTING
+)
+
+# health of the connection to the device, keyed by ClientMetrics attribute
+METRIC_DESCRIPTIONS = (
+    SensorEntityDescription(
+        key="poll_latency_ms",
+        name="Poll Latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement="ms",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
     ),
-    NeovoltaEnergyDescription(
-        key="energy_consumed_today",
-        name="Energy Consumed Today",
+    SensorEntityDescription(
+        key="poll_success_rate",
+        name="Poll Success Rate",
+        native_unit_of_measurement="%",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
     ),
-    NeovoltaEnergyDescription(
-        key="energy_consumed_cumulative",
-        name="Energy Consumed Cumulative",
+    SensorEntityDescription(
+        key="last_successful_poll",
+        name="Last Successful Poll",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
     ),
-    NeovoltaVoltageDescription(key="grid_voltage_rua", name="Grid Voltage R/U/A"),
-    NeovoltaVoltageDescription(key="grid_voltage_svb", name="Grid Voltage S/V/B"),
-    NeovoltaVoltageDescription(key="pv_voltage1", name="PV Voltage1"),
-    NeovoltaVoltageDescription(key="pv_voltage2", name="PV Voltage2"),
-    NeovoltaVoltageDescription(key="grid_voltage_rsuvab", name="Grid Voltage RS/UV/AB"),
-    NeovoltaFrequencyDescription(key="grid_frequency", name="Grid Frequency"),
-    NeovoltaFrequencyDescription(key="frequency2", name="Frequency2"),
-    NeovoltaFrequencyDescription(key="frequency3", name="Frequency3"),
-    NeovoltaFrequencyDescription(key="frequency4", name="Frequency4"),
-    NeovoltaVoltageDescription(key="voltage148", name="Voltage 148"),
-    NeovoltaVoltageDescription(key="voltage149", name="Voltage 149"),
-    NeovoltaVoltageDescription(key="voltage150", name="Voltage 150"),
-    NeovoltaVoltageDescription(key="voltage151", name="Voltage 151"),
-    NeovoltaVoltageDescription(key="voltage152", name="Voltage 152"),
-    NeovoltaVoltageDescription(key="voltage153", name="Voltage 153"),
-    NeovoltaVoltageDescription(key="voltage154", name="Voltage 154"),
-    NeovoltaVoltageDescription(key="voltage155", name="Voltage 155"),
-    NeovoltaVoltageDescription(key="voltage156", name="Voltage 156"),
-    NeovoltaVoltageDescription(key="voltage157", name="Voltage 157"),
-    NeovoltaVoltageDescription(key="voltage158", name="Voltage 158"),
-    NeovoltaVoltageDescription(key="voltage181", name="Voltage 181"),
-    NeovoltaVoltageDescription(key="voltage182", name="Voltage 182"),
-    NeovoltaVoltageDescription(key="voltage319", name="Voltage 319"),
-    NeovoltaCurrentDescription(key="grid_current_rua", name="Grid Current R/U/A"),
-    NeovoltaCurrentDescription(key="grid_current_svb", name="Grid Current S/V/B"),
-    NeovoltaCurrentDescription(key="meter_ac_current_a", name="Meter AC Current A"),
-    NeovoltaCurrentDescription(key="meter_ac_current_b", name="Meter AC Current B"),
-    NeovoltaCurrentDescription(key="current132", name="Current 132"),
-    NeovoltaCurrentDescription(key="current133", name="Current 133"),
-    NeovoltaCurrentDescription(key="current164", name="Current 164"),
-    NeovoltaCurrentDescription(key="current165", name="Current 165"),
-    NeovoltaCurrentDescription(key="current166", name="Current 166"),
-    NeovoltaCurrentDescription(key="current176", name="Current 176"),
-    NeovoltaCurrentDescription(key="current177", name="Current 177"),
-    NeovoltaCurrentDescription(key="current178", name="Current 178"),
-    NeovoltaCurrentDescription(key="current179", name="Current 179"),
-    NeovoltaCurrentDescription(key="current180", name="Current 180"),
-    NeovoltaCurrentDescription(key="current185", name="Current 185"),
-    NeovoltaCurrentDescription(key="current314", name="Current 314"),
-    NeovoltaCurrentDescription(key="current315", name="Current 315"),
-    NeovoltaEnergyDescription(key="energy24", name="Energy 24"),
-    NeovoltaEnergyDescription(key="energy65", name="Energy 65"),
-    NeovoltaEnergyDescription(key="energy66", name="Energy 66"),
-    NeovoltaEnergyDescription(key="energy68", name="Energy 68"),
-    NeovoltaEnergyDescription(key="energy87", name="Energy 87"),
-    NeovoltaEnergyDescription(key="energy96", name="Energy 96"),
-    NeovoltaEnergyDescription(key="energy131", name="Energy 131"),
 )
 
 
@@ -178,6 +216,13 @@ async def async_setup_entry(hass, entry, async_add_devices):
         )
         for entity_description in ENTITY_DESCRIPTIONS
     )
+    async_add_devices(
+        NeovoltaMetricSensor(
+            coordinator=coordinator,
+            entity_description=entity_description,
+        )
+        for entity_description in METRIC_DESCRIPTIONS
+    )
 
 
 class NeovoltaSensor(NeovoltaEntity, SensorEntity):
@@ -190,11 +235,123 @@ class NeovoltaSensor(NeovoltaEntity, SensorEntity):
     ) -> None:
         super().__init__(coordinator)
         self.entity_description = entity_description
+        key = entity_description.key
+        if (derived := DERIVED_BY_KEY.get(key)) is not None:
+            kind = derived.kind
+        else:
+            kind = REGISTERS_BY_KEY[key].kind
+        self._daily = kind == KIND_NET_ENERGY
+        self._attr_entity_registry_enabled_default = is_useful(
+            key, coordinator.capabilities
+        )
+        self._deadband, self._relative_deadband = DEADBANDS[kind]
+        if kind in DEADBAND_OPTIONS:
+            self._deadband = coordinator.config_entry.options.get(
+                DEADBAND_OPTIONS[kind], self._deadband
+            )
+        self._written_value = None
+        self._written_available = True
+        self._written_at = 0.0
+        self._index = INDEX[key]
         self._attr_unique_id = (
-            f"{self.coordinator.client.data['serial_number']}_{entity_description.key}"
+            f"{self.coordinator.client.serial_number}_{entity_description.key}"
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Poll the registers behind this sensor while it is enabled."""
+        await super().async_added_to_hass()
+        self.coordinator.client.enable_key(self.entity_description.key)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop polling the registers behind this sensor."""
+        await super().async_will_remove_from_hass()
+        self.coordinator.client.disable_key(self.entity_description.key)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only when the value of this sensor really changed."""
+        key = self.entity_description.key
+        client = self.coordinator.client
+        available = (
+            self.coordinator.last_update_success and key not in client.stale_keys
+        )
+        if available and self._written_available:
+            if key not in client.updated_keys:
+                return
+            value = self.native_value
+            if (
+                not self._changed(value)
+                and time.monotonic() - self._written_at
+                < SENSOR_HEARTBEAT.total_seconds()
+            ):
+                return
+        else:
+            value = self.native_value if available else None
+        self._written_available = available
+        self._written_value = value
+        self._written_at = time.monotonic()
+        super()._handle_coordinator_update()
+
+    def _changed(self, value) -> bool:
+        """Return True when value moved out of the deadband of the last state."""
+        last = self._written_value
+        if value is None or last is None:
+            return value is not last
+        band = max(self._deadband, self._relative_deadband * abs(last))
+        if not band:
+            return value != last
+        return abs(round(value - last, 6)) >= band
+
+    @property
+    def available(self) -> bool:
+        """Return False while the block behind this sensor fails."""
+        return (
+            super().available
+            and self.entity_description.key not in self.coordinator.client.stale_keys
         )
 
     @property
     def native_value(self) -> str:
         """Return the native value of the sensor."""
-        return self.coordinator.client.data.get(self.entity_description.key)
+        return self.coordinator.client.data.at(self._index)
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return the start of the day of the value, for daily totals."""
+        if not self._daily:
+            return None
+        return dt_util.start_of_local_day(
+            dt_util.as_local(self.coordinator.snapshot_time or dt_util.utcnow())
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Flag values restored from the last run until the device answers."""
+        if not self.coordinator.stale:
+            return None
+        return {"stale": True, "last_updated": self.coordinator.snapshot_time}
+
+
+class NeovoltaMetricSensor(NeovoltaEntity, SensorEntity):
+    """neovolta diagnostic Sensor class."""
+
+    def __init__(
+        self,
+        coordinator: NeovoltaDataUpdateCoordinatoror,
+        entity_description: SensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator)
+        self.entity_description = entity_description
+        self._attr_unique_id = (
+            f"{self.coordinator.client.serial_number}_{entity_description.key}"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Stay available, failed polls are what these sensors report."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the native value of the sensor."""
+        return getattr(self.coordinator.client.metrics, self.entity_description.key)
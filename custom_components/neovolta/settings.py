@@ -0,0 +1,81 @@
+"""Inverter settings that can be written."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import time
+
+from homeassistant.const import Platform
+
+from .registers import REGISTERS_BY_KEY
+
+
+@dataclass(frozen=True)
+class Setting:
+    """A holding register that can be written, and how to present it."""
+
+    key: str
+    platform: Platform
+    minimum: int = 0
+    maximum: int = 0xFFFF
+    unit: str | None = None
+    # select options, in the order of their register values
+    options: tuple[str, ...] = ()
+
+    @property
+    def address(self) -> int:
+        """Return the address of the register."""
+        return REGISTERS_BY_KEY[self.key].address
+
+    def decode(self, value: float | None) -> int | str | time | None:
+        """Return the register value as shown in Home Assistant."""
+        if value is None:
+            return None
+        value = int(value)
+        if self.platform == Platform.SELECT:
+            return self.options[value] if value < len(self.options) else None
+        if self.platform == Platform.TIME:
+            # hours and minutes as the decimal digits HHMM
+            hour, minute = divmod(value, 100)
+            return time(hour, minute) if hour < 24 and minute < 60 else None
+        return value
+
+    def encode(self, value: int | float | str | time) -> int:
+        """Return the register value for a value from Home Assistant.
+
+        Raises ValueError when the value is not valid for this setting.
+        """
+        if self.platform == Platform.SELECT:
+            if value not in self.options:
+                raise ValueError(f"{self.key} must be one of {list(self.options)}")
+            return self.options.index(value)
+        if self.platform == Platform.TIME:
+            if isinstance(value, str):
+                value = time.fromisoformat(value)
+            if not isinstance(value, time):
+                raise ValueError(f"{self.key} must be a time")
+            return value.hour * 100 + value.minute
+        if isinstance(value, str) or int(value) != value:
+            raise ValueError(f"{self.key} must be a whole number")
+        if not self.minimum <= value <= self.maximum:
+            raise ValueError(
+                f"{self.key} must be between {self.minimum} and {self.maximum}"
+            )
+        return int(value)
+
+
+SETTINGS: tuple[Setting, ...] = (
+    Setting(
+        "work_mode",
+        Platform.SELECT,
+        options=("selling_first", "zero_export_to_load", "zero_export_to_ct"),
+    ),
+    Setting("battery_max_charge_current", Platform.NUMBER, 0, 185, "A"),
+    Setting("battery_max_discharge_current", Platform.NUMBER, 0, 185, "A"),
+    *(Setting(f"time_of_use_time{slot}", Platform.TIME) for slot in range(1, 7)),
+    *(
+        Setting(f"time_of_use_soc{slot}", Platform.NUMBER, 0, 100, "%")
+        for slot in range(1, 7)
+    ),
+)
+
+SETTINGS_BY_KEY: dict[str, Setting] = {setting.key: setting for setting in SETTINGS}
@@ -0,0 +1,175 @@
+"""Adaptive sweep of the register space, to map unknown registers."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import time
+
+from .api import (
+    NeovoltaApiClient,
+    NeovoltaApiClientCommunicationError,
+    NeovoltaApiClientDeviceError,
+)
+from .registers import MAX_READ_COUNT
+from .transport import ILLEGAL_ADDRESS
+
+# attempts per read, a sweep reads a lot and a failed read is cheap to redo
+SWEEP_ATTEMPTS = 2
+# seconds between reads, so the logger keeps up and polls get their turn
+SWEEP_PAUSE = 0.1
+# longest stride probing for the end of a hole; readable islands shorter than
+# this inside a hole may be missed
+MAX_HOLE_STEP = 16
+
+
+@dataclass
+class SweepResult:
+    """Raw values and readable ranges found by a sweep."""
+
+    start: int
+    end: int
+    block_size: int
+    # [start, end) address ranges that could and could not be read
+    readable: list[list[int]] = field(default_factory=list)
+    holes: list[list[int]] = field(default_factory=list)
+    registers: dict[int, int] = field(default_factory=dict)
+    reads: int = 0
+    seconds: float = 0.0
+    # False when the logger stopped answering before the sweep got to end
+    complete: bool = True
+
+    def summary(self) -> dict:
+        """Return everything but the register values."""
+        return {
+            "start": self.start,
+            "end": self.end,
+            "block_size": self.block_size,
+            "readable": self.readable,
+            "holes": self.holes,
+            "reads": self.reads,
+            "seconds": round(self.seconds, 1),
+            "complete": self.complete,
+        }
+
+    def as_dict(self) -> dict:
+        """Return the result, with the register values by address."""
+        return {**self.summary(), "registers": self.registers}
+
+
+def _add_range(ranges: list[list[int]], start: int, end: int) -> None:
+    """Add [start, end) to ranges sorted by address, merging adjacent ones."""
+    if ranges and ranges[-1][1] == start:
+        ranges[-1][1] = end
+    else:
+        ranges.append([start, end])
+
+
+def _known(ranges: list[list[int]], address: int) -> list[int] | None:
+    """Return the range containing address, if any."""
+    return next((r for r in ranges if r[0] <= address < r[1]), None)
+
+
+def _next_start(ranges: list[list[int]], address: int, end: int) -> int:
+    """Return where the first range starting after address does, or end."""
+    return min((r[0] for r in ranges if address < r[0] < end), default=end)
+
+
+async def async_sweep(
+    client: NeovoltaApiClient,
+    start: int,
+    end: int,
+    cache: dict | None = None,
+    block_size: int = MAX_READ_COUNT,
+    pause: float = SWEEP_PAUSE,
+) -> SweepResult:
+    """Read every register in [start, end) in as few requests as possible.
+
+    Reads start at block_size registers and halve whenever the logger
+    rejects the register count or stops answering a long read. A block the
+    device rejects with an illegal address is bisected down to its longest
+    readable prefix; the hole that follows is skipped by probing single
+    registers at growing strides, then bisecting for where it ends. A hole of
+    n registers thus costs a few dozen reads instead of n.
+
+    cache is the summary of an earlier sweep: its holes are skipped and its
+    block size used right away.
+    """
+    started = time.monotonic()
+    if cache:
+        block_size = min(block_size, cache["block_size"])
+    known_holes = cache["holes"] if cache else []
+    result = SweepResult(start, end, block_size)
+
+    async def read(address: int, count: int) -> bool:
+        """Read count registers, return False when the address is illegal."""
+        if result.reads:
+            await asyncio.sleep(pause)
+        result.reads += 1
+        try:
+            words = await client.async_read_registers(address, count, SWEEP_ATTEMPTS)
+        except NeovoltaApiClientDeviceError as exception:
+            if exception.exception_code != ILLEGAL_ADDRESS:
+                raise
+            return False
+        result.registers.update(zip(range(address, address + count), words))
+        return True
+
+    address = start
+    try:
+        while address < end:
+            if (hole := _known(known_holes, address)) is not None:
+                _add_range(result.holes, address, min(hole[1], end))
+                address = hole[1]
+                continue
+            count = min(
+                result.block_size,
+                _next_start(known_holes, address, end) - address,
+            )
+            try:
+                if await read(address, count):
+                    _add_range(result.readable, address, address + count)
+                    address += count
+                    continue
+            except (
+                NeovoltaApiClientDeviceError,
+                NeovoltaApiClientCommunicationError,
+            ):
+                # the logger rejects or chokes on this many registers, try fewer
+                if count == 1:
+                    raise
+                result.block_size = count // 2
+                continue
+
+            # longest readable prefix, the register after it is illegal
+            readable, illegal = 0, count
+            while illegal - readable > 1:
+                middle = (readable + illegal) // 2
+                if await read(address, middle):
+                    readable = middle
+                else:
+                    illegal = middle
+            if readable:
+                _add_range(result.readable, address, address + readable)
+            hole_start = address + readable
+
+            # first readable register after the hole
+            bad, step, good = hole_start, 1, end
+            while bad + step < end:
+                if await read(bad + step, 1):
+                    good = bad + step
+                    break
+                bad += step
+                step = min(2 * step, MAX_HOLE_STEP)
+            while good - bad > 1 and good < end:
+                middle = (bad + good) // 2
+                if await read(middle, 1):
+                    good = middle
+                else:
+                    bad = middle
+            _add_range(result.holes, hole_start, good)
+            address = good
+    except NeovoltaApiClientCommunicationError:
+        result.complete = False
+        result.end = address
+    result.seconds = time.monotonic() - started
+    return result
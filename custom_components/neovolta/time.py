@@ -0,0 +1,45 @@
+"""Time platform for neovolta."""
+from __future__ import annotations
+
+from datetime import time
+
+from homeassistant.components.time import TimeEntity, TimeEntityDescription
+from homeassistant.const import Platform
+
+from .const import DOMAIN
+from .coordinator import NeovoltaDataUpdateCoordinatoror
+from .entity import NeovoltaSettingEntity
+from .registers import REGISTERS_BY_KEY
+from .settings import SETTINGS, Setting
+
+
+async def async_setup_entry(hass, entry, async_add_devices):
+    """Setup time platform."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_devices(
+        NeovoltaTime(coordinator=coordinator, setting=setting)
+        for setting in SETTINGS
+        if setting.platform == Platform.TIME
+    )
+
+
+class NeovoltaTime(NeovoltaSettingEntity, TimeEntity):
+    """neovolta Time class."""
+
+    def __init__(
+        self, coordinator: NeovoltaDataUpdateCoordinatoror, setting: Setting
+    ) -> None:
+        """Initialize."""
+        super().__init__(coordinator, setting)
+        self.entity_description = TimeEntityDescription(
+            key=setting.key, name=REGISTERS_BY_KEY[setting.key].name
+        )
+
+    @property
+    def native_value(self) -> time | None:
+        """Return the current time."""
+        return self.value
+
+    async def async_set_value(self, value: time) -> None:
+        """Write a new time."""
+        await self.async_write(value)
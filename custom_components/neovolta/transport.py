@@ -0,0 +1,283 @@
+"""Framing of Modbus requests and responses for each kind of data logger link."""
+from __future__ import annotations
+
+import struct
+
+from .const import TRANSPORT_RTU_OVER_TCP, TRANSPORT_SOLARMAN_V5, TRANSPORT_TCP
+
+READ_HOLDING_REGISTERS = 0x03
+WRITE_MULTIPLE_REGISTERS = 0x10
+EXCEPTION_FLAG = 0x80
+# Modbus exception codes, as answered by the device or a gateway
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_ADDRESS = 0x02
+ILLEGAL_VALUE = 0x03
+DEVICE_FAILURE = 0x04
+ACKNOWLEDGE = 0x05
+DEVICE_BUSY = 0x06
+GATEWAY_PATH_UNAVAILABLE = 0x0A
+GATEWAY_NO_RESPONSE = 0x0B
+# the largest response PDU is a function code, a byte count and 125 registers
+MAX_RESPONSE_DATA = 2 + 250
+# a write response PDU echoes the function code, start address and count
+WRITE_RESPONSE_SIZE = 5
+
+# transaction id, protocol id, length of what follows, unit id
+MBAP = struct.Struct(">HHHB")
+
+# start, payload length, control code, sequence number and zero, logger serial
+V5_HEADER = struct.Struct("<BHHBBI")
+# frame type, sensor type, total working time, power on time, offset time
+V5_REQUEST = struct.Struct("<BHIII")
+V5_START = 0xA5
+V5_END = 0x15
+V5_REQUEST_CODE = 0x4510
+V5_RESPONSE_CODE = 0x1510
+V5_FRAME_TYPE = 0x02
+# frame type, status, total working time, power on time, offset time
+V5_RESPONSE_PAYLOAD = 14
+V5_MAX_PAYLOAD = V5_RESPONSE_PAYLOAD + 3 + MAX_RESPONSE_DATA
+
+
+def _crc_table() -> tuple[int, ...]:
+    """Return the lookup table of the Modbus CRC-16."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data: bytes) -> int:
+    """Return the Modbus CRC-16 of data."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def _rtu_frame(unit: int, pdu: bytes) -> bytes:
+    """Return pdu as a Modbus RTU frame."""
+    frame = bytes((unit,)) + pdu
+    return frame + struct.pack("<H", crc16(frame))
+
+
+def _rtu_frame_size(data: bytes | bytearray) -> int | None:
+    """Return the size of the RTU response at the start of data, 0 if none.
+
+    None means more bytes are needed to tell.
+    """
+    if len(data) < 3:
+        return None
+    function_code = data[1]
+    if function_code & EXCEPTION_FLAG:
+        size = 5
+    elif function_code == WRITE_MULTIPLE_REGISTERS:
+        size = 3 + WRITE_RESPONSE_SIZE
+    elif function_code == READ_HOLDING_REGISTERS:
+        byte_count = data[2]
+        if not byte_count or byte_count % 2 or byte_count > MAX_RESPONSE_DATA - 2:
+            return 0
+        size = 5 + byte_count
+    else:
+        return 0
+    if len(data) < size:
+        return None
+    return size if crc16(data[:size]) == 0 else 0
+
+
+class Framer:
+    """Cut responses out of a byte stream from a data logger.
+
+    Data loggers occasionally inject stray bytes between frames. Instead of
+    giving up on the stream, bytes are discarded one at a time until the
+    buffer starts with a valid frame again. Subclasses describe the framing
+    of one transport.
+    """
+
+    # responses carry transaction ids modulo this, 1 when they carry none
+    transactions = 1
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._buffer = bytearray()
+        self.discarded = 0
+
+    def request(self, transaction: int, unit: int, pdu: bytes) -> bytes:
+        """Return the frame carrying a request PDU."""
+        raise NotImplementedError
+
+    def feed(self, data: bytes) -> None:
+        """Add received bytes."""
+        self._buffer += data
+
+    def reset(self) -> None:
+        """Forget buffered bytes."""
+        self._buffer.clear()
+
+    def next_frame(self) -> tuple[int | None, bytes] | None:
+        """Return (transaction id, PDU) of the next complete response, if any.
+
+        The transaction id is None for transports without one. An empty PDU
+        means the logger answered without a usable Modbus response.
+        """
+        buffer = self._buffer
+        while buffer:
+            size = self._frame_size()
+            if size is None:
+                return None
+            if size:
+                frame = bytes(buffer[:size])
+                del buffer[:size]
+                if (response := self._unwrap(frame)) is not None:
+                    return response
+                continue
+            del buffer[0]
+            self.discarded += 1
+        return None
+
+    def _frame_size(self) -> int | None:
+        """Return the size of the frame at the start of the buffer, 0 if none.
+
+        None means more bytes are needed to tell.
+        """
+        raise NotImplementedError
+
+    def _unwrap(self, frame: bytes) -> tuple[int | None, bytes] | None:
+        """Return (transaction id, PDU) of a frame, None to skip it."""
+        raise NotImplementedError
+
+
+class TcpFramer(Framer):
+    """Modbus TCP, with an MBAP header in front of every PDU."""
+
+    transactions = 0x10000
+
+    def request(self, transaction: int, unit: int, pdu: bytes) -> bytes:
+        """Return the frame carrying a request PDU."""
+        return MBAP.pack(transaction, 0, len(pdu) + 1, unit) + pdu
+
+    def _frame_size(self) -> int | None:
+        """Return the size of the frame at the start of the buffer, 0 if none."""
+        buffer = self._buffer
+        if len(buffer) < MBAP.size + 2:
+            return None
+        _, protocol, length, _ = MBAP.unpack_from(buffer)
+        function_code = buffer[MBAP.size]
+        if protocol != 0:
+            return 0
+        if function_code & EXCEPTION_FLAG:
+            valid = length == 3 and function_code != EXCEPTION_FLAG
+        elif function_code == WRITE_MULTIPLE_REGISTERS:
+            valid = length == 1 + WRITE_RESPONSE_SIZE
+        elif function_code == READ_HOLDING_REGISTERS:
+            byte_count = buffer[MBAP.size + 1]
+            valid = (
+                byte_count == length - 3
+                and byte_count % 2 == 0
+                and 0 < byte_count <= MAX_RESPONSE_DATA - 2
+            )
+        else:
+            valid = False
+        if not valid:
+            return 0
+        size = MBAP.size - 1 + length
+        return size if len(buffer) >= size else None
+
+    def _unwrap(self, frame: bytes) -> tuple[int | None, bytes] | None:
+        """Return (transaction id, PDU) of a frame."""
+        return MBAP.unpack_from(frame)[0], frame[MBAP.size :]
+
+
+class RtuFramer(Framer):
+    """Modbus RTU frames tunnelled as is over TCP, checked by their CRC."""
+
+    def request(self, transaction: int, unit: int, pdu: bytes) -> bytes:
+        """Return the frame carrying a request PDU."""
+        return _rtu_frame(unit, pdu)
+
+    def _frame_size(self) -> int | None:
+        """Return the size of the frame at the start of the buffer, 0 if none."""
+        return _rtu_frame_size(self._buffer)
+
+    def _unwrap(self, frame: bytes) -> tuple[int | None, bytes] | None:
+        """Return (transaction id, PDU) of a frame."""
+        return None, frame[1:-2]
+
+
+class SolarmanV5Framer(Framer):
+    """Solarman V5, the native protocol of the Wi-Fi data loggers.
+
+    RTU frames are wrapped in a V5 frame addressed to the serial number of
+    the logger, which otherwise answers Modbus on port 8899 only on a best
+    effort basis.
+    """
+
+    transactions = 0x100
+
+    def __init__(self, logger_serial: int) -> None:
+        """Initialize."""
+        super().__init__()
+        self.logger_serial = logger_serial
+
+    def request(self, transaction: int, unit: int, pdu: bytes) -> bytes:
+        """Return the frame carrying a request PDU."""
+        modbus = _rtu_frame(unit, pdu)
+        frame = V5_HEADER.pack(
+            V5_START,
+            V5_REQUEST.size + len(modbus),
+            V5_REQUEST_CODE,
+            transaction,
+            0,
+            self.logger_serial,
+        )
+        frame += V5_REQUEST.pack(V5_FRAME_TYPE, 0, 0, 0, 0) + modbus
+        return frame + bytes((sum(frame[1:]) & 0xFF, V5_END))
+
+    def _frame_size(self) -> int | None:
+        """Return the size of the frame at the start of the buffer, 0 if none."""
+        buffer = self._buffer
+        if buffer[0] != V5_START:
+            return 0
+        if len(buffer) < V5_HEADER.size:
+            return None
+        length = V5_HEADER.unpack_from(buffer)[1]
+        if length > V5_MAX_PAYLOAD:
+            return 0
+        size = V5_HEADER.size + length + 2
+        if len(buffer) < size:
+            return None
+        if buffer[size - 1] != V5_END or sum(buffer[1 : size - 2]) & 0xFF != (
+            buffer[size - 2]
+        ):
+            return 0
+        return size
+
+    def _unwrap(self, frame: bytes) -> tuple[int | None, bytes] | None:
+        """Return (transaction id, PDU) of a frame, None to skip it."""
+        _, _, control_code, sequence, _, _ = V5_HEADER.unpack_from(frame)
+        if control_code != V5_RESPONSE_CODE:
+            # heartbeats and other logger chatter
+            return None
+        modbus = frame[V5_HEADER.size + V5_RESPONSE_PAYLOAD : -2]
+        if _rtu_frame_size(modbus) != len(modbus):
+            return sequence, b""
+        return sequence, modbus[1:-2]
+
+
+def create_framer(transport: str, logger_serial: int | None = None) -> Framer:
+    """Return a framer for the transport."""
+    if transport == TRANSPORT_TCP:
+        return TcpFramer()
+    if transport == TRANSPORT_RTU_OVER_TCP:
+        return RtuFramer()
+    if transport == TRANSPORT_SOLARMAN_V5:
+        if not logger_serial:
+            raise ValueError("Solarman V5 needs the serial number of the logger")
+        return SolarmanV5Framer(logger_serial)
+    raise ValueError(f"Unknown transport {transport}")
@@ -0,0 +1,69 @@
+"""Values of every register and derived key in one compact array."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Mapping
+from math import isnan, nan
+
+from .derived import DERIVED
+from .registers import REGISTER_INDEX, REGISTERS
+
+# registers first, at their REGISTER_INDEX, then the derived values
+KEYS: tuple[str, ...] = tuple(register.key for register in REGISTERS) + tuple(
+    derived.key for derived in DERIVED
+)
+INDEX: dict[str, int] = {key: index for index, key in enumerate(KEYS)}
+assert all(INDEX[key] == index for key, index in REGISTER_INDEX.items())
+
+_EMPTY = array("d", [nan]) * len(KEYS)
+
+
+class RegisterValues:
+    """Values in a fixed layout, NaN standing for unknown.
+
+    Entities look their index up in INDEX once and read with at(), which is
+    a single array access. Keyed access is there for everything else.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, values: array | None = None) -> None:
+        """Initialize."""
+        self.array = array("d", _EMPTY) if values is None else values
+
+    def at(self, index: int) -> float | None:
+        """Return the value at index, None when unknown."""
+        value = self.array[index]
+        return None if isnan(value) else value
+
+    def get(self, key: str, default: float | None = None) -> float | None:
+        """Return the value of key, default when unknown."""
+        if (index := INDEX.get(key)) is None or isnan(value := self.array[index]):
+            return default
+        return value
+
+    def __getitem__(self, key: str) -> float | None:
+        """Return the value of key, None when unknown."""
+        return self.at(INDEX[key])
+
+    def __setitem__(self, key: str, value: float | None) -> None:
+        """Set the value of key."""
+        self.array[INDEX[key]] = nan if value is None else value
+
+    def update(self, values: Mapping[str, float | None]) -> None:
+        """Set the values of the known keys in values."""
+        for key, value in values.items():
+            if key in INDEX:
+                self[key] = value
+
+    def copy_from(self, other: RegisterValues) -> None:
+        """Take over all values of other, without allocating."""
+        self.array[:] = other.array
+
+    def keys(self) -> Iterable[str]:
+        """Return the keys."""
+        return KEYS
+
+    def as_dict(self) -> dict[str, float | None]:
+        """Return the values keyed by key."""
+        return {key: self.at(index) for index, key in enumerate(KEYS)}
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""NeoVolta integration benchmark.
+
+Polls simulated inverters (see simulator.py) through NeovoltaApiClient and the
+data update coordinator, and prints the results as JSON so runs of different
+versions can be compared::
+
+    scripts/benchmark.py --polls 50 --inverters 1 5 10 25 50 > before.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import AsyncExitStack
+import json
+import logging
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from simulator import TRANSPORTS, Faults, NeovoltaSimulator  # noqa: E402
+
+from custom_components.neovolta.api import NeovoltaApiClient  # noqa: E402
+from custom_components.neovolta.registers import plan_reads  # noqa: E402
+from custom_components.neovolta.values import RegisterValues  # noqa: E402
+
+LAG_INTERVAL = 0.01
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Return p50/p95/p99/max of samples in milliseconds."""
+    if not samples:
+        return {}
+    if len(samples) == 1:
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49] * 1000, 3),
+        "p95": round(cuts[94] * 1000, 3),
+        "p99": round(cuts[98] * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+
+
+async def measure_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    """Record how late the event loop wakes up a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(0.0, loop.time() - start - LAG_INTERVAL))
+
+
+def bench_decode(repeat: int) -> dict[str, float]:
+    """Return the CPU time needed to decode one full poll.
+
+    Polls decode into the slots of a RegisterValues array; decoding into a
+    dict by key is timed too, as a baseline.
+    """
+    plans = plan_reads()
+    data: dict = {}
+    values = RegisterValues()
+    blocks = [(plan, [0x1234] * plan.count) for plan in plans]
+
+    def decode_into() -> None:
+        for plan, registers in blocks:
+            plan.decode_into(registers, values.array)
+
+    def decode() -> None:
+        for plan, registers in blocks:
+            plan.decode(registers, data)
+
+    def best(function) -> float:
+        return min(timeit.repeat(function, number=repeat, repeat=5)) / repeat
+
+    return {
+        "reads_per_poll": len(plans),
+        "registers_per_poll": sum(plan.count for plan in plans),
+        "decode_us_per_poll": round(best(decode_into) * 1e6, 3),
+        "decode_dict_us_per_poll": round(best(decode) * 1e6, 3),
+    }
+
+
+async def bench_clients(
+    inverters: int,
+    polls: int,
+    faults: Faults,
+    transport: str = "tcp",
+    max_in_flight: int = 1,
+) -> dict:
+    """Poll simulated inverters concurrently through NeovoltaApiClient."""
+    latencies: list[float] = []
+    failures = 0
+
+    async def poll(client: NeovoltaApiClient) -> None:
+        nonlocal failures
+        for _ in range(polls):
+            start = time.perf_counter()
+            try:
+                await client.async_get_data()
+            except Exception:  # pylint: disable=broad-except
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async with AsyncExitStack() as stack:
+        simulators = [
+            await stack.enter_async_context(
+                NeovoltaSimulator(faults=faults, seed=i, transport=transport)
+            )
+            for i in range(inverters)
+        ]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        clients = [
+            NeovoltaApiClient(
+                host="127.0.0.1",
+                port=simulator.port,
+                transport=transport,
+                logger_serial=simulator.logger_serial,
+                max_in_flight=max_in_flight,
+            )
+            for simulator in simulators
+        ]
+        # connect and read static data outside of the measurement
+        await asyncio.gather(*(client.async_get_data() for client in clients))
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        for simulator in simulators:
+            simulator.stats.__init__()
+
+        lags: list[float] = []
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(lags, stop))
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        await asyncio.gather(*(poll(client) for client in clients))
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        stop.set()
+        await lag_task
+
+        for client in clients:
+            await client.async_close()
+
+    total = inverters * polls
+    requests = sum(simulator.stats.requests for simulator in simulators)
+    transferred = sum(
+        simulator.stats.bytes_received + simulator.stats.bytes_sent
+        for simulator in simulators
+    )
+    return {
+        "inverters": inverters,
+        "polls": total,
+        "failures": failures,
+        "polls_per_second": round(total / wall, 2),
+        "latency_ms": percentiles(latencies),
+        "requests_per_poll": round(requests / total, 3),
+        "bytes_per_poll": round(transferred / total, 1),
+        "cpu_ms_per_poll": round(cpu / total * 1000, 3),
+        "memory_bytes_per_inverter": memory // inverters,
+        "loop_lag_ms": percentiles(lags),
+    }
+
+
+async def bench_coordinator(polls: int, faults: Faults) -> dict:
+    """Refresh the data update coordinator against one simulated inverter."""
+    # pylint: disable=import-outside-toplevel
+    from homeassistant.config_entries import ConfigEntry, current_entry
+    from homeassistant.core import HomeAssistant
+
+    from custom_components.neovolta.const import DOMAIN
+    from custom_components.neovolta.coordinator import NeovoltaDataUpdateCoordinatoror
+    from custom_components.neovolta.registers import REGISTERS
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        async with NeovoltaSimulator(faults=faults) as simulator:
+            client = NeovoltaApiClient(host="127.0.0.1", port=simulator.port)
+            # the coordinator reads its options and entry id from the entry
+            # being set up, as it does in Home Assistant
+            current_entry.set(
+                ConfigEntry(
+                    version=1,
+                    minor_version=1,
+                    domain=DOMAIN,
+                    title="benchmark",
+                    data={},
+                    source="user",
+                    options={},
+                )
+            )
+            coordinator = NeovoltaDataUpdateCoordinatoror(hass=hass, client=client)
+
+            # stand-in for the sensors reading their value on every update
+            def read_values() -> None:
+                for register in REGISTERS:
+                    client.data.get(register.key)
+
+            remove = coordinator.async_add_listener(read_values)
+            await coordinator.async_refresh()
+            latencies = []
+            failures = 0
+            for _ in range(polls):
+                # make every register group due, as on a slow tick
+                coordinator._last_polled.clear()  # pylint: disable=protected-access
+                start = time.perf_counter()
+                await coordinator.async_refresh()
+                latencies.append(time.perf_counter() - start)
+                failures += not coordinator.last_update_success
+            remove()
+            await client.async_close()
+        await hass.async_stop(force=True)
+
+    return {
+        "polls": polls,
+        "failures": failures,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def version() -> str:
+    """Return the git revision being benchmarked."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run every benchmark."""
+    faults = Faults(latency=args.latency, jitter=args.jitter)
+    results = {
+        "version": version(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "decode": bench_decode(args.decode_repeat),
+        "scaling": [
+            await bench_clients(
+                inverters, args.polls, faults, args.transport, args.max_in_flight
+            )
+            for inverters in args.inverters
+        ],
+    }
+    if not args.no_coordinator:
+        results["coordinator"] = await bench_coordinator(args.polls, faults)
+    return results
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=50, help="polls per inverter")
+    parser.add_argument("--inverters", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="tcp")
+    parser.add_argument(
+        "--max-in-flight", type=int, default=1, help="block reads sent at once"
+    )
+    parser.add_argument("--decode-repeat", type=int, default=10000)
+    parser.add_argument("--no-coordinator", action="store_true")
+    parser.add_argument("--output", type=Path, help="write JSON here, not stdout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = json.dumps(asyncio.run(run(args)), default=str, indent=2)
+    if args.output:
+        args.output.write_text(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
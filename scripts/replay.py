@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""NeoVolta capture replay.
+
+Decodes a raw register capture recorded by the integration (enable "Record raw
+registers" in the integration options) and writes it as CSV, one row per
+captured block::
+
+    scripts/replay.py config/neovolta_<entry id>.capture > decoded.csv
+    scripts/replay.py --raw config/neovolta_<entry id>.capture > raw.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from custom_components.neovolta.capture import (  # noqa: E402
+    read_capture,
+    replay_capture,
+)
+from custom_components.neovolta.registers import REGISTERS  # noqa: E402
+
+
+def main() -> None:
+    """Write the capture to stdout as CSV."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument(
+        "--raw", action="store_true", help="register values by address, undecoded"
+    )
+    args = parser.parse_args()
+    writer = csv.writer(sys.stdout)
+
+    if args.raw:
+        blocks = list(read_capture(args.capture))
+        addresses = sorted(
+            {start + i for _, start, registers in blocks for i in range(len(registers))}
+        )
+        writer.writerow(["timestamp", *addresses])
+        for timestamp, start, registers in blocks:
+            row = dict(zip(range(start, start + len(registers)), registers))
+            writer.writerow([timestamp, *(row.get(a, "") for a in addresses)])
+        return
+
+    keys = [register.key for register in REGISTERS]
+    writer.writerow(["timestamp", *keys])
+    for timestamp, values in replay_capture(args.capture):
+        writer.writerow([timestamp, *(values.get(key, "") for key in keys)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""NeoVolta inverter simulator.
+
+A small server that serves the holding registers read by the NeoVolta
+integration over Modbus TCP, Modbus RTU over TCP or Solarman V5, with optional
+fault injection to mimic a struggling Wi-Fi data logger.
+
+Run it in-process::
+
+    async with NeovoltaSimulator(faults=Faults(latency=0.2)) as simulator:
+        client = NeovoltaApiClient("127.0.0.1", simulator.port)
+
+or standalone::
+
+    scripts/simulator.py --port 8899 --latency 0.2 --garbage 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from array import array
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import logging
+import random
+import struct
+import sys
+
+_LOGGER = logging.getLogger(__name__)
+
+MBAP = struct.Struct(">HHHB")
+READ_REQUEST = struct.Struct(">BHH")
+WRITE_REQUEST = struct.Struct(">BHHB")
+# start, payload length, control code, sequence number and zero, logger serial
+V5_HEADER = struct.Struct("<BHHBBI")
+V5_REQUEST_PAYLOAD = 15
+V5_RESPONSE_PAYLOAD = struct.Struct("<BBIII")
+
+TRANSPORTS = ("tcp", "rtu_over_tcp", "solarman_v5")
+
+READ_HOLDING_REGISTERS = 0x03
+WRITE_MULTIPLE_REGISTERS = 0x10
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_ADDRESS = 0x02
+ILLEGAL_VALUE = 0x03
+
+SERIAL_ADDRESS = 3
+SERIAL_NUMBER = "NVSIM00001"
+
+
+# frames a reply PDU for the transport the request came in on
+Wrap = Callable[[bytes], bytes]
+
+
+def crc16(data: bytes) -> int:
+    """Return the Modbus CRC-16 of data."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def rtu_frame(unit: int, pdu: bytes) -> bytes:
+    """Return pdu as a Modbus RTU frame."""
+    frame = bytes((unit,)) + pdu
+    return frame + struct.pack("<H", crc16(frame))
+
+
+@dataclass
+class Faults:
+    """Faults to inject, rates are probabilities per request."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    drop_rate: float = 0.0
+    garbage_rate: float = 0.0
+    illegal_address_rate: float = 0.0
+    reset_rate: float = 0.0
+    # drop requests arriving while another is being answered, like gateways
+    # that only handle one transaction at a time
+    single_transaction: bool = False
+
+
+@dataclass
+class SimulatorStats:
+    """Counters kept by the simulator."""
+
+    connections: int = 0
+    requests: int = 0
+    responses: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+    dropped: int = 0
+    garbage: int = 0
+    illegal_address: int = 0
+    resets: int = 0
+    writes: int = 0
+
+
+@dataclass
+class NeovoltaSimulator:
+    """Server impersonating a NeoVolta inverter and its data logger."""
+
+    host: str = "127.0.0.1"
+    port: int = 0
+    faults: Faults = field(default_factory=Faults)
+    # address ranges [start, end) that can be read, anything else is illegal
+    readable: tuple[tuple[int, int], ...] = ((0, 400),)
+    # address ranges [start, end) whose values drift between reads
+    live: tuple[tuple[int, int], ...] = ((100, 200),)
+    # address ranges [start, end) that can be written, and read back
+    writable: tuple[tuple[int, int], ...] = ((142, 143), (210, 212), (250, 280))
+    # most registers the data logger reads in one request
+    max_count: int = 125
+    seed: int | None = None
+    stats: SimulatorStats = field(default_factory=SimulatorStats)
+    # framing spoken on the socket, one of TRANSPORTS
+    transport: str = "tcp"
+    logger_serial: int = 1234567890
+
+    def __post_init__(self) -> None:
+        """Fill the register space."""
+        self._random = random.Random(self.seed)
+        self.registers = array(
+            "H", (self._random.randrange(0, 5000) for _ in range(0x10000))
+        )
+        serial = SERIAL_NUMBER.encode("ascii")
+        for i in range(0, len(serial), 2):
+            self.registers[SERIAL_ADDRESS + i // 2] = (serial[i] << 8) | serial[i + 1]
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> NeovoltaSimulator:
+        """Start serving."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Stop serving."""
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start listening, binding a free port when port is 0."""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.info("NeoVolta simulator listening on %s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        """Close the server and every open connection."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def is_readable(self, address: int, count: int) -> bool:
+        """Return True when the whole range lies in one readable range."""
+        return any(
+            start <= address and address + count <= end
+            for start, end in self.readable + self.writable
+        )
+
+    def is_writable(self, address: int, count: int) -> bool:
+        """Return True when the whole range lies in one writable range."""
+        return any(
+            start <= address and address + count <= end for start, end in self.writable
+        )
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one client connection."""
+        self.stats.connections += 1
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        tasks = set()
+        read_request = {
+            "tcp": self._read_tcp,
+            "rtu_over_tcp": self._read_rtu,
+            "solarman_v5": self._read_v5,
+        }[self.transport]
+        try:
+            while True:
+                pdu, wrap = await read_request(reader)
+                self.stats.requests += 1
+                if self.faults.single_transaction and tasks:
+                    self.stats.dropped += 1
+                    continue
+                # answer concurrently so jitter can reorder pipelined replies
+                task = asyncio.create_task(self._respond(writer, pdu, wrap))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _read_tcp(self, reader: asyncio.StreamReader) -> tuple[bytes, Wrap]:
+        """Read a Modbus TCP request, return its PDU and how to frame the reply."""
+        header = await reader.readexactly(MBAP.size)
+        tid, pid, length, unit = MBAP.unpack(header)
+        pdu = await reader.readexactly(length - 1)
+        self.stats.bytes_received += len(header) + len(pdu)
+        return pdu, lambda reply: MBAP.pack(tid, pid, len(reply) + 1, unit) + reply
+
+    async def _read_rtu(self, reader: asyncio.StreamReader) -> tuple[bytes, Wrap]:
+        """Read a Modbus RTU request, return its PDU and how to frame the reply."""
+        frame = await reader.readexactly(2 + READ_REQUEST.size + 1)
+        if frame[1] == WRITE_MULTIPLE_REGISTERS:
+            # a byte count follows the register count, then the values and CRC
+            frame += await reader.readexactly(frame[6] - 1 + 2)
+        self.stats.bytes_received += len(frame)
+        unit = frame[0]
+        return frame[1:-2], lambda reply: rtu_frame(unit, reply)
+
+    async def _read_v5(self, reader: asyncio.StreamReader) -> tuple[bytes, Wrap]:
+        """Read a Solarman V5 request, return its PDU and how to frame the reply."""
+        header = await reader.readexactly(V5_HEADER.size)
+        _, length, _, sequence, _, _ = V5_HEADER.unpack(header)
+        rest = await reader.readexactly(length + 2)
+        self.stats.bytes_received += len(header) + len(rest)
+        modbus = rest[V5_REQUEST_PAYLOAD:-2]
+        unit = modbus[0]
+
+        def wrap(reply: bytes) -> bytes:
+            payload = V5_RESPONSE_PAYLOAD.pack(2, 1, 0, 0, 0) + rtu_frame(unit, reply)
+            frame = V5_HEADER.pack(
+                0xA5, len(payload), 0x1510, sequence, 0, self.logger_serial
+            )
+            frame += payload
+            return frame + bytes((sum(frame[1:]) & 0xFF, 0x15))
+
+        return modbus[1:-2], wrap
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        pdu: bytes,
+        wrap: Wrap,
+    ) -> None:
+        """Answer one request, injecting faults along the way."""
+        faults = self.faults
+        delay = faults.latency + self._random.uniform(0, faults.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self._random.random() < faults.reset_rate:
+            self.stats.resets += 1
+            writer.transport.abort()
+            return
+        if self._random.random() < faults.drop_rate:
+            self.stats.dropped += 1
+            return
+
+        frame = wrap(self._process(pdu))
+        if self._random.random() < faults.garbage_rate:
+            # the Wi-Fi loggers occasionally emit stray bytes such as b"r" (114)
+            self.stats.garbage += 1
+            junk = bytes(
+                self._random.randrange(256) for _ in range(self._random.randrange(1, 8))
+            )
+            frame = junk + frame if self._random.random() < 0.5 else frame + junk
+
+        if writer.is_closing():
+            return
+        writer.write(frame)
+        self.stats.responses += 1
+        self.stats.bytes_sent += len(frame)
+
+    def _process(self, pdu: bytes) -> bytes:
+        """Return the reply PDU for a request PDU."""
+        function_code = pdu[0]
+        if function_code == WRITE_MULTIPLE_REGISTERS:
+            return self._write(pdu)
+        if function_code != READ_HOLDING_REGISTERS or len(pdu) != READ_REQUEST.size:
+            return bytes((function_code | 0x80, ILLEGAL_FUNCTION))
+
+        _, address, count = READ_REQUEST.unpack(pdu)
+        if not 1 <= count <= self.max_count:
+            return bytes((function_code | 0x80, ILLEGAL_VALUE))
+        if (
+            not self.is_readable(address, count)
+            or self._random.random() < self.faults.illegal_address_rate
+        ):
+            self.stats.illegal_address += 1
+            return bytes((function_code | 0x80, ILLEGAL_ADDRESS))
+
+        for start, end in self.live:
+            for live in range(max(start, address), min(end, address + count)):
+                if self.is_writable(live, 1):
+                    # settings only change when written
+                    continue
+                self.registers[live] = max(
+                    0, min(0xFFFF, self.registers[live] + self._random.randint(-2, 2))
+                )
+        words = self.registers[address : address + count]
+        if sys.byteorder == "little":
+            words.byteswap()
+        return bytes((function_code, 2 * count)) + words.tobytes()
+
+    def _write(self, pdu: bytes) -> bytes:
+        """Return the reply PDU for a write multiple registers request."""
+        if len(pdu) < WRITE_REQUEST.size:
+            return bytes((pdu[0] | 0x80, ILLEGAL_FUNCTION))
+        function_code, address, count, byte_count = WRITE_REQUEST.unpack_from(pdu)
+        if (
+            not 1 <= count <= 123
+            or byte_count != 2 * count
+            or len(pdu) != WRITE_REQUEST.size + byte_count
+            or not self.is_writable(address, count)
+        ):
+            self.stats.illegal_address += 1
+            return bytes((function_code | 0x80, ILLEGAL_ADDRESS))
+        self.registers[address : address + count] = array(
+            "H", struct.unpack_from(f">{count}H", pdu, WRITE_REQUEST.size)
+        )
+        self.stats.writes += 1
+        return READ_REQUEST.pack(function_code, address, count)
+
+
+def main() -> None:
+    """Run the simulator until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--transport", choices=TRANSPORTS, default="tcp")
+    parser.add_argument("--logger-serial", type=int, default=1234567890)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--drop", type=float, default=0.0, help="drop rate")
+    parser.add_argument("--garbage", type=float, default=0.0, help="garbage rate")
+    parser.add_argument(
+        "--illegal", type=float, default=0.0, help="illegal address rate"
+    )
+    parser.add_argument("--reset", type=float, default=0.0, help="reset rate")
+    parser.add_argument(
+        "--single-transaction",
+        action="store_true",
+        help="drop requests sent while another is being answered",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    simulator = NeovoltaSimulator(
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+        transport=args.transport,
+        logger_serial=args.logger_serial,
+        faults=Faults(
+            latency=args.latency,
+            jitter=args.jitter,
+            drop_rate=args.drop,
+            garbage_rate=args.garbage,
+            illegal_address_rate=args.illegal,
+            reset_rate=args.reset,
+            single_transaction=args.single_transaction,
+        ),
+    )
+
+    async def serve() -> None:
+        async with simulator:
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        _LOGGER.info("Simulator stats: %s", simulator.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Fixtures for the NeoVolta tests, which run against scripts/simulator.py."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator
+from functools import partial
+from pathlib import Path
+import sys
+from typing import Any
+from unittest.mock import patch
+
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SLAVE
+from homeassistant.core import HomeAssistant
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.neovolta.const import CONF_SERIAL_NUMBER, DOMAIN
+from custom_components.neovolta.probe import async_apply_capabilities, async_probe
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+# pylint: disable-next=wrong-import-position,wrong-import-order
+from simulator import SERIAL_NUMBER, NeovoltaSimulator  # noqa: E402
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable custom integrations in every test."""
+    yield
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_sockets(socket_enabled):
+    """Let the tests talk to the simulator, which listens on localhost."""
+    yield
+
+
+@pytest.fixture
+async def simulator() -> AsyncGenerator[NeovoltaSimulator, None]:
+    """Serve a NeoVolta on localhost."""
+    async with NeovoltaSimulator() as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def options() -> dict[str, Any]:
+    """Return the options of the entry, parametrize to change them."""
+    return {}
+
+
+@pytest.fixture
+async def config_entry(
+    hass: HomeAssistant, simulator: NeovoltaSimulator, options: dict[str, Any]
+) -> AsyncGenerator[MockConfigEntry, None]:
+    """Set up an entry for the simulated NeoVolta, once polled and probed."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=SERIAL_NUMBER,
+        data={
+            CONF_HOST: simulator.host,
+            CONF_PORT: str(simulator.port),
+            CONF_SLAVE: "1",
+            CONF_SERIAL_NUMBER: SERIAL_NUMBER,
+        },
+        options=options,
+    )
+    entry.add_to_hass(hass)
+    probed = asyncio.Event()
+
+    async def apply_capabilities(*args) -> None:
+        await async_apply_capabilities(*args)
+        probed.set()
+
+    with patch(
+        "custom_components.neovolta.coordinator.async_probe",
+        partial(async_probe, interval=0),
+    ), patch("custom_components.neovolta.async_apply_capabilities", apply_capabilities):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        # the first poll and the probe run in the background
+        coordinator = hass.data[DOMAIN][entry.entry_id]
+        async with asyncio.timeout(10):
+            await probed.wait()
+            while coordinator.snapshot_time is None:
+                await asyncio.sleep(0.01)
+        await hass.async_block_till_done()
+        yield entry
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
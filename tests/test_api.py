@@ -0,0 +1,174 @@
+"""Tests for the NeoVolta API client, against the simulator."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from simulator import SERIAL_NUMBER, NeovoltaSimulator
+
+from custom_components.neovolta.api import (
+    NeovoltaApiClient,
+    NeovoltaApiClientDeviceError,
+)
+from custom_components.neovolta.registers import (
+    GROUP_FAST,
+    KIND_SETTING,
+    REGISTERS,
+    REGISTERS_BY_KEY,
+)
+from custom_components.neovolta.settings import SETTINGS_BY_KEY
+
+
+def _client(simulator: NeovoltaSimulator, **kwargs) -> NeovoltaApiClient:
+    return NeovoltaApiClient(host="127.0.0.1", port=simulator.port, **kwargs)
+
+
+def _decoded(simulator: NeovoltaSimulator, key: str) -> float:
+    register = REGISTERS_BY_KEY[key]
+    words = simulator.registers[register.address : register.end]
+    value = int.from_bytes(
+        b"".join(word.to_bytes(2, "big") for word in words),
+        "big",
+        signed=register.signed,
+    )
+    return value * register.scale
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+async def test_poll_decodes_every_register(max_in_flight: int):
+    """A poll fills in every sensor register, in as few reads as planned."""
+    async with NeovoltaSimulator(live=()) as simulator:
+        client = _client(simulator, max_in_flight=max_in_flight)
+        try:
+            await client.async_get_data()
+            requests = simulator.stats.requests
+            await client.async_get_data()
+            assert simulator.stats.requests - requests == 3
+        finally:
+            await client.async_close()
+    assert client.serial_number == SERIAL_NUMBER
+    for register in REGISTERS:
+        if register.kind == KIND_SETTING:
+            # settings are only read once a probe or sweep confirmed them
+            assert client.data.get(register.key) is None
+        else:
+            assert client.data.get(register.key) == pytest.approx(
+                _decoded(simulator, register.key)
+            )
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+async def test_failed_block_leaves_others_fresh(max_in_flight: int):
+    """A block the device rejects only makes its own keys stale."""
+    async with NeovoltaSimulator() as simulator:
+        client = _client(simulator, max_in_flight=max_in_flight)
+        try:
+            await client.async_get_data()
+            before = client.data.get("energy24")
+            # the block starting at 24 becomes unreadable, the others do not
+            simulator.readable = ((79, 400),)
+            await client.async_get_data()
+            assert "energy24" in client.stale_keys
+            assert "battery_voltage1" not in client.stale_keys
+            assert "battery_voltage1" in client.updated_keys
+            assert client.data.get("energy24") == before
+            assert client.blocks[(24, 89)].failed
+
+            # the failed block is read again with the next poll, whatever its group
+            simulator.readable = ((0, 400),)
+            requests = simulator.stats.requests
+            await client.async_get_data(frozenset((GROUP_FAST,)))
+            assert simulator.stats.requests - requests == 4
+            assert not client.stale_keys
+            assert not client.blocks[(24, 89)].failed
+        finally:
+            await client.async_close()
+
+
+async def test_poll_fails_when_no_block_is_read():
+    """The poll only fails once every block does."""
+    async with NeovoltaSimulator() as simulator:
+        client = _client(simulator)
+        try:
+            await client.async_get_data()
+            simulator.readable = ()
+            simulator.writable = ()
+            with pytest.raises(NeovoltaApiClientDeviceError):
+                await client.async_get_data()
+        finally:
+            await client.async_close()
+
+
+async def test_reads_settings_once_confirmed(simulator: NeovoltaSimulator):
+    """Settings are only polled once a probe or sweep found them."""
+    client = _client(simulator)
+    try:
+        await client.async_get_data()
+        assert client.data.get("work_mode") is None
+        requests = simulator.stats.requests
+        client.set_readable_settings({"work_mode"})
+        await client.async_get_data()
+        # the sensor blocks, then the setting in a block of its own
+        assert simulator.stats.requests - requests == 4
+    finally:
+        await client.async_close()
+    assert client.data.get("work_mode") == simulator.registers[142]
+    assert client.data.get("time_of_use_soc1") is None
+
+
+async def test_writes_adjacent_settings_together(simulator: NeovoltaSimulator):
+    """Adjacent settings go out in one write, and are read back."""
+    client = _client(simulator)
+    client.set_readable_settings(SETTINGS_BY_KEY)
+    try:
+        await client.async_write(
+            {"time_of_use_time1": 500, "time_of_use_time2": 715, "work_mode": 2}
+        )
+        assert simulator.stats.writes == 2
+        await client.async_write(
+            {f"time_of_use_soc{slot}": 10 * slot for slot in range(1, 7)}
+        )
+        assert simulator.stats.writes == 3
+    finally:
+        await client.async_close()
+    assert list(simulator.registers[250:252]) == [500, 715]
+    assert list(simulator.registers[268:274]) == [10, 20, 30, 40, 50, 60]
+    assert client.data.get("work_mode") == 2
+    assert client.data.get("time_of_use_soc6") == 60
+
+
+@pytest.mark.parametrize(
+    "values", [{"pv_voltage1": 1}, {"work_mode": 1, "time_of_use_soc1": 50}]
+)
+async def test_write_refuses_unconfirmed_keys(
+    simulator: NeovoltaSimulator, values: dict[str, int]
+):
+    """Sensors and settings not found on the device are not written."""
+    client = _client(simulator)
+    client.set_readable_settings({"work_mode"})
+    try:
+        with pytest.raises(ValueError):
+            await client.async_write(values)
+    finally:
+        await client.async_close()
+    assert not simulator.stats.writes
+
+
+async def test_stream_skips_failed_samples(simulator: NeovoltaSimulator):
+    """A sample the device rejects is skipped, the stream goes on."""
+    client = _client(simulator)
+    stream = client.stream(0.05, ("pv_voltage1", "pv_current1"))
+    try:
+        first = await anext(stream)
+        simulator.faults.illegal_address_rate = 1.0
+        sample = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.12)
+        assert not sample.done()
+        simulator.faults.illegal_address_rate = 0.0
+        second = await sample
+    finally:
+        await stream.aclose()
+        await client.async_close()
+    assert simulator.stats.illegal_address >= 2
+    assert second.timestamp > first.timestamp
+    assert set(second.values) == {"pv_voltage1", "pv_current1"}
@@ -0,0 +1,84 @@
+"""Tests for the backfill of the energy statistics."""
+from __future__ import annotations
+
+from array import array
+from datetime import timedelta
+
+from homeassistant.components.recorder import Recorder
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+from simulator import SERIAL_NUMBER
+
+from custom_components.neovolta.backfill import ENERGY_KEYS, StatisticsBackfill
+from custom_components.neovolta.const import DOMAIN
+
+KEY = "energy_from_grid_today"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(recorder_mock, enable_custom_integrations):
+    """Set the recorder up first, the backfill imports into it."""
+    yield
+
+
+async def test_imports_the_missed_hours(
+    recorder_mock: Recorder, hass: HomeAssistant, config_entry: MockConfigEntry
+):
+    """Readings of the outage continue the sum, across the daily reset."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{SERIAL_NUMBER}_{KEY}"
+    )
+    hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+    hours = [hour - timedelta(hours=back) for back in (4, 3, 2, 1)]
+    metadata = StatisticMetaData(
+        has_mean=False,
+        has_sum=True,
+        name=None,
+        source="recorder",
+        statistic_id=entity_id,
+        unit_of_measurement="kWh",
+    )
+    async_import_statistics(
+        hass, metadata, [StatisticData(start=hours[0], state=10.0, sum=100.0)]
+    )
+    await async_wait_recording_done(hass)
+
+    def readings(value: float) -> array:
+        return array("d", (value if key == KEY else 0 for key in ENERGY_KEYS))
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    backfill = StatisticsBackfill(hass, config_entry, coordinator.client)
+    await backfill.async_import(
+        {hours[1]: readings(12.5), hours[2]: readings(14.0), hours[3]: readings(1.0)}
+    )
+    await async_wait_recording_done(hass)
+
+    rows = (
+        await recorder_mock.async_add_executor_job(
+            statistics_during_period,
+            hass,
+            hours[0],
+            None,
+            {entity_id},
+            "hour",
+            None,
+            {"state", "sum"},
+        )
+    )[entity_id]
+    assert [(row["state"], row["sum"]) for row in rows] == [
+        (10.0, 100.0),
+        (12.5, 102.5),
+        (14.0, 104.0),
+        (1.0, 105.0),
+    ]
@@ -0,0 +1,77 @@
+"""Tests for the raw register capture and its replay."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from simulator import NeovoltaSimulator
+
+from custom_components.neovolta.api import NeovoltaApiClient
+from custom_components.neovolta.capture import (
+    RegisterCapture,
+    read_capture,
+    replay_capture,
+)
+
+
+def test_ring_keeps_the_latest_blocks(tmp_path: Path):
+    """Once full, the oldest blocks are overwritten, in place."""
+    path = str(tmp_path / "ring.capture")
+    capture = RegisterCapture(path, capacity=3)
+    for second in range(5):
+        capture.append(float(second), 24, [second] * (second + 1))
+    capture.close()
+    size = Path(path).stat().st_size
+    assert list(read_capture(path)) == [
+        (2.0, 24, (2,) * 3),
+        (3.0, 24, (3,) * 4),
+        (4.0, 24, (4,) * 5),
+    ]
+
+    # reopening goes on where the last run stopped
+    capture = RegisterCapture(path, capacity=3)
+    capture.append(5.0, 24, [5])
+    capture.close()
+    assert [record[0] for record in read_capture(path)] == [3.0, 4.0, 5.0]
+    assert Path(path).stat().st_size == size
+
+    # another capacity starts over
+    RegisterCapture(path, capacity=2).close()
+    assert not list(read_capture(path))
+
+
+def test_rejects_other_files(tmp_path: Path):
+    """Only capture files are read."""
+    path = tmp_path / "other.capture"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+
+
+async def test_replays_a_captured_poll(tmp_path: Path):
+    """Every block a poll reads is captured and decodes as polled."""
+    path = str(tmp_path / "poll.capture")
+    capture = RegisterCapture(path, capacity=16)
+    async with NeovoltaSimulator(live=()) as simulator:
+        client = NeovoltaApiClient(
+            host="127.0.0.1", port=simulator.port, capture=capture
+        )
+        try:
+            await client.async_get_data()
+        finally:
+            # closes the capture too
+            await client.async_close()
+    blocks = list(read_capture(path))
+    assert [(start, len(registers)) for _, start, registers in blocks] == [
+        (24, 89),
+        (126, 68),
+        (314, 31),
+    ]
+    replayed = {}
+    for _, values in replay_capture(path):
+        replayed.update(values)
+    # replay decodes every register of a block, unconfirmed settings too
+    polled = {key: client.data.get(key) for key in replayed if key != "work_mode"}
+    assert None not in polled.values()
+    assert {key: replayed[key] for key in polled} == polled
+    assert replayed["pv_voltage1"] == pytest.approx(simulator.registers[109] / 10)
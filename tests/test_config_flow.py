@@ -0,0 +1,40 @@
+"""Tests for the NeoVolta config and options flows."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.neovolta.const import (
+    CONF_CAPTURE,
+    CONF_DEADBAND_CURRENT,
+    CONF_DEADBAND_FREQUENCY,
+    CONF_DEADBAND_POWER,
+    CONF_DEADBAND_VOLTAGE,
+    CONF_MAX_IN_FLIGHT,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+)
+
+
+async def test_options_flow(hass: HomeAssistant, config_entry: MockConfigEntry):
+    """The options include the deadband of each kind of measurement."""
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+    assert result["data_schema"]({})[CONF_DEADBAND_VOLTAGE] == 0.2
+    options = {
+        CONF_CAPTURE: False,
+        CONF_MIN_INTERVAL: 5,
+        CONF_MAX_INTERVAL: 120,
+        CONF_MAX_IN_FLIGHT: 1,
+        CONF_DEADBAND_VOLTAGE: 1,
+        CONF_DEADBAND_CURRENT: 0.5,
+        CONF_DEADBAND_FREQUENCY: 0.1,
+        CONF_DEADBAND_POWER: 50,
+    }
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], options
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+    assert config_entry.options == options
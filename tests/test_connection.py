@@ -0,0 +1,197 @@
+"""Tests for the Modbus framing and connection, over every transport."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from simulator import Faults, NeovoltaSimulator
+
+from custom_components.neovolta import connection as connection_module
+from custom_components.neovolta.api import (
+    NeovoltaApiClient,
+    NeovoltaApiClientCommunicationError,
+)
+from custom_components.neovolta.connection import (
+    acquire_connection,
+    release_connection,
+)
+from custom_components.neovolta.const import (
+    TRANSPORT_RTU_OVER_TCP,
+    TRANSPORT_SOLARMAN_V5,
+    TRANSPORT_TCP,
+    TRANSPORTS,
+)
+from custom_components.neovolta.retry import RetryPolicy
+
+# reads of (address, count), none of them in the simulator's live registers
+READS = [(0, 20), (24, 60), (200, 100), (300, 10), (310, 50), (3, 5)]
+FAST_RETRIES = RetryPolicy(attempt_timeout=0.2, base_delay=0.01, max_delay=0.05)
+
+
+def _simulator(transport: str, **kwargs) -> NeovoltaSimulator:
+    return NeovoltaSimulator(transport=transport, live=(), seed=1, **kwargs)
+
+
+def _client(simulator: NeovoltaSimulator, **kwargs) -> NeovoltaApiClient:
+    return NeovoltaApiClient(
+        host="127.0.0.1",
+        port=simulator.port,
+        transport=simulator.transport,
+        logger_serial=simulator.logger_serial,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+async def test_reads_registers(transport: str):
+    """Registers read over each transport match the device's."""
+    async with _simulator(transport) as simulator:
+        client = _client(simulator)
+        try:
+            for address, count in READS:
+                assert await client.async_read_registers(address, count) == list(
+                    simulator.registers[address : address + count]
+                )
+        finally:
+            await client.async_close()
+        assert simulator.stats.connections == 1
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+async def test_resyncs_after_junk_bytes(transport: str):
+    """Junk around responses is skipped without reconnecting."""
+    async with _simulator(transport, faults=Faults(garbage_rate=0.3)) as simulator:
+        client = _client(simulator, retry_policy=FAST_RETRIES)
+        try:
+            for _ in range(10):
+                for address, count in READS:
+                    assert await client.async_read_registers(address, count) == list(
+                        simulator.registers[address : address + count]
+                    )
+        finally:
+            await client.async_close()
+        assert simulator.stats.garbage
+        assert client.metrics.bytes_discarded
+        assert simulator.stats.connections == 1
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_TCP, TRANSPORT_SOLARMAN_V5])
+async def test_matches_pipelined_responses_by_transaction(transport: str):
+    """Responses answered out of order go to the request with their id."""
+    async with _simulator(
+        transport, faults=Faults(latency=0.01, jitter=0.05)
+    ) as simulator:
+        client = _client(simulator, max_in_flight=len(READS))
+        try:
+            responses = await asyncio.gather(
+                *(
+                    client.async_read_registers(address, count)
+                    for address, count in READS * 3
+                )
+            )
+        finally:
+            await client.async_close()
+    for (address, count), response in zip(READS * 3, responses):
+        assert response == list(simulator.registers[address : address + count])
+
+
+@pytest.mark.parametrize(
+    ("transport", "count"),
+    [
+        (TRANSPORT_TCP, 10),
+        (TRANSPORT_SOLARMAN_V5, 10),
+        # without transaction ids, only an answer of another length is told apart
+        (TRANSPORT_RTU_OVER_TCP, 20),
+    ],
+)
+async def test_skips_late_response(transport: str, count: int):
+    """The answer to a request that timed out is not taken for the next one."""
+    async with _simulator(transport, faults=Faults(latency=0.8)) as simulator:
+        client = _client(simulator, retry_policy=RetryPolicy(attempt_timeout=0.5))
+        try:
+            with pytest.raises(NeovoltaApiClientCommunicationError):
+                await client.async_read_registers(300, 10, attempts=1)
+            simulator.faults.latency = 0.4
+            # the late answer to the first read arrives while this one waits
+            assert await client.async_read_registers(24, count, attempts=1) == list(
+                simulator.registers[24 : 24 + count]
+            )
+        finally:
+            await client.async_close()
+        assert simulator.stats.connections == 1
+
+
+async def test_rtu_is_never_pipelined():
+    """Without transaction ids, requests always go one at a time."""
+    connection = acquire_connection(
+        "127.0.0.1", "8899", TRANSPORT_RTU_OVER_TCP, max_in_flight=4
+    )
+    assert connection.max_in_flight == 1
+    release_connection(connection, 4)
+
+
+async def test_limit_follows_the_clients_of_a_connection():
+    """A client asking for fewer requests at once only limits while it stays."""
+    connection = acquire_connection("127.0.0.1", "8899", TRANSPORT_TCP, max_in_flight=4)
+    assert connection.max_in_flight == 4
+    assert acquire_connection("127.0.0.1", "8899", TRANSPORT_TCP) is connection
+    assert connection.max_in_flight == 1
+    release_connection(connection)
+    assert connection.max_in_flight == 4
+    assert connection.users == 1
+    release_connection(connection, 4)
+    assert connection.users == 0
+    reopened = acquire_connection("127.0.0.1", "8899", TRANSPORT_TCP)
+    assert reopened is not connection
+    release_connection(reopened)
+
+
+async def _stall(simulator: NeovoltaSimulator, client: NeovoltaApiClient, reads: int):
+    """Send reads at once to a gateway that only answers the first of them."""
+    simulator.faults.single_transaction = True
+    await asyncio.gather(
+        *(client.async_read_registers(0, 10, attempts=1) for _ in range(reads)),
+        return_exceptions=True,
+    )
+    simulator.faults.single_transaction = False
+
+
+async def test_keeps_pipelining_through_transient_stalls():
+    """Stalls with answered requests in between do not add up."""
+    async with _simulator(TRANSPORT_TCP) as simulator:
+        client = _client(simulator, max_in_flight=4, retry_policy=FAST_RETRIES)
+        try:
+            for _ in range(3):
+                await _stall(simulator, client, 2)
+                await asyncio.gather(
+                    client.async_read_registers(0, 10),
+                    client.async_read_registers(24, 10),
+                )
+            # pylint: disable-next=protected-access
+            assert client._connection.max_in_flight == 4
+        finally:
+            await client.async_close()
+
+
+async def test_falls_back_to_one_request_at_a_time(monkeypatch: pytest.MonkeyPatch):
+    """A gateway dropping concurrent requests gets them one at a time, for a while."""
+    monkeypatch.setattr(connection_module, "CONCURRENCY_RETRY_DELAY", 0.5)
+    async with _simulator(
+        TRANSPORT_TCP, faults=Faults(latency=0.02, single_transaction=True)
+    ) as simulator:
+        client = _client(simulator, max_in_flight=4, retry_policy=FAST_RETRIES)
+        try:
+            await client.async_get_data()
+            # pylint: disable-next=protected-access
+            assert client._connection.max_in_flight == 1
+            dropped = simulator.stats.dropped
+            for _ in range(3):
+                await client.async_get_data()
+            assert simulator.stats.dropped == dropped
+            assert not client.stale_keys
+
+            await asyncio.sleep(0.5)
+            # pylint: disable-next=protected-access
+            assert client._connection.max_in_flight == 4
+        finally:
+            await client.async_close()
@@ -0,0 +1,72 @@
+"""Tests for the NeoVolta data update coordinator."""
+from __future__ import annotations
+
+import time
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulator import NeovoltaSimulator
+
+from custom_components.neovolta.const import DOMAIN, HEARTBEAT_INTERVAL
+
+
+async def test_snapshot_saved_on_stop(
+    hass: HomeAssistant, config_entry: MockConfigEntry, hass_storage: dict[str, Any]
+):
+    """The delayed snapshot save is flushed with the latest values on stop."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    key = f"{DOMAIN}.{config_entry.entry_id}"
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert key not in hass_storage
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    assert hass_storage[key]["data"]["data"] == coordinator.client.data.as_dict()
+    assert hass_storage[key]["data"]["time"] == coordinator.snapshot_time.isoformat()
+
+
+async def test_heartbeat_fills_the_gaps_between_polls(
+    hass: HomeAssistant, config_entry: MockConfigEntry, simulator: NeovoltaSimulator
+):
+    """A heartbeat is only sent when no poll answered or comes soon."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    interval = HEARTBEAT_INTERVAL.total_seconds()
+    requests = simulator.stats.requests
+    # pylint: disable=protected-access
+    await coordinator._async_heartbeat()
+    assert simulator.stats.requests == requests
+
+    coordinator._last_contact -= interval
+    coordinator._next_poll = time.monotonic() + interval / 2
+    await coordinator._async_heartbeat()
+    assert simulator.stats.requests == requests
+
+    coordinator._next_poll = time.monotonic() + 6 * interval
+    await coordinator._async_heartbeat()
+    assert simulator.stats.requests == requests + 1
+    # heartbeats do not stand in for polls
+    await coordinator._async_heartbeat()
+    assert simulator.stats.requests == requests + 2
+
+
+async def test_heartbeat_polls_once_the_device_is_back(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+):
+    """A heartbeat answered after a lost link polls right away."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    # pylint: disable=protected-access
+    coordinator._set_connected(False)
+    coordinator._last_contact -= HEARTBEAT_INTERVAL.total_seconds()
+    coordinator._next_poll = None
+    snapshot_time = coordinator.snapshot_time
+    with patch.object(coordinator, "_debounced_refresh") as debouncer:
+        debouncer.async_call = AsyncMock()
+        await coordinator._async_heartbeat()
+        await hass.async_block_till_done()
+    assert coordinator.connected
+    debouncer.async_call.assert_awaited_once()
+    assert coordinator.snapshot_time == snapshot_time
@@ -0,0 +1,66 @@
+"""Tests for the values derived from the registers."""
+from __future__ import annotations
+
+from homeassistant.components.sensor import ATTR_LAST_RESET, ATTR_STATE_CLASS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulator import SERIAL_NUMBER
+
+from custom_components.neovolta.derived import RATE_WINDOW, DerivedValues
+from custom_components.neovolta.values import RegisterValues
+
+
+def test_computes_from_the_decoded_inputs():
+    """Only the values with a decoded input are computed, from this poll."""
+    data = RegisterValues()
+    data.update(
+        {
+            "pv_voltage1": 300.0,
+            "pv_current1": 2.0,
+            "pv_voltage2": 200.0,
+            "pv_current2": 1.5,
+            "energy_from_grid_today": 1.5,
+            "energy_to_grid_today": 4.0,
+        }
+    )
+    derived = DerivedValues()
+    derived.update(data, frozenset(("pv_current1",)), 0.0)
+    assert data["pv_power"] == 900
+    assert data["net_grid_energy_today"] is None
+    derived.update(data, frozenset(("energy_to_grid_today",)), 0.0)
+    # more exported than imported
+    assert data["net_grid_energy_today"] == -2.5
+    assert data["battery_power"] is None
+
+
+def test_rates_over_a_full_window():
+    """A rate is only reported, and then held, per full window."""
+    data = RegisterValues()
+    derived = DerivedValues()
+    decoded = frozenset(("battery_total",))
+    for now, soc, rate in (
+        (0.0, 50, None),
+        (RATE_WINDOW / 2, 55, None),
+        (RATE_WINDOW, 60, 120.0),
+        (RATE_WINDOW * 1.5, 70, 120.0),
+        (RATE_WINDOW * 2, 55, -60.0),
+    ):
+        data["battery_total"] = soc
+        derived.update(data, decoded, now)
+        assert data["battery_charge_rate"] == rate
+
+
+async def test_net_energy_resets_daily(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+):
+    """Net energy may go negative, it is a total reset every day."""
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", "neovolta", f"{SERIAL_NUMBER}_net_grid_energy_today"
+    )
+    state = hass.states.get(entity_id)
+    assert state.attributes[ATTR_STATE_CLASS] == "total"
+    assert state.attributes[ATTR_LAST_RESET] == (
+        dt_util.start_of_local_day().isoformat()
+    )
@@ -0,0 +1,59 @@
+"""Tests for the register probe."""
+from __future__ import annotations
+
+from simulator import NeovoltaSimulator
+
+from custom_components.neovolta.api import NeovoltaApiClient
+from custom_components.neovolta.probe import (
+    ABSENT,
+    CONSTANT,
+    LIVE,
+    UNSUPPORTED,
+    async_probe,
+    is_useful,
+)
+
+
+async def test_classifies_registers():
+    """Registers are told apart by how they read during the probe."""
+    # PV string 1 drifts, string 2 is not connected, the registers past 300
+    # are rejected
+    async with NeovoltaSimulator(
+        readable=((0, 300),), live=((109, 111),), seed=1
+    ) as simulator:
+        simulator.registers[111] = simulator.registers[112] = 0
+        simulator.registers[184] = 0
+        client = NeovoltaApiClient(host="127.0.0.1", port=simulator.port)
+        try:
+            capabilities = await async_probe(client, samples=5, interval=0)
+        finally:
+            await client.async_close()
+    assert capabilities["pv_voltage1"] == LIVE
+    assert capabilities["pv_current1"] == LIVE
+    assert capabilities["pv_voltage2"] == ABSENT
+    assert capabilities["pv_current2"] == ABSENT
+    # a flat state of charge may just be slow
+    assert capabilities["battery_total"] == CONSTANT
+    assert capabilities["grid_voltage_rua"] == CONSTANT
+    assert capabilities["current314"] == UNSUPPORTED
+
+
+def test_is_useful():
+    """Absent and unsupported registers are left out, constant ones kept."""
+    capabilities = {
+        "pv_voltage1": LIVE,
+        "pv_current1": LIVE,
+        "pv_voltage2": ABSENT,
+        "pv_current2": ABSENT,
+        "battery_total": CONSTANT,
+        "energy_from_grid_today": UNSUPPORTED,
+        "energy_to_grid_today": LIVE,
+    }
+    assert is_useful("pv_voltage1", capabilities)
+    assert not is_useful("pv_current2", capabilities)
+    assert is_useful("battery_total", capabilities)
+    assert not is_useful("energy_from_grid_today", capabilities)
+    # derived values only need their inputs to be readable
+    assert is_useful("pv_power", capabilities)
+    assert not is_useful("net_grid_energy_today", capabilities)
+    assert is_useful("anything", None)
@@ -0,0 +1,72 @@
+"""Tests for the register map and read planner."""
+from custom_components.neovolta.registers import (
+    GROUP_SETTINGS,
+    MAX_READ_COUNT,
+    MAX_READ_GAP,
+    REGISTERS,
+    REGISTERS_BY_KEY,
+    plan_reads,
+)
+
+
+def _blocks(plans) -> list[tuple[int, int, tuple[str, ...]]]:
+    return [(plan.start, plan.count, plan.keys) for plan in plans]
+
+
+def test_coalesces_across_small_gaps():
+    """Registers a few addresses apart are read in one block."""
+    assert _blocks(plan_reads({"energy24", "energy65"})) == [
+        (24, 42, ("energy24", "energy65"))
+    ]
+
+
+def test_splits_across_large_gaps():
+    """Registers further apart than MAX_READ_GAP are read separately."""
+    assert 126 - 25 > MAX_READ_GAP
+    assert _blocks(plan_reads({"energy24", "battery_voltage1"})) == [
+        (24, 1, ("energy24",)),
+        (126, 1, ("battery_voltage1",)),
+    ]
+
+
+def test_reads_only_wanted_registers():
+    """Unwanted registers inside a block are skipped, not decoded."""
+    (plan,) = plan_reads({"pv_voltage1", "pv_current2"})
+    assert (plan.start, plan.count, plan.keys) == (
+        109,
+        4,
+        ("pv_voltage1", "pv_current2"),
+    )
+
+
+def test_covers_every_register_once():
+    """A full plan reads every register once, within MAX_READ_COUNT."""
+    plans = plan_reads()
+    keys = [key for plan in plans for key in plan.keys]
+    assert sorted(keys) == sorted(register.key for register in REGISTERS)
+    assert all(plan.count <= MAX_READ_COUNT for plan in plans)
+    for plan in plans:
+        for key in plan.keys:
+            register = REGISTERS_BY_KEY[key]
+            assert plan.start <= register.address
+            assert register.end <= plan.start + plan.count
+
+
+def test_settings_in_blocks_of_their_own():
+    """Settings never share a block with sensors, even when adjacent."""
+    plans = plan_reads({"grid_voltage_rsuvab", "work_mode", "battery_voltage2"})
+    assert _blocks(plans) == [
+        (140, 4, ("grid_voltage_rsuvab", "battery_voltage2")),
+        (142, 1, ("work_mode",)),
+    ]
+    for plan in plan_reads():
+        groups = {REGISTERS_BY_KEY[key].group == GROUP_SETTINGS for key in plan.keys}
+        assert len(groups) == 1
+
+
+def test_filters_by_group():
+    """Only the registers of the wanted groups are planned."""
+    plans = plan_reads(groups=frozenset((GROUP_SETTINGS,)))
+    assert {key for plan in plans for key in plan.keys} == {
+        register.key for register in REGISTERS if register.group == GROUP_SETTINGS
+    }
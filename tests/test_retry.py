@@ -0,0 +1,128 @@
+"""Tests for the retry policy and circuit breaker."""
+from __future__ import annotations
+
+import pytest
+from simulator import Faults, NeovoltaSimulator
+
+from custom_components.neovolta.api import (
+    NeovoltaApiClient,
+    NeovoltaApiClientCommunicationError,
+    NeovoltaApiClientDeviceError,
+)
+from custom_components.neovolta.retry import (
+    AdaptiveInterval,
+    CircuitBreaker,
+    RetryPolicy,
+)
+
+FAST_RETRIES = RetryPolicy(
+    attempts=3, attempt_timeout=0.1, deadline=1.0, base_delay=0.01, max_delay=0.02
+)
+
+
+def test_backoff_grows_with_jitter():
+    """Delays double up to max_delay, never less than half the ceiling."""
+    policy = RetryPolicy(base_delay=0.5, max_delay=8.0)
+    for retry, ceiling in ((1, 0.5), (2, 1.0), (3, 2.0), (5, 8.0), (9, 8.0)):
+        for _ in range(20):
+            assert ceiling / 2 <= policy.backoff(retry) <= ceiling
+
+
+def test_breaker_opens_and_probes():
+    """The breaker opens at the threshold and lets one probe through."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # a failed probe opens it again, a successful one closes it
+    breaker.record_failure()
+    breaker.reset_timeout = 60
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.reset_timeout = 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.failures
+
+
+async def test_retries_dropped_requests():
+    """Requests the logger drops are retried within the poll."""
+    async with NeovoltaSimulator(faults=Faults(drop_rate=0.3), seed=3) as simulator:
+        client = NeovoltaApiClient(
+            host="127.0.0.1", port=simulator.port, retry_policy=FAST_RETRIES
+        )
+        try:
+            for _ in range(5):
+                await client.async_get_data()
+        finally:
+            await client.async_close()
+    assert simulator.stats.dropped
+    assert not client.stale_keys
+
+
+async def test_device_rejection_is_not_retried():
+    """An illegal address is final, retrying it would not help."""
+    async with NeovoltaSimulator(readable=()) as simulator:
+        client = NeovoltaApiClient(
+            host="127.0.0.1", port=simulator.port, retry_policy=FAST_RETRIES
+        )
+        try:
+            with pytest.raises(NeovoltaApiClientDeviceError):
+                await client.async_read_registers(24, 10)
+        finally:
+            await client.async_close()
+    assert simulator.stats.requests == 1
+
+
+async def test_breaker_stops_polling_a_silent_device():
+    """After consecutive failed polls, polls fail without a request."""
+    async with NeovoltaSimulator() as simulator:
+        client = NeovoltaApiClient(
+            host="127.0.0.1", port=simulator.port, retry_policy=FAST_RETRIES
+        )
+        try:
+            await client.async_get_data()
+            simulator.faults.drop_rate = 1.0
+            for _ in range(3):
+                with pytest.raises(NeovoltaApiClientCommunicationError):
+                    await client.async_get_data()
+            requests = simulator.stats.requests
+            with pytest.raises(NeovoltaApiClientCommunicationError):
+                await client.async_get_data()
+            assert simulator.stats.requests == requests
+        finally:
+            await client.async_close()
+
+
+def test_interval_shortens_while_polls_are_clean():
+    """Clean, fast polls shorten the interval step by step, to the minimum."""
+    interval = AdaptiveInterval(minimum=5, maximum=120, initial=10)
+    assert [interval.update(0.1, 0, False) for _ in range(7)] == [
+        9,
+        8,
+        7,
+        6,
+        5,
+        5,
+        5,
+    ]
+
+
+def test_interval_backs_off_after_trouble():
+    """Retries or a failure double the interval, up to the maximum."""
+    interval = AdaptiveInterval(minimum=5, maximum=30, initial=10)
+    assert interval.update(0.1, 2, False) == 20
+    assert interval.update(None, 0, True) == 30
+    assert interval.update(None, 0, True) == 30
+    assert interval.update(0.1, 0, False) == 29
+
+
+def test_interval_leaves_the_logger_headroom():
+    """A slow link keeps the interval at a multiple of the poll latency."""
+    interval = AdaptiveInterval(minimum=5, maximum=120, initial=10)
+    assert [interval.update(2.2, 0, False) for _ in range(3)] == pytest.approx(
+        [9, 8.8, 8.8]
+    )
+    # bounds are kept consistent
+    assert AdaptiveInterval(minimum=20, maximum=10, initial=5).interval == 20
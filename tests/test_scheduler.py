@@ -0,0 +1,94 @@
+"""Tests for the poll scheduler shared by the config entries."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.neovolta import scheduler as scheduler_module
+from custom_components.neovolta.scheduler import PollScheduler
+
+
+class _Tracker:
+    """Record which polls run at the same time."""
+
+    def __init__(self, scheduler: PollScheduler) -> None:
+        self.scheduler = scheduler
+        self.running: set[str] = set()
+        self.most = 0
+        self.most_slow = 0
+        self.started: list[str] = []
+
+    async def poll(self, name: str, duration: float = 0.02) -> None:
+        async with self.scheduler.poll(name):
+            self.started.append(name)
+            self.running.add(name)
+            self.most = max(self.most, len(self.running))
+            slow = sum(map(self.scheduler.is_slow, self.running))
+            self.most_slow = max(self.most_slow, slow)
+            await asyncio.sleep(duration)
+            self.running.discard(name)
+
+
+def test_staggers_entries():
+    """Every entry starts at its own offset within the interval."""
+    scheduler = PollScheduler()
+    offsets = [scheduler.register(f"entry{i}") for i in range(8)]
+    assert offsets[0] == 0
+    assert all(0 <= offset < 1 for offset in offsets)
+    # no two entries closer than a fraction of the interval
+    ordered = sorted(offsets)
+    assert min(b - a for a, b in zip(ordered, ordered[1:])) > 0.05
+
+
+async def test_limits_concurrent_polls():
+    """No more than max_concurrent polls run at once."""
+    scheduler = PollScheduler(max_concurrent=2)
+    tracker = _Tracker(scheduler)
+    names = [f"entry{i}" for i in range(6)]
+    for name in names:
+        scheduler.register(name)
+    await asyncio.gather(*(tracker.poll(name) for name in names))
+    assert tracker.most == 2
+    assert sorted(tracker.started) == names
+
+
+async def test_slow_entries_take_half_the_slots(monkeypatch: pytest.MonkeyPatch):
+    """Slow entries get half the slots and wait behind healthy ones."""
+    monkeypatch.setattr(scheduler_module, "SLOW_POLL_SECONDS", 0.01)
+    scheduler = PollScheduler(max_concurrent=4)
+    tracker = _Tracker(scheduler)
+    slow = [f"slow{i}" for i in range(4)]
+    healthy = [f"healthy{i}" for i in range(2)]
+    for name in slow + healthy:
+        scheduler.register(name)
+    await asyncio.gather(*(tracker.poll(name, 0.1) for name in slow))
+    assert all(map(scheduler.is_slow, slow))
+    assert not any(map(scheduler.is_slow, healthy))
+
+    tracker.most = tracker.most_slow = 0
+    tracker.started.clear()
+    polls = [asyncio.create_task(tracker.poll(name)) for name in slow]
+    await asyncio.sleep(0)
+    polls += [asyncio.create_task(tracker.poll(name)) for name in healthy]
+    await asyncio.gather(*polls)
+    assert tracker.most_slow == 2
+    # the healthy polls went before the slow ones that had to wait
+    assert tracker.started[2:4] == healthy
+
+
+async def test_cancelled_waiter_gives_its_turn_away():
+    """A poll cancelled while waiting does not keep a slot."""
+    scheduler = PollScheduler(max_concurrent=1)
+    tracker = _Tracker(scheduler)
+    for name in ("a", "b", "c"):
+        scheduler.register(name)
+    first = asyncio.create_task(tracker.poll("a"))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(tracker.poll("b"))
+    waiting = asyncio.create_task(tracker.poll("c"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(first, waiting)
+    assert tracker.started == ["a", "c"]
+    assert cancelled.cancelled()
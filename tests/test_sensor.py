@@ -0,0 +1,68 @@
+"""Tests for the NeoVolta sensors."""
+from __future__ import annotations
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulator import SERIAL_NUMBER, NeovoltaSimulator
+
+from custom_components.neovolta.const import CONF_DEADBAND_CURRENT, DOMAIN
+
+
+async def _state_after(
+    hass: HomeAssistant, entry: MockConfigEntry, simulator: NeovoltaSimulator, raw
+) -> str:
+    """Return the state of a current sensor after the device reads raw."""
+    simulator.registers[314] = raw
+    await hass.data[DOMAIN][entry.entry_id].async_refresh()
+    await hass.async_block_till_done()
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{SERIAL_NUMBER}_current314"
+    )
+    return hass.states.get(entity_id).state
+
+
+@pytest.mark.parametrize(
+    ("options", "recorded"),
+    [({}, ["20.0", "20.0", "20.3"]), ({CONF_DEADBAND_CURRENT: 0.5}, ["20.0"] * 3)],
+)
+async def test_deadband(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    simulator: NeovoltaSimulator,
+    recorded: list[str],
+):
+    """Changes within the deadband of a sensor are not recorded."""
+    states = [
+        await _state_after(hass, config_entry, simulator, raw)
+        for raw in (200, 201, 203)
+    ]
+    assert states == recorded
+
+
+async def test_failed_block_only_takes_its_sensors_down(
+    hass: HomeAssistant, config_entry: MockConfigEntry, simulator: NeovoltaSimulator
+):
+    """Sensors of a block that cannot be read are unavailable, others not."""
+    registry = er.async_get(hass)
+
+    def state(key: str) -> str:
+        entity_id = registry.async_get_entity_id(
+            "sensor", DOMAIN, f"{SERIAL_NUMBER}_{key}"
+        )
+        return hass.states.get(entity_id).state
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    # the PV registers become unreadable
+    simulator.readable = ((0, 109), (113, 400))
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert state("pv_voltage1") == STATE_UNAVAILABLE
+    assert state("current314") != STATE_UNAVAILABLE
+
+    simulator.readable = ((0, 400),)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert state("pv_voltage1") != STATE_UNAVAILABLE
@@ -0,0 +1,48 @@
+"""Tests for the NeoVolta settings entities and write service."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulator import NeovoltaSimulator
+
+from custom_components.neovolta.const import DOMAIN, SERVICE_WRITE_SETTINGS
+
+
+async def test_settings_entities_disabled_by_default(
+    hass: HomeAssistant, config_entry: MockConfigEntry
+):
+    """Setting registers are guessed, their entities are opt in."""
+    entities = er.async_entries_for_config_entry(
+        er.async_get(hass), config_entry.entry_id
+    )
+    settings = [e for e in entities if e.domain in ("number", "select", "time")]
+    assert len(settings) == 15
+    assert all(e.disabled_by is not None for e in settings)
+
+
+async def test_write_settings_needs_confirmed_settings(
+    hass: HomeAssistant, config_entry: MockConfigEntry, simulator: NeovoltaSimulator
+):
+    """Settings are only written once a probe found them on the device."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator.client.set_readable_settings(())
+    service_data = {
+        "config_entry_id": config_entry.entry_id,
+        "settings": {"time_of_use_time1": "05:00", "time_of_use_soc1": 90},
+    }
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_WRITE_SETTINGS, service_data, blocking=True
+        )
+    assert not simulator.stats.writes
+
+    await coordinator.async_probe()
+    await hass.services.async_call(
+        DOMAIN, SERVICE_WRITE_SETTINGS, service_data, blocking=True
+    )
+    assert simulator.stats.writes == 2
+    assert simulator.registers[250] == 500
+    assert simulator.registers[268] == 90
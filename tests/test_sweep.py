@@ -0,0 +1,73 @@
+"""Tests for the sweep of the register space."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from simulator import NeovoltaSimulator
+
+from custom_components.neovolta.api import NeovoltaApiClient
+from custom_components.neovolta.const import DOMAIN, SERVICE_SWEEP
+from custom_components.neovolta.sweep import async_sweep
+
+READABLE = ((0, 100), (130, 140), (200, 400))
+
+
+async def test_maps_readable_ranges_and_holes():
+    """Holes are skipped in far fewer reads than they have registers."""
+    async with NeovoltaSimulator(readable=READABLE, live=(), max_count=60) as simulator:
+        client = NeovoltaApiClient(host="127.0.0.1", port=simulator.port)
+        try:
+            result = await async_sweep(client, 0, 400, pause=0)
+            cached = await async_sweep(client, 0, 400, result.summary(), pause=0)
+        finally:
+            await client.async_close()
+    assert result.complete
+    assert result.readable == [list(r) for r in READABLE]
+    assert result.holes == [[100, 130], [140, 200]]
+    # the logger's limit on the register count was found
+    assert result.block_size <= 60
+    assert result.reads < 50
+    assert result.registers == {
+        address: simulator.registers[address]
+        for start, end in READABLE
+        for address in range(start, end)
+    }
+    # the next sweep skips the known holes without probing them
+    assert cached.holes == result.holes
+    assert cached.readable == result.readable
+    assert cached.reads < result.reads
+
+
+async def test_sweep_service(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    simulator: NeovoltaSimulator,
+    tmp_path: Path,
+):
+    """The service dumps the registers and confirms the settings found."""
+    hass.config.config_dir = str(tmp_path)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    # as if never probed, only the sweep confirms settings
+    coordinator.capabilities = None
+    simulator.readable = ((100, 250),)
+    simulator.writable = ()
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SWEEP,
+        {"config_entry_id": config_entry.entry_id, "start": 100, "end": 300},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["readable"] == [[100, 250]]
+    assert response["holes"] == [[250, 300]]
+    dump = json.loads(Path(response["path"]).read_text(encoding="utf-8"))
+    assert dump["registers"]["142"] == simulator.registers[142]
+    # the settings inside the readable range, not those after it
+    assert coordinator.client.readable_settings == {
+        "work_mode",
+        "battery_max_charge_current",
+        "battery_max_discharge_current",
+    }